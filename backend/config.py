@@ -19,9 +19,167 @@ class Settings:
     GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
     GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
     
+    # Provider endpoints (override to point at scripts/llm_standin.py or a proxy)
+    GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com").rstrip("/")
+    GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com").rstrip("/")
+    
     # Fallback Configuration
     FALLBACK_TO_MOCK = os.getenv("FALLBACK_TO_MOCK", "true").lower() == "true"
     # ===== END NEW =====
+
+    # ===== NEW: LLM Response Cache =====
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_COLLECTION = os.getenv("LLM_CACHE_COLLECTION", "llm_cache")
+    LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))  # 7 days
+    LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512"))
+    LLM_CACHE_MAX_DOCUMENTS = int(os.getenv("LLM_CACHE_MAX_DOCUMENTS", "20000"))
+    # High-temperature tasks where a fresh answer is wanted every time
+    LLM_CACHE_BYPASS_TASKS = [
+        t.strip() for t in os.getenv("LLM_CACHE_BYPASS_TASKS", "rewrite").split(",") if t.strip()
+    ]
+    # ===== END NEW =====
+    
+    # ===== NEW: LLM HTTP Connection Pool =====
+    LLM_HTTP2 = os.getenv("LLM_HTTP2", "true").lower() == "true"
+    LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "20"))
+    LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "10"))
+    LLM_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "60"))
+    LLM_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "60"))
+    LLM_HTTP_CONNECT_TIMEOUT = float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", "10"))
+    # How long a request may wait for a free pooled connection
+    LLM_HTTP_POOL_TIMEOUT = float(os.getenv("LLM_HTTP_POOL_TIMEOUT", "30"))
+    # ===== END NEW =====
+    
+    # ===== NEW: LLM Rate Limiting (per provider) =====
+    GEMINI_REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "60"))
+    GEMINI_TOKENS_PER_MINUTE = float(os.getenv("GEMINI_TOKENS_PER_MINUTE", "1000000"))
+    GROQ_REQUESTS_PER_MINUTE = float(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))
+    GROQ_TOKENS_PER_MINUTE = float(os.getenv("GROQ_TOKENS_PER_MINUTE", "12000"))
+    # AIMD concurrency window: grows by ~1 per window of successes, halves on 429
+    LLM_INITIAL_CONCURRENCY = int(os.getenv("LLM_INITIAL_CONCURRENCY", "5"))
+    LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "20"))
+    LLM_CONCURRENCY_DECREASE_FACTOR = float(os.getenv("LLM_CONCURRENCY_DECREASE_FACTOR", "0.5"))
+    # Pause applied to a provider after a 429 that carries no Retry-After
+    LLM_DEFAULT_RETRY_AFTER = float(os.getenv("LLM_DEFAULT_RETRY_AFTER", "2"))
+    # Priority classes (interactive > normal > bulk): a waiting call gains one class per aging period
+    LLM_PRIORITY_AGING_SECONDS = float(os.getenv("LLM_PRIORITY_AGING_SECONDS", "15"))
+    # Concurrency slots only interactive calls (e.g. a single rewrite) may use
+    LLM_INTERACTIVE_RESERVED_SLOTS = int(os.getenv("LLM_INTERACTIVE_RESERVED_SLOTS", "1"))
+    # ===== END NEW =====
+    
+    # ===== NEW: Batched Segment Evaluation =====
+    # Pack several segments into one evaluation request (one rubric, one call)
+    EVAL_BATCH_ENABLED = os.getenv("EVAL_BATCH_ENABLED", "false").lower() == "true"
+    EVAL_BATCH_TOKEN_BUDGET = int(os.getenv("EVAL_BATCH_TOKEN_BUDGET", "12000"))  # prompt + expected answer
+    EVAL_BATCH_MAX_SEGMENTS = int(os.getenv("EVAL_BATCH_MAX_SEGMENTS", "8"))
+    EVAL_BATCH_MAX_RETRIES = int(os.getenv("EVAL_BATCH_MAX_RETRIES", "2"))
+    # ===== END NEW =====
+    
+    # ===== NEW: Streaming Evaluation =====
+    # Stream Gemini answers and persist each metric as soon as it is parsed
+    LLM_STREAMING_ENABLED = os.getenv("LLM_STREAMING_ENABLED", "false").lower() == "true"
+    # ===== END NEW =====
+    
+    # ===== NEW: LLM Circuit Breakers =====
+    CIRCUIT_WINDOW_SECONDS = float(os.getenv("CIRCUIT_WINDOW_SECONDS", "60"))
+    CIRCUIT_MIN_REQUESTS = int(os.getenv("CIRCUIT_MIN_REQUESTS", "5"))
+    CIRCUIT_ERROR_RATE = float(os.getenv("CIRCUIT_ERROR_RATE", "0.5"))
+    # Calls slower than this count as slow; too many slow calls also trip the breaker
+    CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", "30"))
+    CIRCUIT_SLOW_CALL_RATE = float(os.getenv("CIRCUIT_SLOW_CALL_RATE", "0.5"))
+    CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+    CIRCUIT_HALF_OPEN_PROBES = int(os.getenv("CIRCUIT_HALF_OPEN_PROBES", "2"))
+    # Required in X-Admin-Token to force a circuit closed; empty disables the reset endpoint
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+    # ===== END NEW =====
+    
+    # ===== NEW: Hedged LLM Requests =====
+    # Duplicate a slow request to the other provider once it passes the task's latency percentile
+    LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "false").lower() == "true"
+    LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+    LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))  # no hedging until known
+    LLM_HEDGE_WINDOW = int(os.getenv("LLM_HEDGE_WINDOW", "200"))  # latencies kept per task
+    LLM_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "1.0"))
+    # Budget: at most this fraction of requests may be hedged (plus a small burst)
+    LLM_HEDGE_MAX_RATE = float(os.getenv("LLM_HEDGE_MAX_RATE", "0.05"))
+    LLM_HEDGE_BURST = float(os.getenv("LLM_HEDGE_BURST", "5"))
+    # ===== END NEW =====
+    
+    # ===== NEW: Token Budgets =====
+    # Output caps per task_type ("task:tokens,..."); Gemini 2.5 counts thinking tokens here too
+    LLM_MAX_OUTPUT_TOKENS = os.getenv(
+        "LLM_MAX_OUTPUT_TOKENS",
+        "evaluate:4096,evidence:2048,rewrite:4096,coherence:3072,pacing:2048,default:4096"
+    )
+    # Input budgets; oversized transcript text is trimmed at sentence boundaries
+    LLM_MAX_INPUT_TOKENS = os.getenv("LLM_MAX_INPUT_TOKENS", "coherence:24000,default:30000")
+    # ===== END NEW =====
+    
+    # ===== NEW: Gemini Context Caching =====
+    # Static prompt prefixes (evaluation rubric) are uploaded once as cachedContents
+    GEMINI_CONTEXT_CACHE_ENABLED = os.getenv("GEMINI_CONTEXT_CACHE_ENABLED", "true").lower() == "true"
+    GEMINI_CONTEXT_CACHE_TTL_SECONDS = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL_SECONDS", "3600"))
+    # Prefixes estimated below this are always sent inline. The provider enforces its own
+    # minimum (1024 real tokens for Flash); a rejected create also falls back to inline.
+    GEMINI_CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("GEMINI_CONTEXT_CACHE_MIN_TOKENS", "768"))
+    # ===== END NEW =====
+    
+    # ===== NEW: Audio Extraction =====
+    # Upload a mono low-bitrate speech track for transcription instead of the full video
+    AUDIO_EXTRACTION_ENABLED = os.getenv("AUDIO_EXTRACTION_ENABLED", "true").lower() == "true"
+    TRANSCRIBE_ORIGINAL_VIDEO = os.getenv("TRANSCRIBE_ORIGINAL_VIDEO", "false").lower() == "true"
+    FFMPEG_PATH = os.getenv("FFMPEG_PATH", "ffmpeg")
+    FFPROBE_PATH = os.getenv("FFPROBE_PATH", "ffprobe")
+    AUDIO_BITRATE = os.getenv("AUDIO_BITRATE", "24k")
+    AUDIO_SAMPLE_RATE = int(os.getenv("AUDIO_SAMPLE_RATE", "16000"))
+    AUDIO_EXTRACTION_TIMEOUT_SECONDS = float(os.getenv("AUDIO_EXTRACTION_TIMEOUT_SECONDS", "600"))
+    AUDIO_MAX_CONCURRENT_EXTRACTIONS = int(os.getenv("AUDIO_MAX_CONCURRENT_EXTRACTIONS", "2"))
+    # ===== END NEW =====
+    
+    # ===== NEW: Windowed Transcription =====
+    # Long recordings are cut into overlapping windows transcribed concurrently, then stitched
+    TRANSCRIPTION_WINDOWING_ENABLED = os.getenv("TRANSCRIPTION_WINDOWING_ENABLED", "true").lower() == "true"
+    TRANSCRIPTION_WINDOW_SECONDS = float(os.getenv("TRANSCRIPTION_WINDOW_SECONDS", "600"))
+    TRANSCRIPTION_WINDOW_OVERLAP_SECONDS = float(os.getenv("TRANSCRIPTION_WINDOW_OVERLAP_SECONDS", "15"))
+    TRANSCRIPTION_MAX_CONCURRENT_WINDOWS = int(os.getenv("TRANSCRIPTION_MAX_CONCURRENT_WINDOWS", "4"))
+    TRANSCRIPTION_WINDOW_RETRIES = int(os.getenv("TRANSCRIPTION_WINDOW_RETRIES", "2"))
+    # A cut-off transcription answer keeps its complete segments; only the missing tail is requested again
+    TRANSCRIPTION_TAIL_RETRIES = int(os.getenv("TRANSCRIPTION_TAIL_RETRIES", "2"))
+    # ===== END NEW =====
+    
+    # ===== NEW: Gemini Files Upload =====
+    # Recordings go up through an async resumable upload instead of the blocking SDK call
+    GEMINI_UPLOAD_CHUNK_BYTES = int(os.getenv("GEMINI_UPLOAD_CHUNK_BYTES", str(8 * 1024 * 1024)))
+    GEMINI_UPLOAD_MAX_RETRIES = int(os.getenv("GEMINI_UPLOAD_MAX_RETRIES", "3"))
+    GEMINI_UPLOAD_TIMEOUT_SECONDS = float(os.getenv("GEMINI_UPLOAD_TIMEOUT_SECONDS", "300"))
+    # File state is polled with backoff from the initial to the max interval
+    GEMINI_FILE_POLL_INITIAL_SECONDS = float(os.getenv("GEMINI_FILE_POLL_INITIAL_SECONDS", "0.5"))
+    GEMINI_FILE_POLL_MAX_SECONDS = float(os.getenv("GEMINI_FILE_POLL_MAX_SECONDS", "10"))
+    GEMINI_FILE_PROCESSING_TIMEOUT_SECONDS = float(os.getenv("GEMINI_FILE_PROCESSING_TIMEOUT_SECONDS", "600"))
+    # ===== END NEW =====
+    
+    # ===== NEW: Transcript Cache =====
+    # Transcripts are reused for recordings with the same content hash
+    TRANSCRIPT_CACHE_ENABLED = os.getenv("TRANSCRIPT_CACHE_ENABLED", "true").lower() == "true"
+    UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+    # ===== END NEW =====
+    
+    # ===== NEW: Evaluation Pipeline =====
+    # Bound of the queues between transcription, segmentation and evaluation
+    PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "64"))
+    # ===== END NEW =====
+    
+    # ===== NEW: Segmentation =====
+    # "greedy" splits at the first cue after 250 words; "dp" picks cost-optimal boundaries at
+    # cue words; "texttiling" picks cost-optimal boundaries at lexical cohesion valleys
+    SEGMENTATION_STRATEGY = os.getenv("SEGMENTATION_STRATEGY", "greedy").lower()
+    SEGMENTATION_TARGET_WORDS = int(os.getenv("SEGMENTATION_TARGET_WORDS", "400"))
+    # Cost credit for a boundary right before a topic-shift cue (in squared relative deviation)
+    SEGMENTATION_CUE_WEIGHT = float(os.getenv("SEGMENTATION_CUE_WEIGHT", "0.1"))
+    # Cost credit for the deepest cohesion valley ("texttiling"; shallower ones get less)
+    SEGMENTATION_COHESION_WEIGHT = float(os.getenv("SEGMENTATION_COHESION_WEIGHT", "0.3"))
+    # ===== END NEW =====
     
     # API Keys (Optional)
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
@@ -6,18 +6,28 @@ class Database:
     
     def __init__(self):
         self.client = None
-        
+    
     async def connect_to_database(self):
         """Connect to MongoDB"""
         self.client = AsyncIOMotorClient(settings.MONGODB_URL)
         print(f"Connected to MongoDB at {settings.MONGODB_URL}")
-        
+    
     async def close_database_connection(self):
         """Close MongoDB connection"""
         if self.client:
             self.client.close()
             print("Closed MongoDB connection")
     
+    async def ensure_indexes(self):
+        """Indexes for lookups on the evaluation path"""
+        try:
+            # Transcript cache: latest transcript of a recording made with the same settings
+            await self.get_collection("transcripts").create_index(
+                [("content_hash", 1), ("transcription_key", 1), ("created_at", -1)]
+            )
+        except Exception as e:
+            print(f"⚠️ Could not create transcript indexes: {e}")
+    
     def get_database(self):
         """Get database instance"""
         return self.client[settings.DATABASE_NAME]
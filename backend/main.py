@@ -1,18 +1,24 @@
 # main.py
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from db import db
 from routes import mentors, sessions, evaluations
-from routes import evidence, rewrites, coherence
+from routes import evidence, rewrites, coherence, admin
+from utils.llm_client import llm_client
+from utils.telemetry import metrics_registry
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     await db.connect_to_database()
+    await db.ensure_indexes()
+    await llm_client.start()
     yield
     # Shutdown
+    await llm_client.close()
     await db.close_database_connection()
 
 app = FastAPI(
@@ -41,6 +47,7 @@ app.include_router(evaluations.router)
 app.include_router(evidence.evidence_router)
 app.include_router(rewrites.rewrite_router)
 app.include_router(coherence.coherence_router)
+app.include_router(admin.admin_router)
 
 @app.get("/")
 async def root():
@@ -54,6 +61,11 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint (LLM latency histograms and counters)"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=7860)
\ No newline at end of file
@@ -67,6 +67,9 @@ class EvaluationInDB(EvaluationBase):
     llm_provider: str
     llm_model: str
     
+    # Prompt/completion tokens and LLM latency spent on this session, per task and provider
+    token_usage: Optional[dict] = None
+    
     class Config:
         populate_by_name = True
 
@@ -17,17 +17,24 @@ class SessionBase(BaseModel):
     duration: Optional[int] = None  # in seconds
 
 class SessionCreate(SessionBase):
-    video_filename: str
+    video_filename: Optional[str] = None
 
 class SessionInDB(SessionBase):
     id: str = Field(alias="_id")
-    video_filename: str
-    video_path: str
+    video_filename: Optional[str] = None  # sessions created from captions may have no video
+    video_path: Optional[str] = None
+    captions_filename: Optional[str] = None
+    captions_path: Optional[str] = None
+    captions_format: Optional[str] = None  # 'srt', 'vtt' or 'json'; the transcript comes from the captions
+    content_hash: Optional[str] = None  # sha256 of the recording, keys the transcript cache
     status: SessionStatus = SessionStatus.UPLOADED
     created_at: datetime
     updated_at: datetime
     transcript_id: Optional[str] = None
     evaluation_id: Optional[str] = None
+    media: Optional[dict] = None  # upload sizes/timings recorded during transcription
+    upload_progress: Optional[dict] = None  # stage and bytes sent while the recording goes to Gemini
+    pipeline: Optional[dict] = None  # seconds from start until each evaluation stage finished
     
     class Config:
         populate_by_name = True
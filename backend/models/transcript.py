@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
 class TranscriptSegment(BaseModel):
@@ -15,7 +15,11 @@ class TranscriptBase(BaseModel):
     segments: List[TranscriptSegment]
 
 class TranscriptCreate(TranscriptBase):
-    pass
+    # Transcript cache: recording hash, transcription settings and the raw transcription output
+    content_hash: Optional[str] = None
+    transcription_key: Optional[str] = None
+    source_segments: Optional[List[TranscriptSegment]] = None
+    reused_from: Optional[str] = None
 
 class TranscriptInDB(TranscriptBase):
     id: str = Field(alias="_id")
@@ -6,6 +6,7 @@ from . import evaluations
 from . import evidence
 from . import rewrites
 from . import coherence
+from . import admin
 # ===== END NEW =====
 
 __all__ = [
@@ -16,5 +17,6 @@ __all__ = [
     'evidence',
     'rewrites',
     'coherence',
+    'admin',
     # ===== END NEW =====
 ]
\ No newline at end of file
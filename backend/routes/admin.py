@@ -0,0 +1,40 @@
+import secrets
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Header
+
+from config import settings
+from utils.llm_client import llm_client
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """State-changing admin endpoints need ADMIN_TOKEN; without one configured they are off"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin actions are disabled (ADMIN_TOKEN not set)")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@router.get("/llm/stats")
+async def get_llm_stats():
+    """Runtime statistics for the shared LLM client"""
+    return llm_client.get_stats()
+
+@router.get("/llm/circuits")
+async def get_llm_circuits():
+    """Circuit breaker state and health score per LLM provider"""
+    breakers = llm_client.circuit_breakers
+    for provider in ('gemini', 'groq'):
+        breakers.for_provider(provider)
+    return breakers.get_stats()
+
+@router.post("/llm/circuits/{provider}/reset", dependencies=[Depends(require_admin_token)])
+async def reset_llm_circuit(provider: str):
+    """Force a provider's circuit back to closed"""
+    if provider not in ('gemini', 'groq'):
+        raise HTTPException(status_code=404, detail="Unknown provider")
+    breaker = llm_client.circuit_breakers.for_provider(provider)
+    breaker.reset()
+    return {"provider": provider, **breaker.snapshot()}
+
+# Create router instance for import
+admin_router = router
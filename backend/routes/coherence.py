@@ -7,11 +7,15 @@ from models.coherence import CoherenceReport
 from models.evaluation import SegmentEvaluation
 from db import get_db
 from services.coherence_checker import coherence_checker
+from utils.token_budget import token_usage
+from utils.rate_limiter import current_priority
 
 router = APIRouter(prefix="/api/coherence", tags=["coherence"])
 
 async def coherence_check_task(evaluation: dict, session: dict, db):
     """Background task for coherence checking"""
+    usage_scope = token_usage.start_session(str(session['_id']))
+    priority_scope = current_priority.set('bulk')
     try:
         # Reconstruct segments
         segments = [SegmentEvaluation(**seg) for seg in evaluation['segments']]
@@ -33,6 +37,9 @@ async def coherence_check_task(evaluation: dict, session: dict, db):
         
     except Exception as e:
         print(f"Coherence check failed: {e}")
+    finally:
+        current_priority.reset(priority_scope)
+        await token_usage.finish_session(str(session['_id']), usage_scope, db)
 
 @router.post("/check/{session_id}")
 async def check_coherence(
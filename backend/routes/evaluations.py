@@ -3,52 +3,193 @@ from typing import List
 from datetime import datetime
 from bson import ObjectId
 import asyncio
+import time
 
 from models.evaluation import EvaluationInDB, EvaluationSummary, SegmentEvaluation
-from models.transcript import TranscriptInDB, TranscriptCreate
+from models.transcript import TranscriptInDB, TranscriptCreate, TranscriptSegment
 from models.session import SessionStatus
 from db import get_db
 from services.transcription import transcription_service
 from services.segmentation import segmentation_service
 from services.llm_evaluator import llm_evaluator
-from services.scoring import scoring_service
+from services.scoring import scoring_service, ScoreMatrix
 from config import settings
+from utils.token_budget import token_usage
+from utils.rate_limiter import current_priority
+from utils.file_handler import hash_file
+from utils.telemetry import TRANSCRIPT_CACHE
 
 router = APIRouter(prefix="/api/evaluations", tags=["evaluations"])
 
-async def evaluate_single_segment(seg, topic, title, semaphore, index, total):
-    """Helper to evaluate a single segment with semaphore for rate limiting"""
-    async with semaphore:
-        print(f"Evaluating segment {index+1}/{total}")
-        try:
+def build_segment_evaluation(seg, eval_scores) -> SegmentEvaluation:
+    """Turn raw LLM scores for a segment into a scored SegmentEvaluation"""
+    seg_eval = SegmentEvaluation(
+        segment_id=seg.segment_id,
+        text=seg.text,
+        clarity=eval_scores['clarity'],
+        structure=eval_scores['structure'],
+        correctness=eval_scores['correctness'],
+        pacing=eval_scores['pacing'],
+        communication=eval_scores['communication'],
+        overall_segment_score=0.0
+    )
+    
+    seg_eval.overall_segment_score = scoring_service.compute_segment_score(seg_eval)
+    return seg_eval
+
+async def evaluate_single_segment(seg, topic, title, index, total, session_id=None, db=None):
+    """
+    Helper to evaluate a single segment (concurrency is governed by the shared LLM rate limiter)
+    With streaming enabled, each metric is written to the session's partial_scores as it arrives
+    """
+    print(f"Evaluating segment {index+1}/{total or '?'}")
+    try:
+        if settings.LLM_STREAMING_ENABLED and db is not None:
+            async def persist_metric(metric, score_detail):
+                await db.sessions.update_one(
+                    {"_id": ObjectId(session_id)},
+                    {"$set": {f"partial_scores.{seg.segment_id}.{metric}": score_detail.score}}
+                )
+            
+            eval_scores = await llm_evaluator.evaluate_segment_streaming(
+                seg.text,
+                topic,
+                title,
+                on_metric=persist_metric
+            )
+        else:
             eval_scores = await llm_evaluator.evaluate_segment(
                 seg.text,
                 topic,
                 title
             )
+        
+        seg_eval = build_segment_evaluation(seg, eval_scores)
+        print(f"✅ Segment {index+1} finished: score = {seg_eval.overall_segment_score}")
+        return seg_eval
+    except Exception as e:
+        print(f"❌ Error evaluating segment {index+1}: {e}")
+        # Return a basic failed structure or re-raise depending on strictness
+        # Here we let the main loop handle exceptions or return None
+        return None
+
+async def evaluate_segments_batched(logical_segments, topic, title):
+    """Evaluate all segments through LLMEvaluator.evaluate_batch, preserving segment order"""
+    try:
+        scores_by_id = await llm_evaluator.evaluate_batch(logical_segments, topic, title)
+    except Exception as e:
+        print(f"❌ Batch evaluation failed: {e}")
+        return [None] * len(logical_segments)
+    
+    results = []
+    for seg in logical_segments:
+        eval_scores = scores_by_id.get(seg.segment_id)
+        results.append(build_segment_evaluation(seg, eval_scores) if eval_scores else None)
+    return results
+
+async def find_cached_transcript(db, content_hash: str, transcription_key: str):
+    """Latest transcript of a recording with the same content, made with the same settings"""
+    return await db.transcripts.find_one(
+        {
+            "content_hash": content_hash,
+            "transcription_key": transcription_key,
+            "source_segments": {"$ne": None},
+        },
+        sort=[("created_at", -1)]
+    )
+
+async def acquire_transcript(
+    db,
+    session: dict,
+    use_original_video: bool,
+    force_transcription: bool,
+    media_stats: dict,
+    on_segments=None
+) -> dict:
+    """
+    Raw transcript of a session: parsed from its captions, reused from the
+    transcript cache, or transcribed. Segments are also handed to on_segments
+    in timeline order as they become available.
+    """
+    session_id = str(session['_id'])
+    transcription_key = content_hash = None
+    if session.get('captions_path'):
+        # Captions came with the session: the transcript is parsed, never transcribed
+        full_text, segments = await transcription_service.transcribe_captions(
+            session['captions_path'],
+            session.get('captions_format')
+        )
+        media_stats['transcript_source'] = 'captions'
+        if on_segments is not None:
+            await on_segments(segments)
+    else:
+        media_stats['transcript_source'] = 'transcription'
+        transcription_key = transcription_service.transcription_key(use_original_video or None)
+        content_hash = session.get('content_hash')
+        if content_hash is None and settings.TRANSCRIPT_CACHE_ENABLED:
+            # Sessions uploaded before recordings were hashed
+            try:
+                content_hash = await asyncio.to_thread(hash_file, session['video_path'])
+            except OSError as e:
+                # Missing or unreadable recording: skip the cache, transcription handles it (mock fallback)
+                print(f"⚠️ Could not hash {session['video_path']}, transcript cache skipped: {e}")
+            else:
+                await db.sessions.update_one({"_id": ObjectId(session_id)}, {"$set": {"content_hash": content_hash}})
+        
+        # Same recording transcribed before with the same settings: reuse it
+        cached_transcript = None
+        if settings.TRANSCRIPT_CACHE_ENABLED and not force_transcription and content_hash is not None:
+            cached_transcript = await find_cached_transcript(db, content_hash, transcription_key)
+        
+        if cached_transcript is not None:
+            full_text = cached_transcript['full_text']
+            segments = [TranscriptSegment(**seg) for seg in cached_transcript['source_segments']]
+            media_stats['transcript_cache'] = 'hit'
+            media_stats['reused_transcript_id'] = str(cached_transcript['_id'])
+            print(f"♻️ Reusing transcript {cached_transcript['_id']} ({len(segments)} segments)")
+            if on_segments is not None:
+                await on_segments(segments)
+        else:
+            # Transcribe video (only its speech track is uploaded unless asked otherwise)
+            print(f"Transcribing video: {session['video_path']}")
             
-            seg_eval = SegmentEvaluation(
-                segment_id=seg.segment_id,
-                text=seg.text,
-                clarity=eval_scores['clarity'],
-                structure=eval_scores['structure'],
-                correctness=eval_scores['correctness'],
-                pacing=eval_scores['pacing'],
-                communication=eval_scores['communication'],
-                overall_segment_score=0.0
-            )
+            async def record_upload_progress(progress: dict):
+                await db.sessions.update_one(
+                    {"_id": ObjectId(session_id)},
+                    {"$set": {"upload_progress": progress, "updated_at": datetime.utcnow()}}
+                )
             
-            seg_eval.overall_segment_score = scoring_service.compute_segment_score(seg_eval)
-            print(f"✅ Segment {index+1} finished: score = {seg_eval.overall_segment_score}")
-            return seg_eval
-        except Exception as e:
-            print(f"❌ Error evaluating segment {index+1}: {e}")
-            # Return a basic failed structure or re-raise depending on strictness
-            # Here we let the main loop handle exceptions or return None
-            return None
+            full_text, segments = await transcription_service.transcribe_video(
+                session['video_path'],
+                use_original_video=use_original_video or None,
+                media_stats=media_stats,
+                on_progress=record_upload_progress,
+                on_segments=on_segments
+            )
+            # Stored under what actually ran: the lookup key assumed the speech track
+            transcription_key = transcription_service.transcription_key(use_original_video or None, media_stats)
+            media_stats['transcript_cache'] = 'refresh' if force_transcription else 'miss'
+            print(f"Transcription complete: {len(segments)} segments")
+        TRANSCRIPT_CACHE.inc(outcome=media_stats['transcript_cache'])
+    
+    return {
+        'full_text': full_text,
+        'segments': segments,
+        'content_hash': content_hash,
+        'transcription_key': transcription_key,
+    }
 
-async def process_evaluation(session_id: str, db):
+async def process_evaluation(
+    session_id: str,
+    db,
+    use_original_video: bool = False,
+    force_transcription: bool = False
+):
     """Background task to process evaluation"""
+    # Every LLM call below is accounted to this session and stored on the evaluation
+    usage_scope = token_usage.start_session(session_id)
+    # Segment evaluations yield to interactive requests in the provider queues
+    priority_scope = current_priority.set('bulk')
     try:
         # Get session
         session = await db.sessions.find_one({"_id": ObjectId(session_id)})
@@ -65,22 +206,96 @@ async def process_evaluation(session_id: str, db):
             {"$set": {"status": SessionStatus.TRANSCRIBING, "updated_at": datetime.utcnow()}}
         )
         
-        # Transcribe video
-        print(f"Transcribing video: {session['video_path']}")
-        full_text, segments = await transcription_service.transcribe_video(
-            session['video_path']
-        )
-        print(f"Transcription complete: {len(segments)} segments")
+        media_stats = {}
+        topic = session.get('topic', 'Unknown Topic')
+        title = session.get('title', '')
+        print(f"⚠️ IMPORTANT: Validating content against topic '{session['topic']}'")
         
-        # Segment transcript
-        logical_segments = segmentation_service.segment_transcript(segments)
+        # Streaming pipeline: transcription → segmentation → evaluation, joined by bounded
+        # queues so a logical segment is evaluated as soon as it closes
+        raw_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.PIPELINE_QUEUE_SIZE)
+        logical_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.PIPELINE_QUEUE_SIZE)
+        logical_segments = []
+        evaluation_tasks = []
+        timings = {}
+        started = time.monotonic()
+        
+        async def transcribe_stage():
+            async def enqueue(batch):
+                for seg in batch:
+                    await raw_queue.put(seg)
+            
+            transcript = await acquire_transcript(
+                db, session, use_original_video, force_transcription, media_stats, on_segments=enqueue
+            )
+            await raw_queue.put(None)
+            timings['transcription_seconds'] = round(time.monotonic() - started, 2)
+            return transcript
+        
+        async def segment_stage():
+            segmenter = segmentation_service.stream()
+            while True:
+                seg = await raw_queue.get()
+                if seg is None:
+                    break
+                for logical in segmenter.feed(seg):
+                    await logical_queue.put(logical)
+            for logical in segmenter.close():
+                await logical_queue.put(logical)
+            await logical_queue.put(None)
+            timings['segmentation_seconds'] = round(time.monotonic() - started, 2)
+        
+        async def evaluate_stage():
+            batch = []
+            while True:
+                seg = await logical_queue.get()
+                if seg is None:
+                    break
+                if not logical_segments:
+                    timings['first_dispatch_seconds'] = round(time.monotonic() - started, 2)
+                logical_segments.append(seg)
+                
+                if settings.EVAL_BATCH_ENABLED:
+                    # BATCHED EXECUTION: several segments per request, one rubric per batch
+                    batch.append(seg)
+                    if len(batch) >= settings.EVAL_BATCH_MAX_SEGMENTS:
+                        evaluation_tasks.append(asyncio.create_task(evaluate_segments_batched(batch, topic, title)))
+                        batch = []
+                else:
+                    # PARALLEL EXECUTION
+                    # The LLM client's per-provider rate limiter adapts concurrency to the
+                    # provider's quota, so every segment is submitted as soon as it closes
+                    evaluation_tasks.append(asyncio.create_task(evaluate_single_segment(
+                        seg, topic, title, len(logical_segments) - 1, None, session_id=session_id, db=db
+                    )))
+            if batch:
+                evaluation_tasks.append(asyncio.create_task(evaluate_segments_batched(batch, topic, title)))
+        
+        stage_tasks = [
+            asyncio.create_task(transcribe_stage()),
+            asyncio.create_task(segment_stage()),
+            asyncio.create_task(evaluate_stage()),
+        ]
+        try:
+            transcript, _, _ = await asyncio.gather(*stage_tasks)
+        except Exception:
+            # One stage failed: stop the others and every evaluation already dispatched
+            for task in stage_tasks + evaluation_tasks:
+                task.cancel()
+            await asyncio.gather(*stage_tasks, *evaluation_tasks, return_exceptions=True)
+            raise
         print(f"Segmentation complete: {len(logical_segments)} logical segments")
         
         # Save transcript
+        # Mock transcripts are never offered to the cache
         transcript_dict = TranscriptCreate(
             session_id=session_id,
-            full_text=full_text,
-            segments=logical_segments
+            full_text=transcript['full_text'],
+            segments=logical_segments,
+            content_hash=None if media_stats.get('mock') else transcript['content_hash'],
+            transcription_key=transcript['transcription_key'],
+            source_segments=transcript['segments'],
+            reused_from=media_stats.get('reused_transcript_id')
         ).model_dump()
         transcript_dict['created_at'] = datetime.utcnow()
         
@@ -88,7 +303,7 @@ async def process_evaluation(session_id: str, db):
         transcript_id = str(transcript_result.inserted_id)
         print(f"Transcript saved: {transcript_id}")
         
-        # Update session with transcript
+        # Update session with transcript (evaluations may still be running)
         await db.sessions.update_one(
             {"_id": ObjectId(session_id)},
             {
@@ -96,35 +311,26 @@ async def process_evaluation(session_id: str, db):
                     "status": SessionStatus.ANALYZING,
                     "transcript_id": transcript_id,
                     "duration": int(logical_segments[-1].end_time) if logical_segments else 0,
+                    "media": media_stats,
                     "updated_at": datetime.utcnow()
                 }
             }
         )
         
-        # Evaluate each segment WITH TOPIC AND TITLE
-        print(f"Starting LLM evaluation for {len(logical_segments)} segments")
-        print(f"⚠️ IMPORTANT: Validating content against topic '{session['topic']}'")
-        
-        topic = session.get('topic', 'Unknown Topic')
-        title = session.get('title', '')
-        
-        # PARALLEL EXECUTION with Semaphore
-        # Limit to 5 concurrent LLM calls to prevent RateLimitError
-        semaphore = asyncio.Semaphore(5)
-        tasks = []
-        for i, seg in enumerate(logical_segments):
-            task = evaluate_single_segment(seg, topic, title, semaphore, i, len(logical_segments))
-            tasks.append(task)
-            
-        # Wait for all segments to be processed
-        results = await asyncio.gather(*tasks)
+        # Wait for all segments to be processed (batches come back as lists, in segment order)
+        print(f"Waiting for LLM evaluation of {len(logical_segments)} segments")
+        results = []
+        for result in await asyncio.gather(*evaluation_tasks):
+            results.extend(result if isinstance(result, list) else [result])
+        timings['total_seconds'] = round(time.monotonic() - started, 2)
+        print(f"⏱️ Pipeline timings: {timings}")
         
         # Filter out failed evaluations (None)
         segment_evaluations = [res for res in results if res is not None]
         
         if len(segment_evaluations) != len(logical_segments):
             print(f"⚠️ Warning: {len(logical_segments) - len(segment_evaluations)} segments failed evaluation")
-
+        
         # Check for off-topic content logging
         for i, seg_eval in enumerate(segment_evaluations):
             if seg_eval.correctness.score < 3.0 and "OFF-TOPIC" in seg_eval.correctness.reason:
@@ -174,8 +380,11 @@ async def process_evaluation(session_id: str, db):
                 "$set": {
                     "status": SessionStatus.COMPLETED,
                     "evaluation_id": evaluation_id,
+                    "pipeline": timings,
                     "updated_at": datetime.utcnow()
-                }
+                },
+                # Streamed partial scores are superseded by the saved evaluation
+                "$unset": {"partial_scores": ""}
             }
         )
         
@@ -196,7 +405,7 @@ async def process_evaluation(session_id: str, db):
             print(f"Updated mentor average score: {avg_score}")
         
         print(f"Evaluation complete for session {session_id}")
-        
+    
     except Exception as e:
         print(f"❌ Evaluation processing error for session {session_id}: {e}")
         import traceback
@@ -210,14 +419,24 @@ async def process_evaluation(session_id: str, db):
             )
         except Exception as update_error:
             print(f"Error updating session status to failed: {update_error}")
+    finally:
+        current_priority.reset(priority_scope)
+        await token_usage.finish_session(session_id, usage_scope, db)
 
 @router.post("/sessions/{session_id}/evaluate")
 async def start_evaluation(
     session_id: str,
     background_tasks: BackgroundTasks,
+    use_original_video: bool = False,
+    force_transcription: bool = False,
     db=Depends(get_db)
 ):
-    """Start evaluation for a session"""
+    """
+    Start evaluation for a session
+    
+    use_original_video uploads the video instead of its speech track;
+    force_transcription skips the transcript cache and transcribes again.
+    """
     try:
         session = await db.sessions.find_one({"_id": ObjectId(session_id)})
         if not session:
@@ -236,7 +455,7 @@ async def start_evaluation(
             }
         
         # Add background task
-        background_tasks.add_task(process_evaluation, session_id, db)
+        background_tasks.add_task(process_evaluation, session_id, db, use_original_video, force_transcription)
         
         return {
             "message": "Evaluation started",
@@ -289,12 +508,9 @@ async def get_evaluation_summary(evaluation_id: str, db=Depends(get_db)):
         if not evaluation:
             raise HTTPException(status_code=404, detail="Evaluation not found")
         
-        # Reconstruct segment evaluations
-        segment_evals = [SegmentEvaluation(**seg) for seg in evaluation['segments']]
-        
-        # Get strengths and weaknesses
+        # Get strengths and weaknesses straight from the stored scores
         strengths, weaknesses = scoring_service.identify_strengths_and_weaknesses(
-            segment_evals
+            ScoreMatrix.from_documents(evaluation['segments'])
         )
         
         return EvaluationSummary(
@@ -326,8 +542,9 @@ async def list_evaluations(mentor_id: str = None, db=Depends(get_db)):
         
         evaluations = []
         async for evaluation in db.evaluations.find(query).sort('created_at', -1):
-            segment_evals = [SegmentEvaluation(**seg) for seg in evaluation['segments']]
-            strengths, weaknesses = scoring_service.identify_strengths_and_weaknesses(segment_evals)
+            strengths, weaknesses = scoring_service.identify_strengths_and_weaknesses(
+                ScoreMatrix.from_documents(evaluation['segments'])
+            )
             
             evaluations.append(EvaluationSummary(
                 evaluation_id=str(evaluation['_id']),
@@ -7,11 +7,13 @@ from models.evidence import EvidenceCollection, EvidenceItem
 from models.evaluation import SegmentEvaluation
 from db import get_db
 from services.evidence_extractor import evidence_extractor
+from utils.token_budget import token_usage
 
 router = APIRouter(prefix="/api/evidence", tags=["evidence"])
 
 async def extract_evidence_task(evaluation_id: str, evaluation: dict, db):
     """Background task to extract evidence"""
+    usage_scope = token_usage.start_session(evaluation['session_id'])
     try:
         # Reconstruct segments
         segments = [SegmentEvaluation(**seg) for seg in evaluation['segments']]
@@ -37,6 +39,8 @@ async def extract_evidence_task(evaluation_id: str, evaluation: dict, db):
         
     except Exception as e:
         print(f"Evidence extraction failed: {e}")
+    finally:
+        await token_usage.finish_session(evaluation['session_id'], usage_scope, db)
 
 @router.post("/extract/{evaluation_id}")
 async def extract_evidence(
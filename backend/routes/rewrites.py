@@ -9,11 +9,16 @@ from models.rewrite import RewriteCollection, RewriteSuggestion
 from models.evaluation import SegmentEvaluation
 from db import get_db
 from services.explanation_rewriter import explanation_rewriter
+from utils.token_budget import token_usage
+from utils.rate_limiter import current_priority
 
 router = APIRouter(prefix="/api/rewrites", tags=["rewrites"])
 
 async def rewrite_segment_task(segment, session_id: str, db):
     """Background task to rewrite segment"""
+    usage_scope = token_usage.start_session(session_id)
+    # A user is waiting on this one: it goes ahead of background evaluations
+    priority_scope = current_priority.set('interactive')
     try:
         # Get session for topic context
         session = await db.sessions.find_one({"_id": ObjectId(session_id)})
@@ -35,9 +40,14 @@ async def rewrite_segment_task(segment, session_id: str, db):
             await db.rewrites.insert_one(rewrite_doc)
     except Exception as e:
         print(f"Rewrite failed: {e}")
+    finally:
+        current_priority.reset(priority_scope)
+        await token_usage.finish_session(session_id, usage_scope, db)
 
 async def batch_rewrite_task(evaluation: dict, session: dict, db):
     """Background task for batch rewrite"""
+    usage_scope = token_usage.start_session(str(session['_id']))
+    priority_scope = current_priority.set('bulk')
     try:
         # Reconstruct segments
         segments = [SegmentEvaluation(**seg) for seg in evaluation['segments']]
@@ -61,6 +71,9 @@ async def batch_rewrite_task(evaluation: dict, session: dict, db):
             
     except Exception as e:
         print(f"Batch rewrite failed: {e}")
+    finally:
+        current_priority.reset(priority_scope)
+        await token_usage.finish_session(str(session['_id']), usage_scope, db)
 
 @router.post("/segment/{segment_id}")
 async def rewrite_segment(
@@ -5,7 +5,8 @@ from bson import ObjectId
 
 from models.session import SessionInDB, SessionStatus, SessionUpdate
 from db import get_db
-from utils.file_handler import save_upload_file
+from utils.file_handler import save_upload_file, delete_file
+from utils.captions import sniff_format, load_caption_segments, CaptionParseError
 
 router = APIRouter(prefix="/api/sessions", tags=["sessions"])
 
@@ -15,13 +16,35 @@ async def create_session(
     mentor_id: str = Form(...),
     title: str = Form(...),
     topic: str = Form(...),
-    video: UploadFile = File(...),
+    video: Optional[UploadFile] = File(None),
+    captions: Optional[UploadFile] = File(None),
     db=Depends(get_db)
 ):
-    """Create a new session with video upload"""
+    """
+    Create a new session with a video and/or a caption file
+    
+    With SRT/VTT/JSON captions the transcript is built from them and the
+    recording is never transcribed; the video is then optional.
+    """
+    if video is None and captions is None:
+        raise HTTPException(status_code=400, detail="Upload a video or a caption file (SRT, VTT or JSON)")
+    
+    saved_paths = []
     try:
-        # Save video file
-        filename, filepath = await save_upload_file(video, prefix="session_")
+        filename = filepath = content_hash = None
+        if video is not None:
+            # Save video file
+            filename, filepath, content_hash = await save_upload_file(video, prefix="session_")
+            saved_paths.append(filepath)
+        
+        captions_filename = captions_path = captions_format = None
+        if captions is not None:
+            captions_filename, captions_path, _ = await save_upload_file(captions, prefix="captions_")
+            saved_paths.append(captions_path)
+            # Parse once now so a broken file is rejected at upload, not mid-evaluation
+            # Unknown extensions (.txt, none) are recognised from the content
+            captions_format = await sniff_format(captions_path, captions.filename)
+            await load_caption_segments(captions_path, captions_format)
         
         session_dict = {
             'mentor_id': mentor_id,
@@ -29,6 +52,10 @@ async def create_session(
             'topic': topic,
             'video_filename': filename,
             'video_path': filepath,
+            'content_hash': content_hash,
+            'captions_filename': captions_filename,
+            'captions_path': captions_path,
+            'captions_format': captions_format,
             'status': SessionStatus.UPLOADED,
             'created_at': datetime.utcnow(),
             'updated_at': datetime.utcnow(),
@@ -48,6 +75,10 @@ async def create_session(
         
         return SessionInDB(**session_dict)
     except Exception as e:
+        for path in saved_paths:
+            delete_file(path)
+        if isinstance(e, CaptionParseError):
+            raise HTTPException(status_code=400, detail=f"Invalid caption file: {e}")
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/", response_model=List[SessionInDB])
@@ -0,0 +1,115 @@
+"""
+Measure the input-token saving of Gemini context caching on the evaluation rubric
+
+Runs one simulated session (N segments, single and batched evaluation) twice
+against the local LLM stand-in: once with the rubric sent inline, once with it
+served from a cachedContents handle. Reports prompt tokens sent per session and
+the share billed at the cached rate.
+
+Usage:
+    python scripts/benchmark_context_cache.py --segments 35
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+def start_standin(port: int):
+    """Run scripts/llm_standin.py in a background thread"""
+    import uvicorn
+    from scripts.llm_standin import StandInConfig, create_app, parse_args
+    
+    config = StandInConfig(parse_args(["--port", str(port), "--latency", "fixed:0.01"]))
+    server = uvicorn.Server(uvicorn.Config(create_app(config), host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+SAMPLE_SENTENCES = [
+    "A list comprehension builds a new list by applying an expression to each item.",
+    "Think of the generator as a recipe that only cooks when you ask for the next dish.",
+    "Notice that the loop variable leaks out of a for loop but not out of a comprehension.",
+    "Can anyone tell me what happens if the iterable is empty?",
+    "We use a dictionary here because lookups by key are constant time on average.",
+]
+
+async def run_session(segments: int, batched: bool):
+    from services.llm_evaluator import llm_evaluator
+    from models.transcript import TranscriptSegment
+    from utils.token_budget import token_usage
+    
+    before = dict(token_usage.totals)
+    texts = [
+        " ".join(SAMPLE_SENTENCES[(index + offset) % len(SAMPLE_SENTENCES)] for offset in range(3))
+        for index in range(segments)
+    ]
+    if batched:
+        batch = [
+            TranscriptSegment(segment_id=index, text=text, start_time=index * 10.0, end_time=index * 10.0 + 10.0, confidence=1.0)
+            for index, text in enumerate(texts)
+        ]
+        await llm_evaluator.evaluate_batch(batch, "Python iteration", "")
+    else:
+        for text in texts:
+            await llm_evaluator.evaluate_segment(text, "Python iteration", "")
+    
+    return {
+        key: token_usage.totals[key] - before[key]
+        for key in ('calls', 'prompt_tokens', 'cached_prompt_tokens', 'completion_tokens')
+    }
+
+async def main(args):
+    from utils.llm_client import llm_client
+    from utils.context_cache import context_cache
+    
+    print(f"{'mode':<10} {'caching':<8} {'calls':>6} {'prompt':>9} {'cached':>9} {'uncached':>9}")
+    results = {}
+    for batched in (False, True):
+        mode = 'batched' if batched else 'single'
+        for enabled in (False, True):
+            context_cache.enabled = enabled
+            usage = await run_session(args.segments, batched)
+            uncached = usage['prompt_tokens'] - usage['cached_prompt_tokens']
+            results[(mode, enabled)] = uncached
+            print(
+                f"{mode:<10} {'on' if enabled else 'off':<8} {usage['calls']:>6} "
+                f"{usage['prompt_tokens']:>9} {usage['cached_prompt_tokens']:>9} {uncached:>9}"
+            )
+    
+    for mode in ('single', 'batched'):
+        inline, cached = results[(mode, False)], results[(mode, True)]
+        if inline:
+            print(f"{mode}: uncached input tokens per session reduced by {100 * (1 - cached / inline):.1f}%")
+    print(f"Context cache: {context_cache.get_stats()}")
+    await llm_client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Gemini context caching of the evaluation rubric")
+    parser.add_argument("--segments", type=int, default=35)
+    parser.add_argument("--port", type=int, default=8097)
+    args = parser.parse_args()
+    
+    # Must be set before the backend modules read their settings
+    base_url = f"http://127.0.0.1:{args.port}"
+    os.environ.update({
+        "GEMINI_BASE_URL": base_url,
+        "GROQ_BASE_URL": base_url,
+        "GOOGLE_API_KEY": os.environ.get("GOOGLE_API_KEY") or "stand-in",
+        "GROQ_API_KEY": os.environ.get("GROQ_API_KEY") or "stand-in",
+        "LLM_CACHE_ENABLED": "false",
+        "FALLBACK_TO_MOCK": "false",
+        "EVAL_BATCH_MAX_SEGMENTS": str(args.segments),
+        "EVAL_BATCH_TOKEN_BUDGET": "1000000",
+        "GEMINI_REQUESTS_PER_MINUTE": "100000",
+    })
+    
+    start_standin(args.port)
+    asyncio.run(main(args))
@@ -0,0 +1,138 @@
+"""
+Time the ScoreMatrix-backed ScoringService against per-metric Python loops
+
+Generates stored evaluations the way the evaluations collection holds them
+(~35 segments each, advanced metrics missing on a share of older ones) and
+runs what GET /api/evaluations does for every evaluation: strengths and
+weaknesses, plus the per-segment, overall and topic-alignment aggregates of
+process_evaluation. The loop version reconstructs SegmentEvaluation objects
+and makes one pass per metric, as ScoringService did before the matrix.
+Results are checked to be identical.
+
+Usage:
+    python scripts/benchmark_scoring.py --evaluations 2000 --segments 35
+"""
+import argparse
+import random
+import sys
+import time
+import types
+from pathlib import Path
+
+# Add backend to path
+BACKEND = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND))
+
+# services/__init__ imports every service, and evidence_extractor.py does not define
+# evidence_extractor yet; register the package without running it, as tests/conftest.py does
+services = types.ModuleType("services")
+services.__path__ = [str(BACKEND / "services")]
+sys.modules.setdefault("services", services)
+
+CORE = ('clarity', 'structure', 'correctness', 'pacing', 'communication')
+ADVANCED = ('engagement', 'examples', 'questioning', 'adaptability', 'relevance')
+
+def build_evaluations(count: int, segments: int, legacy_share: float, seed: int):
+    rng = random.Random(seed)
+    evaluations = []
+    for _ in range(count):
+        # Older evaluations predate the advanced metrics
+        metrics = CORE if rng.random() < legacy_share else CORE + ADVANCED
+        level = rng.uniform(5.0, 9.0)
+        evaluations.append([
+            dict(
+                {m: {'score': round(min(10.0, max(1.0, rng.gauss(level, 1.2))), 1), 'reason': 'ok', 'evidence': []} for m in metrics},
+                segment_id=i, text='...', overall_segment_score=0.0
+            )
+            for i in range(segments)
+        ])
+    return evaluations
+
+class LoopScoring:
+    """The per-metric passes ScoringService made before ScoreMatrix"""
+    
+    def __init__(self, weights):
+        self.weights = weights
+    
+    def segment_score(self, seg):
+        score = sum(getattr(seg, m).score * self.weights[m] for m in CORE)
+        for m in ADVANCED:
+            if getattr(seg, m):
+                score += getattr(seg, m).score * self.weights[m]
+        return round(score, 2)
+    
+    def overall_metrics(self, segments):
+        from models.evaluation import Metrics
+        
+        n = len(segments)
+        means = {m: round(sum(getattr(s, m).score for s in segments) / n, 2) for m in CORE}
+        for m in ADVANCED:
+            scores = [getattr(s, m).score for s in segments if getattr(s, m)]
+            means[m] = round(sum(scores) / len(scores), 2) if scores else None
+        return Metrics(**means)
+    
+    def strengths_and_weaknesses(self, segments, names):
+        means = self.overall_metrics(segments).model_dump()
+        strengths = [f"{names[m]} (score: {means[m]})" for m in names if means[m] is not None and means[m] >= 8.0]
+        weaknesses = [f"{names[m]} (score: {means[m]})" for m in names if means[m] is not None and means[m] < 6.5]
+        return strengths, weaknesses
+    
+    def drift(self, segments):
+        return [
+            {'segment_id': i, 'score': s.relevance.score}
+            for i, s in enumerate(segments) if s.relevance and s.relevance.score < 6.0
+        ]
+
+def main(args):
+    from models.evaluation import SegmentEvaluation
+    from services.scoring import ScoringService, ScoreMatrix
+    
+    service = ScoringService()
+    loop = LoopScoring(service.weights)
+    documents = build_evaluations(args.evaluations, args.segments, args.legacy_share, args.seed)
+    print(f"{args.evaluations} evaluations × {args.segments} segments")
+    
+    # Listing: strengths and weaknesses of every stored evaluation
+    started = time.perf_counter()
+    loop_listing = [
+        loop.strengths_and_weaknesses([SegmentEvaluation(**seg) for seg in segs], service.metric_names)
+        for segs in documents
+    ]
+    loop_seconds = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    matrix_listing = [service.identify_strengths_and_weaknesses(ScoreMatrix.from_documents(segs)) for segs in documents]
+    matrix_seconds = time.perf_counter() - started
+    print(f"listing     loops {loop_seconds * 1000:9.1f} ms   matrix {matrix_seconds * 1000:9.1f} ms   "
+          f"speed-up {loop_seconds / matrix_seconds:5.1f}x   identical {loop_listing == matrix_listing}")
+    
+    # Aggregates on already-built segment objects (process_evaluation)
+    objects = [[SegmentEvaluation(**seg) for seg in segs] for segs in documents]
+    started = time.perf_counter()
+    loop_results = [
+        ([loop.segment_score(s) for s in segs], loop.overall_metrics(segs).model_dump(), loop.drift(segs))
+        for segs in objects
+    ]
+    loop_seconds = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    matrix_results = []
+    for segs in objects:
+        matrix = ScoreMatrix.from_segments(segs)
+        drift = service.analyze_topic_alignment(matrix, 'python')['topic_drift_segments']
+        matrix_results.append((
+            service.compute_segment_scores(matrix),
+            service.compute_overall_metrics(matrix).model_dump(),
+            [{'segment_id': d['segment_id'], 'score': d['score']} for d in drift]
+        ))
+    matrix_seconds = time.perf_counter() - started
+    print(f"aggregates  loops {loop_seconds * 1000:9.1f} ms   matrix {matrix_seconds * 1000:9.1f} ms   "
+          f"speed-up {loop_seconds / matrix_seconds:5.1f}x   identical {loop_results == matrix_results}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark vectorized ScoringService aggregates")
+    parser.add_argument("--evaluations", type=int, default=2000)
+    parser.add_argument("--segments", type=int, default=35, help="segments per evaluation (~35 for 90 minutes)")
+    parser.add_argument("--legacy-share", type=float, default=0.3, help="share of evaluations without advanced metrics")
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
@@ -0,0 +1,137 @@
+"""
+Compare the segmentation strategies on synthetic lecture transcripts
+
+Builds a transcript of about 13,000 words (a 90-minute session) out of raw
+segments of the sizes Gemini or platform captions produce, with topic-shift
+cues at the start of some segments. The lecture moves through topics of
+200-700 words, each with its own vocabulary on top of shared filler. Reports
+run time, how even the logical segments are (evaluation latency follows
+segment length) and how well boundaries match the topic changes: precision is
+the share of boundaries within one raw segment of a topic change, recall the
+share of topic changes that got such a boundary. Rows marked ~ run the
+strategy incrementally with its bounded lookahead window.
+
+Usage:
+    python scripts/benchmark_segmentation.py --words 13000 --raw-words 15:90
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+import types
+from pathlib import Path
+
+# Add backend to path
+BACKEND = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND))
+
+# services/__init__ imports every service, and evidence_extractor.py does not define
+# evidence_extractor yet; register the package without running it, as tests/conftest.py does
+services = types.ModuleType("services")
+services.__path__ = [str(BACKEND / "services")]
+sys.modules.setdefault("services", services)
+
+FILLER = (
+    "the list comprehension builds a new list from every item of the iterable and "
+    "the loop variable stays inside the expression while the generator only yields "
+    "values on demand which keeps memory flat for large inputs in python code"
+).split()
+CUES = ["now", "next", "moving on", "let's", "okay so", "to summarize", "another example"]
+
+def build_transcript(total_words: int, raw_min: int, raw_max: int, cue_rate: float, seed: int):
+    """Raw segments plus the indices of the raw segments that open a new topic"""
+    from models.transcript import TranscriptSegment
+    
+    rng = random.Random(seed)
+    segments = []
+    topic_starts = []
+    words = 0
+    topic_left = 0
+    clock = 0.0
+    while words < total_words:
+        if topic_left <= 0:
+            topic = len(topic_starts)
+            topic_starts.append(len(segments))
+            topic_left = rng.randint(200, 700)
+        size = rng.randint(raw_min, raw_max)
+        body = [
+            f"topic{topic}term{rng.randint(0, 24)}" if rng.random() < 0.3 else rng.choice(FILLER)
+            for _ in range(size)
+        ]
+        topic_left -= size
+        if rng.random() < cue_rate:
+            body = rng.choice(CUES).split() + body
+        text = " ".join(body).capitalize() + "."
+        duration = len(body) / 2.5  # ~150 words per minute
+        segments.append(TranscriptSegment(
+            segment_id=len(segments), text=text, start_time=round(clock, 2), end_time=round(clock + duration, 2)
+        ))
+        clock += duration
+        words += len(body)
+    return segments, set(topic_starts[1:])
+
+def describe(name: str, raw, logical, seconds: float, cue_pattern, topic_starts):
+    sizes = [len(seg.text.split()) for seg in logical]
+    at_cue = sum(1 for seg in logical[1:] if cue_pattern.search(" ".join(seg.text.lower().split()[:8])))
+    
+    # Raw index each logical boundary falls on, recovered from start times
+    raw_index = {seg.start_time: index for index, seg in enumerate(raw)}
+    boundaries = [raw_index[seg.start_time] for seg in logical[1:]]
+    near_topic = sum(1 for b in boundaries if {b - 1, b, b + 1} & topic_starts)
+    topics_hit = sum(1 for t in topic_starts if any(abs(b - t) <= 1 for b in boundaries))
+    print(
+        f"{name:<12} {seconds * 1000:>9.2f} {len(logical):>9} {min(sizes):>6} {max(sizes):>6} "
+        f"{statistics.mean(sizes):>7.0f} {statistics.pstdev(sizes):>7.0f} "
+        f"{at_cue / max(1, len(boundaries)):>7.0%} "
+        f"{near_topic / max(1, len(boundaries)):>10.0%} {topics_hit / max(1, len(topic_starts)):>7.0%}"
+    )
+
+def timed(function, segments, repeat: int):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(segments)
+        times.append(time.perf_counter() - started)
+    return result, statistics.median(times)
+
+def main(args):
+    from services.segmentation import SegmentationService
+    
+    raw_min, raw_max = (int(value) for value in args.raw_words.split(":"))
+    segments, topic_starts = build_transcript(args.words, raw_min, raw_max, args.cue_rate, args.seed)
+    service = SegmentationService()
+    print(
+        f"{len(segments)} raw segments, {sum(len(s.text.split()) for s in segments)} words, "
+        f"{len(topic_starts) + 1} topics"
+    )
+    print(
+        f"{'strategy':<12} {'ms':>9} {'segments':>9} {'min':>6} {'max':>6} {'mean':>7} {'stdev':>7} "
+        f"{'at cue':>7} {'precision':>10} {'recall':>7}"
+    )
+    
+    results = {}
+    for strategy in ("greedy", "dp", "texttiling"):
+        service.strategy = strategy
+        logical, seconds = timed(service.segment_transcript, segments, args.repeat)
+        results[strategy] = logical
+        describe(strategy, segments, logical, seconds, service.dp_engine._cue, topic_starts)
+        if strategy in service.GLOBAL_STRATEGIES:
+            # Same strategy fed one raw segment at a time, as the evaluation pipeline does
+            streamed = lambda raw: list(service.iter_segments(raw))
+            logical, seconds = timed(streamed, segments, args.repeat)
+            describe(f"{strategy}~", segments, logical, seconds, service.dp_engine._cue, topic_starts)
+    
+    greedy_stdev = statistics.pstdev(len(seg.text.split()) for seg in results["greedy"])
+    dp_stdev = statistics.pstdev(len(seg.text.split()) for seg in results["dp"])
+    if greedy_stdev:
+        print(f"Segment length spread reduced by {100 * (1 - dp_stdev / greedy_stdev):.1f}%")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the transcript segmentation strategies")
+    parser.add_argument("--words", type=int, default=13000, help="transcript length (~13,000 for 90 minutes)")
+    parser.add_argument("--raw-words", default="15:90", help="min:max words per raw segment")
+    parser.add_argument("--cue-rate", type=float, default=0.15, help="share of raw segments opening with a cue")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
@@ -0,0 +1,573 @@
+"""
+Local stand-in for the Gemini and Groq HTTP APIs
+
+Lets the real UnifiedLLMClient code path be benchmarked and load-tested offline.
+Implements the request/response shapes MindTrace uses:
+
+  POST /{v1,v1beta}/models/{model}:generateContent
+  POST /{v1,v1beta}/models/{model}:streamGenerateContent   (?alt=sse or JSON array)
+  POST /upload/{v1,v1beta}/files                           (resumable, raw and multipart)
+  GET/DELETE /{v1,v1beta}/files/{id}
+  POST /v1beta/cachedContents, GET/DELETE /v1beta/cachedContents/{id}   (context caching)
+  POST /openai/v1/chat/completions                         (stream and non-stream)
+
+Answers are built from the JSON template at the end of each prompt and are
+deterministic for a given --seed and prompt. Latency and 429/500 injection are
+drawn from a seeded RNG as well, so a sequential run is fully reproducible.
+
+Usage:
+    python scripts/llm_standin.py --port 8090 --latency lognormal:1.2:0.5 --rate-429 0.05 --seed 7
+
+Then point the backend at it:
+    GEMINI_BASE_URL=http://127.0.0.1:8090
+    GROQ_BASE_URL=http://127.0.0.1:8090
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+PHRASES = [
+    "Explains the idea step by step with a concrete example.",
+    "Terminology is introduced before it is used.",
+    "The transition to the next point is abrupt.",
+    "Pacing slows down appropriately for the harder part.",
+    "A quick check for understanding would help here.",
+    "Technically accurate, with one imprecise statement.",
+    "Good use of an analogy to ground the abstract concept.",
+    "Some filler words distract from the main point.",
+]
+
+TRANSCRIPT_SENTENCES = [
+    "Today we are going to look at how this concept works in practice.",
+    "Let me start with a simple example so the idea is concrete.",
+    "Notice how the output changes when we modify the input.",
+    "This is the part most people find confusing, so let's slow down.",
+    "A useful way to think about it is as a recipe that repeats.",
+    "Now let's connect this back to what we covered earlier.",
+    "Can you predict what happens if we remove this line?",
+    "That brings us to the main takeaway for this section.",
+]
+
+class LatencyModel:
+    """Samples response latency in seconds from a small set of distributions"""
+    
+    def __init__(self, spec: str):
+        kind, *params = spec.split(":")
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        if kind not in ("fixed", "uniform", "lognormal", "pareto"):
+            raise ValueError(f"Unknown latency distribution: {kind}")
+    
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            low, high = self.params
+            return rng.uniform(low, high)
+        if self.kind == "lognormal":
+            # median seconds, sigma of the underlying normal
+            median, sigma = self.params
+            return median * math.exp(rng.gauss(0.0, sigma))
+        # pareto: scale seconds, shape alpha (heavy tail for hedging experiments)
+        scale, alpha = self.params
+        return scale * rng.paretovariate(alpha)
+
+class StandInConfig:
+    def __init__(self, args: argparse.Namespace):
+        self.seed = args.seed
+        self.latency = {
+            'gemini': LatencyModel(args.gemini_latency or args.latency),
+            'groq': LatencyModel(args.groq_latency or args.latency),
+        }
+        self.rate_429 = args.rate_429
+        self.rate_500 = args.rate_500
+        self.retry_after = args.retry_after
+        self.stream_cut_rate = args.stream_cut_rate
+        self.stream_chunk_chars = args.stream_chunk_chars
+        self.file_processing_seconds = args.file_processing_seconds
+        self.transcript_segments = args.transcript_segments
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+# ---------------------------------------------------------------------------
+# Deterministic answers filled in from the prompt's JSON template
+# ---------------------------------------------------------------------------
+
+def _balanced_block(text: str) -> Optional[str]:
+    """The first balanced {...} or [...] block in text"""
+    start = min([i for i in (text.find("{"), text.find("[")) if i >= 0], default=-1)
+    if start < 0:
+        return None
+    
+    depth, in_string, escaped = 0, False, False
+    for pos in range(start, len(text)):
+        char = text[pos]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start:pos + 1]
+    return None
+
+def _extract_template(prompt: str) -> Optional[str]:
+    """The JSON example following the last mention of JSON that is followed by one"""
+    anchor = prompt.rfind("JSON")
+    while anchor >= 0:
+        block = _balanced_block(prompt[anchor:])
+        if block is not None:
+            try:
+                # Skips bracketed prose such as [SEGMENT 3] after the instructions
+                _parse_template(block)
+                return block
+            except json.JSONDecodeError:
+                pass
+        anchor = prompt.rfind("JSON", 0, anchor)
+    return None
+
+def _parse_template(template: str) -> Any:
+    # Placeholders like <1-10> or <segment number> are not JSON; make them strings
+    cleaned = re.sub(r"(?<!\")<([^<>\"]*)>(?!\")", lambda m: json.dumps(f"<{m.group(1)}>"), template)
+    cleaned = re.sub(r",\s*([}\]])", r"\1", cleaned)
+    return json.loads(cleaned)
+
+def _fill(value: Any, key: str, rng: random.Random) -> Any:
+    if isinstance(value, dict):
+        return {k: _fill(v, k, rng) for k, v in value.items()}
+    if isinstance(value, list):
+        if not value:
+            return [rng.choice(PHRASES)] if key == "evidence" else []
+        return [_fill(item, key, rng) for item in value]
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        if 0 < value <= 1:
+            return round(rng.uniform(0.6, 0.95), 2)
+        return round(rng.uniform(5.5, 9.5), 1)
+    if isinstance(value, str):
+        if value == "<1-10>" or key == "score":
+            return round(rng.uniform(5.5, 9.5), 1)
+        if value.startswith("<") and "number" in value:
+            return 0
+        return rng.choice(PHRASES)
+    return value
+
+def _transcript(rng: random.Random, count: int) -> List[Dict[str, Any]]:
+    segments, current = [], 0.0
+    for _ in range(count):
+        duration = round(rng.uniform(8.0, 20.0), 1)
+        text = " ".join(rng.sample(TRANSCRIPT_SENTENCES, 3))
+        segments.append({"text": text, "start": round(current, 1), "end": round(current + duration, 1)})
+        current += duration
+    return segments
+
+def build_answer(prompt: str, config: StandInConfig, has_file: bool = False) -> str:
+    """Deterministic JSON (or text) answer for a prompt"""
+    digest = hashlib.sha256(f"{config.seed}:{prompt}".encode("utf-8")).hexdigest()
+    rng = random.Random(int(digest[:16], 16))
+    
+    template_text = _extract_template(prompt)
+    try:
+        template = _parse_template(template_text) if template_text else None
+    except json.JSONDecodeError:
+        template = None
+    
+    if isinstance(template, list) and template and isinstance(template[0], dict) and "start" in template[0]:
+        return json.dumps(_transcript(rng, config.transcript_segments))
+    
+    if template is None:
+        if has_file:
+            return json.dumps(_transcript(rng, config.transcript_segments))
+        return " ".join(rng.sample(PHRASES, 3))
+    
+    # Batched evaluation: one entry per [SEGMENT n] block
+    if isinstance(template, dict) and isinstance(template.get("evaluations"), list) and template["evaluations"]:
+        entry = template["evaluations"][0]
+        evaluations = []
+        for segment_id in re.findall(r"\[SEGMENT (\d+)\]", prompt):
+            item = _fill(entry, "evaluations", rng)
+            item["segment_id"] = int(segment_id)
+            evaluations.append(item)
+        return json.dumps({"evaluations": evaluations})
+    
+    answer = _fill(template, "", rng)
+    
+    # Resume prompts ask only for the keys an interrupted stream did not deliver
+    remaining = re.search(r"remaining keys, in this order: ([^\n.]+)", prompt)
+    if remaining and isinstance(answer, dict):
+        keys = [key.strip() for key in remaining.group(1).split(",")]
+        answer = {key: answer[key] for key in keys if key in answer}
+    
+    return json.dumps(answer)
+
+# ---------------------------------------------------------------------------
+# App
+# ---------------------------------------------------------------------------
+
+def create_app(config: StandInConfig) -> FastAPI:
+    app = FastAPI(title="MindTrace LLM stand-in")
+    rng = random.Random(config.seed)
+    files: Dict[str, Dict[str, Any]] = {}
+    uploads: Dict[str, Dict[str, Any]] = {}
+    caches: Dict[str, Dict[str, Any]] = {}
+    stats = {'requests': 0, 'injected_429': 0, 'injected_500': 0, 'stream_cuts': 0, 'cached_prompt_tokens': 0}
+    
+    def inject_error(provider: str) -> Optional[Response]:
+        roll = rng.random()
+        if roll < config.rate_429:
+            stats['injected_429'] += 1
+            if provider == 'groq':
+                return JSONResponse(
+                    {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                    status_code=429,
+                    headers={"retry-after": str(config.retry_after)},
+                )
+            return JSONResponse(
+                {"error": {
+                    "code": 429,
+                    "message": "Resource has been exhausted (e.g. check quota).",
+                    "status": "RESOURCE_EXHAUSTED",
+                    "details": [{
+                        "@type": "type.googleapis.com/google.rpc.RetryInfo",
+                        "retryDelay": f"{config.retry_after}s",
+                    }],
+                }},
+                status_code=429,
+            )
+        if roll < config.rate_429 + config.rate_500:
+            stats['injected_500'] += 1
+            return JSONResponse(
+                {"error": {"code": 500, "message": "Internal error encountered.", "status": "INTERNAL"}},
+                status_code=500,
+            )
+        return None
+    
+    def gemini_chunk(
+        text: str,
+        prompt_tokens: int,
+        output_tokens: int,
+        finished: bool,
+        cached_tokens: int = 0
+    ) -> Dict[str, Any]:
+        candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+        if finished:
+            candidate["finishReason"] = "STOP"
+        usage = {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": output_tokens,
+            "totalTokenCount": prompt_tokens + output_tokens,
+        }
+        if cached_tokens:
+            usage["cachedContentTokenCount"] = cached_tokens
+        return {"candidates": [candidate], "usageMetadata": usage}
+    
+    def split_chunks(text: str) -> List[str]:
+        size = max(1, config.stream_chunk_chars)
+        return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+    
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", **stats, "files": len(files), "caches": len(caches)}
+    
+    @app.post("/{version}/models/{model_action}")
+    async def gemini_models(version: str, model_action: str, request: Request):
+        model, _, action = model_action.partition(":")
+        if action not in ("generateContent", "streamGenerateContent"):
+            return JSONResponse({"error": {"code": 404, "message": f"Unknown method {action}"}}, status_code=404)
+        
+        stats['requests'] += 1
+        body = await request.json()
+        parts = [part for content in body.get("contents", []) for part in content.get("parts", [])]
+        prompt = "\n".join(part.get("text", "") for part in parts)
+        has_file = any("fileData" in part or "file_data" in part for part in parts)
+        
+        cached_tokens = 0
+        if body.get("cachedContent"):
+            cache = caches.get(body["cachedContent"].rsplit("/", 1)[-1])
+            if cache is None or time.time() >= cache["_expires_at"]:
+                return JSONResponse(
+                    {"error": {"code": 403, "message": "CachedContent not found (or permission denied)", "status": "PERMISSION_DENIED"}},
+                    status_code=403,
+                )
+            prompt = cache["_text"] + "\n\n" + prompt
+            cached_tokens = cache["usageMetadata"]["totalTokenCount"]
+            stats['cached_prompt_tokens'] += cached_tokens
+        
+        latency = config.latency['gemini'].sample(rng)
+        error = inject_error('gemini')
+        if error is not None:
+            await asyncio.sleep(min(latency, 0.2))
+            return error
+        
+        answer = build_answer(prompt, config, has_file)
+        prompt_tokens = _estimate_tokens(prompt)
+        output_tokens = _estimate_tokens(answer)
+        
+        if action == "generateContent":
+            await asyncio.sleep(latency)
+            return gemini_chunk(answer, prompt_tokens, output_tokens, True, cached_tokens)
+        
+        chunks = split_chunks(answer)
+        cut_at = len(chunks)
+        if len(chunks) > 1 and rng.random() < config.stream_cut_rate:
+            cut_at = rng.randint(1, len(chunks) - 1)
+            stats['stream_cuts'] += 1
+        # Time to first chunk is a third of the sampled latency, the rest is spread over chunks
+        first_delay = latency / 3
+        chunk_delay = (latency - first_delay) / len(chunks)
+        sse = request.query_params.get("alt") == "sse"
+        
+        async def event_stream():
+            await asyncio.sleep(first_delay)
+            if not sse:
+                yield "["
+            for index, chunk in enumerate(chunks[:cut_at]):
+                finished = index == len(chunks) - 1
+                data = json.dumps(gemini_chunk(
+                    chunk, prompt_tokens, output_tokens if finished else 0, finished, cached_tokens if finished else 0
+                ))
+                if sse:
+                    yield f"data: {data}\r\n\r\n"
+                else:
+                    yield ("," if index else "") + data
+                await asyncio.sleep(chunk_delay)
+            if not sse and cut_at == len(chunks):
+                yield "]"
+        
+        media_type = "text/event-stream" if sse else "application/json"
+        return StreamingResponse(event_stream(), media_type=media_type)
+    
+    # ----- Files API -----
+    
+    def new_file(display_name: str, mime_type: str, size: int) -> Dict[str, Any]:
+        file_id = uuid.uuid4().hex[:12]
+        record = {
+            "name": f"files/{file_id}",
+            "displayName": display_name,
+            "mimeType": mime_type,
+            "sizeBytes": str(size),
+            "uri": f"https://generativelanguage.googleapis.com/v1beta/files/{file_id}",
+            "state": "PROCESSING",
+            "_ready_at": time.monotonic() + config.file_processing_seconds,
+        }
+        files[file_id] = record
+        return record
+    
+    def public(record: Dict[str, Any]) -> Dict[str, Any]:
+        if record["state"] == "PROCESSING" and time.monotonic() >= record["_ready_at"]:
+            record["state"] = "ACTIVE"
+        return {key: value for key, value in record.items() if not key.startswith("_")}
+    
+    @app.post("/upload/{version}/files")
+    async def upload_file(version: str, request: Request):
+        protocol = request.headers.get("x-goog-upload-protocol", "raw")
+        command = request.headers.get("x-goog-upload-command", "")
+        
+        if protocol == "resumable" and command == "start":
+            try:
+                metadata = await request.json()
+            except json.JSONDecodeError:
+                metadata = {}
+            upload_id = uuid.uuid4().hex
+            uploads[upload_id] = {
+                "display_name": metadata.get("file", {}).get("displayName", upload_id),
+                "mime_type": request.headers.get("x-goog-upload-header-content-type", "application/octet-stream"),
+                "expected": int(request.headers.get("x-goog-upload-header-content-length", "0") or 0),
+                "received": 0,
+            }
+            upload_url = f"{request.base_url}upload/{version}/files?upload_id={upload_id}"
+            return Response(status_code=200, headers={
+                "x-goog-upload-url": upload_url,
+                "x-goog-upload-status": "active",
+            })
+        
+        upload_id = request.query_params.get("upload_id")
+        if upload_id:
+            upload = uploads.get(upload_id)
+            if upload is None:
+                return JSONResponse({"error": {"code": 404, "message": "Unknown upload"}}, status_code=404)
+            if command == "query":
+                return Response(status_code=200, headers={
+                    "x-goog-upload-status": "active",
+                    "x-goog-upload-size-received": str(upload["received"]),
+                })
+            offset = int(request.headers.get("x-goog-upload-offset", upload["received"]))
+            if offset != upload["received"]:
+                return JSONResponse(
+                    {"error": {"code": 400, "message": f"Offset {offset} != received {upload['received']}"}},
+                    status_code=400,
+                )
+            async for chunk in request.stream():
+                upload["received"] += len(chunk)
+            if "finalize" in command:
+                uploads.pop(upload_id)
+                record = new_file(upload["display_name"], upload["mime_type"], upload["received"])
+                return JSONResponse({"file": public(record)}, headers={"x-goog-upload-status": "final"})
+            return Response(status_code=200, headers={"x-goog-upload-status": "active"})
+        
+        # Single-request raw or multipart upload
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+        mime_type = request.headers.get("content-type", "application/octet-stream")
+        record = new_file(uuid.uuid4().hex[:8], mime_type, size)
+        return {"file": public(record)}
+    
+    @app.get("/{version}/files/{file_id}")
+    async def get_file(version: str, file_id: str):
+        record = files.get(file_id)
+        if record is None:
+            return JSONResponse({"error": {"code": 404, "message": "File not found"}}, status_code=404)
+        return public(record)
+    
+    @app.delete("/{version}/files/{file_id}")
+    async def delete_file(version: str, file_id: str):
+        files.pop(file_id, None)
+        return {}
+    
+    # ----- Context caching -----
+    
+    def public_cache(record: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in record.items() if not key.startswith("_")}
+    
+    @app.post("/{version}/cachedContents")
+    async def create_cache(version: str, request: Request):
+        body = await request.json()
+        text = "\n".join(
+            part.get("text", "")
+            for content in body.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        ttl = float(str(body.get("ttl", "3600s")).rstrip("s"))
+        cache_id = uuid.uuid4().hex[:12]
+        expires_at = time.time() + ttl
+        caches[cache_id] = {
+            "name": f"cachedContents/{cache_id}",
+            "model": body.get("model", ""),
+            "displayName": body.get("displayName", ""),
+            "expireTime": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(expires_at)),
+            "usageMetadata": {"totalTokenCount": _estimate_tokens(text)},
+            "_text": text,
+            "_expires_at": expires_at,
+        }
+        return public_cache(caches[cache_id])
+    
+    @app.get("/{version}/cachedContents/{cache_id}")
+    async def get_cache(version: str, cache_id: str):
+        record = caches.get(cache_id)
+        if record is None or time.time() >= record["_expires_at"]:
+            return JSONResponse({"error": {"code": 404, "message": "CachedContent not found"}}, status_code=404)
+        return public_cache(record)
+    
+    @app.delete("/{version}/cachedContents/{cache_id}")
+    async def delete_cache(version: str, cache_id: str):
+        caches.pop(cache_id, None)
+        return {}
+    
+    # ----- Groq (OpenAI-compatible) -----
+    
+    @app.post("/openai/v1/chat/completions")
+    async def groq_chat(request: Request):
+        stats['requests'] += 1
+        body = await request.json()
+        prompt = "\n".join(message.get("content", "") for message in body.get("messages", []))
+        
+        latency = config.latency['groq'].sample(rng)
+        error = inject_error('groq')
+        if error is not None:
+            await asyncio.sleep(min(latency, 0.2))
+            return error
+        
+        answer = build_answer(prompt, config)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        usage = {
+            "prompt_tokens": _estimate_tokens(prompt),
+            "completion_tokens": _estimate_tokens(answer),
+            "total_tokens": _estimate_tokens(prompt) + _estimate_tokens(answer),
+        }
+        
+        if not body.get("stream"):
+            await asyncio.sleep(latency)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "stand-in"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": answer},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            }
+        
+        chunks = split_chunks(answer)
+        
+        async def event_stream():
+            await asyncio.sleep(latency / 3)
+            for chunk in chunks:
+                delta = {"id": completion_id, "object": "chat.completion.chunk", "choices": [
+                    {"index": 0, "delta": {"content": chunk}, "finish_reason": None}
+                ]}
+                yield f"data: {json.dumps(delta)}\n\n"
+                await asyncio.sleep((latency * 2 / 3) / len(chunks))
+            done = {"id": completion_id, "object": "chat.completion.chunk", "choices": [
+                {"index": 0, "delta": {}, "finish_reason": "stop"}
+            ], "x_groq": {"usage": usage}}
+            yield f"data: {json.dumps(done)}\n\n"
+            yield "data: [DONE]\n\n"
+        
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+    
+    return app
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Local stand-in for the Gemini and Groq APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency", default="lognormal:1.0:0.4",
+                        help="fixed:S | uniform:LOW:HIGH | lognormal:MEDIAN:SIGMA | pareto:SCALE:ALPHA")
+    parser.add_argument("--gemini-latency", default=None, help="Override --latency for Gemini")
+    parser.add_argument("--groq-latency", default=None, help="Override --latency for Groq")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--rate-500", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--stream-cut-rate", type=float, default=0.0,
+                        help="Fraction of streams closed before the answer is complete")
+    parser.add_argument("--stream-chunk-chars", type=int, default=80)
+    parser.add_argument("--file-processing-seconds", type=float, default=2.0)
+    parser.add_argument("--transcript-segments", type=int, default=30)
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    import uvicorn
+    
+    args = parse_args()
+    print(f"🧪 LLM stand-in on http://{args.host}:{args.port} (seed={args.seed}, latency={args.latency})")
+    uvicorn.run(create_app(StandInConfig(args)), host=args.host, port=args.port, log_level="warning")
@@ -1,6 +1,8 @@
+import asyncio
 from typing import List, Dict, Any
 from models.evaluation import SegmentEvaluation
 from utils.llm_client import llm_client
+from utils.token_budget import token_budget, estimate_tokens, trim_text
 
 class CoherenceChecker:
     """
@@ -38,9 +40,12 @@ class CoherenceChecker:
         print(f"🔍 Architect is analyzing structure across {len(valid_segments)} segments")
         
         # Check for macro-level structural issues
-        contradictions = await self.detect_contradictions(valid_segments)
-        topic_drifts = await self.detect_topic_drift(valid_segments, topic)
-        logical_gaps = await self.detect_logical_gaps(valid_segments)
+        # The three passes are independent; the shared LLM rate limiter paces them
+        contradictions, topic_drifts, logical_gaps = await asyncio.gather(
+            self.detect_contradictions(valid_segments),
+            self.detect_topic_drift(valid_segments, topic),
+            self.detect_logical_gaps(valid_segments)
+        )
         
         # Calculate overall coherence score
         coherence_score = self._calculate_coherence_score(
@@ -68,9 +73,16 @@ class CoherenceChecker:
     
     def _combine_segments_for_llm(self, segments: List[SegmentEvaluation]) -> str:
         """Formats the transcript for the LLM to analyze macro-flow."""
+        # Long sessions: give every segment an equal share of the input budget
+        # (minus room for instructions) so the whole session stays visible
+        budget = token_budget.max_input_tokens('coherence') - 1500
+        total = sum(estimate_tokens(seg.text) for seg in segments)
+        per_segment = max(50, budget // max(1, len(segments))) if total > budget else None
+        
         combined = []
         for seg in segments:
-            combined.append(f"[SEGMENT {seg.segment_id}]: {seg.text}")
+            text = trim_text(seg.text, per_segment) if per_segment else seg.text
+            combined.append(f"[SEGMENT {seg.segment_id}]: {text}")
         return "\n\n".join(combined)
     
     async def detect_contradictions(
@@ -1,3 +1,4 @@
+import asyncio
 from typing import Dict, Any, List
 from models.evaluation import SegmentEvaluation
 from utils.llm_client import llm_client
@@ -153,7 +154,7 @@ Make the rewrite significantly distinct from the original while preserving techn
         """
         Rewrite all segments that can be significantly improved
         """
-        rewrites = []
+        to_rewrite = []
         
         for segment in segments:
             # Completely safe score extraction
@@ -172,9 +173,16 @@ Make the rewrite significantly distinct from the original while preserving techn
             
             if needs_rewrite:
                 print(f"Processing transformation for segment {segment.segment_id} (Clarity: {clarity_score})")
-                rewrite = await self.rewrite_segment(segment, topic)
-                if rewrite.get('needs_rewrite') and rewrite.get('rewritten_text'):
-                    rewrites.append(rewrite)
+                to_rewrite.append(segment)
+        
+        # Submitted together; the shared LLM rate limiter decides how many run at once
+        results = await asyncio.gather(
+            *(self.rewrite_segment(segment, topic) for segment in to_rewrite)
+        )
+        rewrites = [
+            rewrite for rewrite in results
+            if rewrite.get('needs_rewrite') and rewrite.get('rewritten_text')
+        ]
         
         return rewrites
     
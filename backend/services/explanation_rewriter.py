@@ -1,3 +1,4 @@
+import asyncio
 from typing import Dict, Any, List
 from models.evaluation import SegmentEvaluation
 from utils.llm_client import llm_client
@@ -165,7 +166,7 @@ Return a valid JSON object:
         """
         Rewrite all segments that can be significantly improved
         """
-        rewrites = []
+        to_rewrite = []
         
         for segment in segments:
             # Check scores to decide if coaching is needed
@@ -182,9 +183,16 @@ Return a valid JSON object:
             
             if needs_coaching:
                 print(f"Processing coaching for segment {segment.segment_id}")
-                rewrite = await self.rewrite_segment(segment, topic)
-                if rewrite.get('needs_rewrite') and rewrite.get('rewritten_text'):
-                    rewrites.append(rewrite)
+                to_rewrite.append(segment)
+        
+        # Submitted together; the shared LLM rate limiter decides how many run at once
+        results = await asyncio.gather(
+            *(self.rewrite_segment(segment, topic) for segment in to_rewrite)
+        )
+        rewrites = [
+            rewrite for rewrite in results
+            if rewrite.get('needs_rewrite') and rewrite.get('rewritten_text')
+        ]
         
         return rewrites
 
@@ -1,13 +1,31 @@
+import asyncio
 import json
-from typing import Dict, List
+from typing import Dict, List, Optional, Any, Callable
 from utils.llm_client import llm_client
+from utils.context_cache import context_cache
+from utils.token_budget import token_budget, estimate_tokens, trim_text
 from models.evaluation import ScoreDetail
+from models.transcript import TranscriptSegment
+from config import settings
 
 class LLMEvaluator:
     """Enhanced service for evaluating teaching segments using LLM"""
     
     def __init__(self):
-        pass
+        self.required_keys = [
+            'clarity', 'structure', 'correctness', 'pacing', 'communication',
+            'engagement', 'examples', 'questioning', 'adaptability', 'relevance'
+        ]
+        
+        # Batch packing: rough size of one segment's 10-metric answer
+        self.output_tokens_per_segment = 700
+        
+        # Static prompt prefixes: identical for every segment of every session, so
+        # Gemini can serve them from a context cache instead of re-reading them
+        self.single_instructions = self._build_single_instructions()
+        self.batch_instructions = self._build_batch_instructions()
+        context_cache.register_prefix(self.single_instructions)
+        context_cache.register_prefix(self.batch_instructions)
         
     async def evaluate_segment(
         self, 
@@ -36,57 +54,327 @@ class LLMEvaluator:
                 prompt=prompt,
                 task_type='evaluate',
                 response_format='json',
-                max_retries=3
+                max_retries=3,
+                # An answer that fails validation must not be served from the cache next time
+                validate=self._has_valid_scores
             )
             
             print(f"✅ LLM evaluation successful")
             
             # Validate response structure - now with 10 metrics
-            required_keys = [
-                'clarity', 'structure', 'correctness', 'pacing', 'communication',
-                'engagement', 'examples', 'questioning', 'adaptability', 'relevance'
-            ]
+            evaluated_scores = self._validate_scores(result)
+            if evaluated_scores is None:
+                return self._mock_evaluation()
             
-            for key in required_keys:
-                if key not in result:
-                    print(f"⚠️  Missing key in LLM response: {key}")
-                    return self._mock_evaluation()
-                if 'score' not in result[key] or 'reason' not in result[key]:
-                    print(f"⚠️  Invalid structure for {key} in LLM response")
-                    return self._mock_evaluation()
+            return evaluated_scores
             
-            # Create ScoreDetail objects
-            evaluated_scores = {}
-            for key in required_keys:
-                evaluated_scores[key] = ScoreDetail(**result[key])
+        except Exception as e:
+            print(f"❌ LLM evaluation failed: {e}")
+            print(f"   Using mock evaluation as fallback")
+            return self._mock_evaluation()
+    
+    async def evaluate_segment_streaming(
+        self,
+        segment_text: str,
+        topic: str,
+        full_context: str = "",
+        on_metric: Optional[Callable[[str, ScoreDetail], Any]] = None
+    ) -> Dict[str, ScoreDetail]:
+        """
+        Same as evaluate_segment, but streams the answer and calls
+        on_metric(metric_name, ScoreDetail) as soon as each metric is parsed
+        """
+        
+        prompt = self._build_enhanced_evaluation_prompt(segment_text, topic, full_context)
+        
+        async def handle_item(key, value):
+            if on_metric is None or key not in self.required_keys:
+                return
+            if isinstance(value, dict) and 'score' in value and 'reason' in value:
+                await on_metric(key, ScoreDetail(**value))
+        
+        try:
+            print(f"🔍 Streaming evaluation of segment (length: {len(segment_text)} chars)")
+            
+            result = await llm_client.stream_llm(
+                prompt=prompt,
+                expected_keys=self.required_keys,
+                on_item=handle_item,
+                task_type='evaluate',
+                max_retries=3,
+                validate=self._has_valid_scores
+            )
+            
+            evaluated_scores = self._validate_scores(result)
+            if evaluated_scores is None:
+                return self._mock_evaluation()
             
             return evaluated_scores
             
         except Exception as e:
-            print(f"❌ LLM evaluation failed: {e}")
+            print(f"❌ Streaming LLM evaluation failed: {e}")
             print(f"   Using mock evaluation as fallback")
             return self._mock_evaluation()
     
+    def _has_valid_scores(self, result: Any) -> bool:
+        return self._validate_scores(result) is not None
+    
+    def _validate_scores(self, result: Any) -> Optional[Dict[str, ScoreDetail]]:
+        """Check that all 10 metrics are present and well formed; None if not"""
+        if not isinstance(result, dict):
+            print(f"⚠️  LLM response is not a JSON object")
+            return None
+        
+        for key in self.required_keys:
+            if key not in result:
+                print(f"⚠️  Missing key in LLM response: {key}")
+                return None
+            if not isinstance(result[key], dict) or 'score' not in result[key] or 'reason' not in result[key]:
+                print(f"⚠️  Invalid structure for {key} in LLM response")
+                return None
+        
+        # Create ScoreDetail objects
+        try:
+            return {key: ScoreDetail(**result[key]) for key in self.required_keys}
+        except (TypeError, ValueError) as e:
+            print(f"⚠️  Invalid score values in LLM response: {e}")
+            return None
+    
+    async def evaluate_batch(
+        self,
+        segments: List[TranscriptSegment],
+        topic: str,
+        full_context: str = "",
+        token_budget: Optional[int] = None
+    ) -> Dict[int, Dict[str, ScoreDetail]]:
+        """
+        Evaluate several segments per LLM request
+        
+        Segments are packed into batches that fit the token budget, sharing one
+        copy of the rubric. Each returned entry is validated on its own; only the
+        entries that fail are re-sent, and anything still failing after
+        EVAL_BATCH_MAX_RETRIES rounds is evaluated individually.
+        
+        Returns:
+            Dictionary mapping segment_id to its evaluation scores
+        """
+        budget = token_budget or settings.EVAL_BATCH_TOKEN_BUDGET
+        results: Dict[int, Dict[str, ScoreDetail]] = {}
+        pending = list(segments)
+        
+        for round_number in range(settings.EVAL_BATCH_MAX_RETRIES + 1):
+            if not pending:
+                break
+            
+            batches = self._pack_batches(pending, topic, full_context, budget)
+            print(f"📦 Batch evaluation round {round_number + 1}: {len(pending)} segments in {len(batches)} requests")
+            
+            batch_results = await asyncio.gather(
+                *(self._evaluate_packed_batch(batch, topic, full_context, round_number) for batch in batches)
+            )
+            for batch_result in batch_results:
+                results.update(batch_result)
+            
+            pending = [seg for seg in pending if seg.segment_id not in results]
+        
+        if pending:
+            print(f"⚠️  {len(pending)} segments failed batch validation, evaluating individually")
+            single_results = await asyncio.gather(
+                *(self.evaluate_segment(seg.text, topic, full_context) for seg in pending)
+            )
+            for seg, scores in zip(pending, single_results):
+                results[seg.segment_id] = scores
+        
+        return results
+    
+    def _pack_batches(
+        self,
+        segments: List[TranscriptSegment],
+        topic: str,
+        full_context: str,
+        token_budget: int
+    ) -> List[List[TranscriptSegment]]:
+        """Greedily fill batches until the next segment would exceed the token budget"""
+        base_tokens = estimate_tokens(self._build_batch_evaluation_prompt([], topic, full_context))
+        
+        batches: List[List[TranscriptSegment]] = []
+        current: List[TranscriptSegment] = []
+        current_tokens = base_tokens
+        
+        for seg in segments:
+            seg_tokens = estimate_tokens(seg.text) + self.output_tokens_per_segment
+            if current and (
+                current_tokens + seg_tokens > token_budget or
+                len(current) >= settings.EVAL_BATCH_MAX_SEGMENTS
+            ):
+                batches.append(current)
+                current = []
+                current_tokens = base_tokens
+            current.append(seg)
+            current_tokens += seg_tokens
+        
+        if current:
+            batches.append(current)
+        return batches
+    
+    async def _evaluate_packed_batch(
+        self,
+        batch: List[TranscriptSegment],
+        topic: str,
+        full_context: str,
+        round_number: int = 0
+    ) -> Dict[int, Dict[str, ScoreDetail]]:
+        """Send one packed batch; return only the entries that passed validation"""
+        prompt = self._build_batch_evaluation_prompt(batch, topic, full_context)
+        expected_ids = {seg.segment_id for seg in batch}
+        
+        try:
+            result = await llm_client.call_llm(
+                prompt=prompt,
+                task_type='evaluate',
+                response_format='json',
+                max_retries=3,
+                # Room for every segment's answer, never less than a single evaluation gets
+                max_output_tokens=max(
+                    token_budget.max_output_tokens('evaluate'),
+                    self.output_tokens_per_segment * len(batch) + 1024
+                ),
+                # A retry round re-packs failed segments, often into the prompt that just
+                # failed; it must reach the provider. Only fully valid answers are stored.
+                use_cache=False if round_number > 0 else None,
+                validate=lambda answer: len(self._validate_batch(answer, expected_ids)) == len(expected_ids)
+            )
+        except Exception as e:
+            print(f"❌ Batch evaluation request failed: {e}")
+            return {}
+        
+        validated = self._validate_batch(result, expected_ids)
+        print(f"✅ Batch of {len(batch)}: {len(validated)} valid evaluations")
+        return validated
+    
+    def _validate_batch(self, result: Any, expected_ids: set) -> Dict[int, Dict[str, ScoreDetail]]:
+        """Validated scores of each expected segment in a batch answer"""
+        entries = result.get('evaluations', []) if isinstance(result, dict) else result
+        if not isinstance(entries, list):
+            print(f"⚠️  Batch response has no evaluations array")
+            return {}
+        
+        validated = {}
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            try:
+                segment_id = int(entry.get('segment_id'))
+            except (TypeError, ValueError):
+                continue
+            if segment_id not in expected_ids or segment_id in validated:
+                continue
+            scores = self._validate_scores(entry)
+            if scores is not None:
+                validated[segment_id] = scores
+        return validated
+    
+    def _build_batch_evaluation_prompt(
+        self,
+        batch: List[TranscriptSegment],
+        topic: str,
+        full_context: str
+    ) -> str:
+        """Build a multi-segment prompt that carries the rubric once"""
+        
+        segment_blocks = "\n\n".join(
+            f'[SEGMENT {seg.segment_id}]:\n"{seg.text}"' for seg in batch
+        )
+        
+        return f"""{self.batch_instructions}
+
+STATED TOPIC: {topic}
+
+{f"FULL SESSION CONTEXT (for reference): {trim_text(full_context, 125)}..." if full_context else ""}
+
+TEACHING SEGMENTS:
+{segment_blocks}
+
+Return exactly one entry per segment above, as the JSON described in the instructions."""
+    
     def _build_enhanced_evaluation_prompt(
         self, 
         segment_text: str, 
         topic: str,
         full_context: str
     ) -> str:
-        """Build the enhanced evaluation prompt with 10 metrics"""
+        """Build the enhanced evaluation prompt with 10 metrics (static instructions first)"""
         
-        return f"""You are an expert educational evaluator analyzing a mentor's teaching quality.
+        return f"""{self.single_instructions}
 
 STATED TOPIC: {topic}
 
 TEACHING SEGMENT:
 "{segment_text}"
 
-{f"FULL SESSION CONTEXT (for reference): {full_context[:500]}..." if full_context else ""}
+{f"FULL SESSION CONTEXT (for reference): {trim_text(full_context, 125)}..." if full_context else ""}
+
+Evaluate this segment now and return only the JSON described in the instructions."""
+    
+    def _build_single_instructions(self) -> str:
+        """Static part of the single-segment prompt: role, rubric and answer format"""
+        
+        return f"""You are an expert educational evaluator analyzing a mentor's teaching quality.
+
+Evaluate the following aspects of the teaching segment given after these instructions (score 1-10 each with detailed justification):
+
+{self._build_rubric()}
+
+Return your evaluation in the following JSON format:
+{{
+  "clarity": {{"score": <1-10>, "reason": "<detailed explanation>", "evidence": ["specific example 1", "specific example 2"]}},
+  "structure": {{"score": <1-10>, "reason": "<detailed explanation>", "evidence": []}},
+  "correctness": {{"score": <1-10>, "reason": "<detailed explanation>", "evidence": []}},
+  "pacing": {{"score": <1-10>, "reason": "<detailed explanation>", "evidence": []}},
+  "communication": {{"score": <1-10>, "reason": "<detailed explanation>", "evidence": []}},
+  "engagement": {{"score": <1-10>, "reason": "<detailed explanation>", "evidence": []}},
+  "examples": {{"score": <1-10>, "reason": "<detailed explanation>", "evidence": []}},
+  "questioning": {{"score": <1-10>, "reason": "<detailed explanation>", "evidence": []}},
+  "adaptability": {{"score": <1-10>, "reason": "<detailed explanation>", "evidence": []}},
+  "relevance": {{"score": <1-10>, "reason": "<detailed explanation including topic analysis>", "evidence": []}}
+}}
+
+Provide ONLY the JSON response, no additional text."""
+    
+    def _build_batch_instructions(self) -> str:
+        """Static part of the multi-segment prompt: role, rubric and answer format"""
+        
+        return f"""You are an expert educational evaluator analyzing a mentor's teaching quality.
 
-Evaluate the following aspects of this teaching segment (score 1-10 each with detailed justification):
+Evaluate EACH of the teaching segments given after these instructions independently, using the rubric that follows (score 1-10 each with detailed justification).
 
-**CORE TEACHING METRICS:**
+{self._build_rubric()}
+
+Return your evaluation in the following JSON format, with exactly one entry per segment:
+{{
+  "evaluations": [
+    {{
+      "segment_id": <segment number>,
+      "clarity": {{"score": <1-10>, "reason": "<detailed explanation>", "evidence": ["specific example 1"]}},
+      "structure": {{"score": <1-10>, "reason": "<detailed explanation>", "evidence": []}},
+      "correctness": {{"score": <1-10>, "reason": "<detailed explanation>", "evidence": []}},
+      "pacing": {{"score": <1-10>, "reason": "<detailed explanation>", "evidence": []}},
+      "communication": {{"score": <1-10>, "reason": "<detailed explanation>", "evidence": []}},
+      "engagement": {{"score": <1-10>, "reason": "<detailed explanation>", "evidence": []}},
+      "examples": {{"score": <1-10>, "reason": "<detailed explanation>", "evidence": []}},
+      "questioning": {{"score": <1-10>, "reason": "<detailed explanation>", "evidence": []}},
+      "adaptability": {{"score": <1-10>, "reason": "<detailed explanation>", "evidence": []}},
+      "relevance": {{"score": <1-10>, "reason": "<detailed explanation including topic analysis>", "evidence": []}}
+    }}
+  ]
+}}
+
+Provide ONLY the JSON response, no additional text."""
+    
+    def _build_rubric(self) -> str:
+        """The 10-metric rubric shared by single and batched prompts"""
+        
+        return """**CORE TEACHING METRICS:**
 
 1. **Clarity**: How clearly is the concept explained? Are ideas articulated in an understandable way?
    - Clear terminology and definitions
@@ -150,23 +438,7 @@ Evaluate the following aspects of this teaching segment (score 1-10 each with de
 - If the segment discusses a related topic that helps explain or contextualize the main topic, score it HIGH (8-10)
 - Only penalize if the content is completely unrelated with no educational value
 - Examples from adjacent topics that illustrate concepts should score 7-9
-- Brief tangents that maintain engagement are acceptable (6-8)
-
-Return your evaluation in the following JSON format:
-{{
-  "clarity": {{"score": <1-10>, "reason": "<detailed explanation>", "evidence": ["specific example 1", "specific example 2"]}},
-  "structure": {{"score": <1-10>, "reason": "<detailed explanation>", "evidence": []}},
-  "correctness": {{"score": <1-10>, "reason": "<detailed explanation>", "evidence": []}},
-  "pacing": {{"score": <1-10>, "reason": "<detailed explanation>", "evidence": []}},
-  "communication": {{"score": <1-10>, "reason": "<detailed explanation>", "evidence": []}},
-  "engagement": {{"score": <1-10>, "reason": "<detailed explanation>", "evidence": []}},
-  "examples": {{"score": <1-10>, "reason": "<detailed explanation>", "evidence": []}},
-  "questioning": {{"score": <1-10>, "reason": "<detailed explanation>", "evidence": []}},
-  "adaptability": {{"score": <1-10>, "reason": "<detailed explanation>", "evidence": []}},
-  "relevance": {{"score": <1-10>, "reason": "<detailed explanation including topic analysis>", "evidence": []}}
-}}
-
-Provide ONLY the JSON response, no additional text."""
+- Brief tangents that maintain engagement are acceptable (6-8)"""
     
     def _mock_evaluation(self) -> Dict[str, ScoreDetail]:
         """Mock evaluation for demo purposes or when LLM fails"""
@@ -1,7 +1,99 @@
-from typing import List, Tuple
+from typing import List, Tuple, Union, Dict, Any, Optional, Iterable
+from itertools import chain
+from operator import attrgetter
+import numpy as np
 from models.evaluation import SegmentEvaluation, Metrics
 from config import settings
 
+# Column order of ScoreMatrix: core metrics first, then the optional advanced ones
+METRICS = (
+    'clarity', 'structure', 'correctness', 'pacing', 'communication',
+    'engagement', 'examples', 'questioning', 'adaptability', 'relevance',
+)
+METRIC_INDEX = {metric: column for column, metric in enumerate(METRICS)}
+_metric_details = attrgetter(*METRICS)
+
+class ScoreMatrix:
+    """
+    Scores of a session as an n_segments × 10 float32 array
+    
+    mask marks the metrics a segment actually has (advanced metrics are missing
+    on older evaluations); missing cells hold 0. Every aggregate is an array
+    operation, and the per-metric means are computed once per matrix.
+    """
+    
+    _MISSING = float('nan')
+    
+    def __init__(self, scores: np.ndarray, mask: np.ndarray):
+        self.scores = scores
+        self.mask = mask
+        self._values: Optional[np.ndarray] = None
+        self._means: Optional[np.ndarray] = None
+    
+    @classmethod
+    def from_segments(cls, segments: List[SegmentEvaluation]) -> 'ScoreMatrix':
+        missing = cls._MISSING
+        cells = (
+            missing if detail is None else detail.score
+            for detail in chain.from_iterable(map(_metric_details, segments))
+        )
+        return cls.from_cells(cells, len(segments))
+    
+    @classmethod
+    def from_documents(cls, segments: List[Dict[str, Any]]) -> 'ScoreMatrix':
+        """From stored segment dicts, skipping SegmentEvaluation validation"""
+        missing = cls._MISSING
+        cells = (
+            missing if seg.get(m) is None else seg[m]['score']
+            for seg in segments for m in METRICS
+        )
+        return cls.from_cells(cells, len(segments))
+    
+    @classmethod
+    def from_cells(cls, cells: Iterable[float], n_segments: int) -> 'ScoreMatrix':
+        """Scores row by row in METRICS order, NaN where a metric is missing"""
+        scores = np.fromiter(cells, dtype=np.float32, count=n_segments * len(METRICS))
+        scores = scores.reshape(n_segments, len(METRICS))
+        mask = ~np.isnan(scores)
+        scores[~mask] = 0.0
+        return cls(scores, mask)
+    
+    @property
+    def values(self) -> np.ndarray:
+        """Scores as float64 with the float32 noise rounded off (7.3 rather than 7.3000002)"""
+        if self._values is None:
+            self._values = np.round(self.scores.astype(np.float64), 4)
+        return self._values
+    
+    def __len__(self) -> int:
+        return self.scores.shape[0]
+    
+    def column(self, metric: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(scores, present) of one metric across segments"""
+        index = METRIC_INDEX[metric]
+        return self.values[:, index], self.mask[:, index]
+    
+    def segment_scores(self, weights: np.ndarray) -> np.ndarray:
+        """Weighted score of every segment; missing metrics contribute nothing"""
+        # cumsum adds left to right, in the order of the scalar formula, so results
+        # round exactly like it (x.xx5 ties are common with 0.0x weights)
+        if not len(self):
+            return np.zeros(0)
+        return np.cumsum(self.values * weights, axis=1)[:, -1]
+    
+    def means(self) -> np.ndarray:
+        """Per-metric mean over the segments that have it (NaN when none do)"""
+        if self._means is None:
+            counts = self.mask.sum(axis=0)
+            totals = self.values.sum(axis=0)
+            self._means = np.divide(totals, counts, out=np.full(len(METRICS), np.nan), where=counts > 0)
+        return self._means
+    
+    def below(self, metric: str, threshold: float) -> np.ndarray:
+        """Segment indices where metric is present and below threshold"""
+        scores, present = self.column(metric)
+        return np.flatnonzero(present & (scores < threshold))
+
 class ScoringService:
     """Enhanced service for aggregating and computing scores"""
     
@@ -20,6 +112,30 @@ class ScoringService:
             'adaptability': getattr(settings, 'WEIGHT_ADAPTABILITY', 0.08),
             'relevance': getattr(settings, 'WEIGHT_RELEVANCE', 0.09),
         }
+        self.weight_vector = np.array([self.weights[m] for m in METRICS], dtype=np.float64)
+        
+        # Strength/weakness thresholds on per-metric means
+        self.high_threshold = 8.0
+        self.low_threshold = 6.5
+        self.metric_names = {
+            'clarity': 'Clarity of explanations',
+            'structure': 'Structural organization',
+            'correctness': 'Technical accuracy',
+            'pacing': 'Pacing and delivery',
+            'communication': 'Communication effectiveness',
+            'engagement': 'Student engagement techniques',
+            'examples': 'Quality and relevance of examples',
+            'questioning': 'Use of questioning to promote thinking',
+            'adaptability': 'Adaptability to content difficulty',
+            'relevance': 'Topic relevance and context',
+        }
+    
+    @staticmethod
+    def score_matrix(segments: Union[List[SegmentEvaluation], ScoreMatrix]) -> ScoreMatrix:
+        """Build the matrix once and pass it around instead of the segment list"""
+        if isinstance(segments, ScoreMatrix):
+            return segments
+        return ScoreMatrix.from_segments(segments)
     
     def compute_segment_score(self, segment_eval: SegmentEvaluation) -> float:
         """Compute weighted score for a single segment - handles optional metrics"""
@@ -45,9 +161,14 @@ class ScoringService:
         
         return round(score, 2)
     
-    def compute_overall_metrics(self, segments: List[SegmentEvaluation]) -> Metrics:
+    def compute_segment_scores(self, segments: Union[List[SegmentEvaluation], ScoreMatrix]) -> List[float]:
+        """Weighted score of every segment in one pass"""
+        return [round(score, 2) for score in self.score_matrix(segments).segment_scores(self.weight_vector).tolist()]
+    
+    def compute_overall_metrics(self, segments: Union[List[SegmentEvaluation], ScoreMatrix]) -> Metrics:
         """Compute average metrics across all segments - handles optional metrics"""
-        if not segments:
+        matrix = self.score_matrix(segments)
+        if not len(matrix):
             return Metrics(
                 clarity=0, structure=0, correctness=0,
                 pacing=0, communication=0, engagement=None,
@@ -55,27 +176,10 @@ class ScoringService:
                 relevance=None
             )
         
-        n = len(segments)
-        
-        # Calculate advanced metrics only if present
-        engagement_scores = [s.engagement.score for s in segments if s.engagement]
-        examples_scores = [s.examples.score for s in segments if s.examples]
-        questioning_scores = [s.questioning.score for s in segments if s.questioning]
-        adaptability_scores = [s.adaptability.score for s in segments if s.adaptability]
-        relevance_scores = [s.relevance.score for s in segments if s.relevance]
-        
-        return Metrics(
-            clarity=round(sum(s.clarity.score for s in segments) / n, 2),
-            structure=round(sum(s.structure.score for s in segments) / n, 2),
-            correctness=round(sum(s.correctness.score for s in segments) / n, 2),
-            pacing=round(sum(s.pacing.score for s in segments) / n, 2),
-            communication=round(sum(s.communication.score for s in segments) / n, 2),
-            engagement=round(sum(engagement_scores) / len(engagement_scores), 2) if engagement_scores else None,
-            examples=round(sum(examples_scores) / len(examples_scores), 2) if examples_scores else None,
-            questioning=round(sum(questioning_scores) / len(questioning_scores), 2) if questioning_scores else None,
-            adaptability=round(sum(adaptability_scores) / len(adaptability_scores), 2) if adaptability_scores else None,
-            relevance=round(sum(relevance_scores) / len(relevance_scores), 2) if relevance_scores else None,
-        )
+        return Metrics(**{
+            metric: None if np.isnan(mean) else round(float(mean), 2)
+            for metric, mean in zip(METRICS, matrix.means())
+        })
     
     def compute_overall_score(self, metrics: Metrics) -> float:
         """Compute weighted overall score from metrics - handles optional metrics"""
@@ -103,45 +207,21 @@ class ScoringService:
     
     def identify_strengths_and_weaknesses(
         self, 
-        segments: List[SegmentEvaluation]
+        segments: Union[List[SegmentEvaluation], ScoreMatrix]
     ) -> Tuple[List[str], List[str]]:
         """Identify strengths and areas for improvement"""
-        
-        if not segments:
+        matrix = self.score_matrix(segments)
+        if not len(matrix):
             return [], []
         
-        # Aggregate scores
-        metrics = self.compute_overall_metrics(segments)
-        
-        strengths = []
-        weaknesses = []
-        
-        # Define thresholds
-        high_threshold = 8.0
-        low_threshold = 6.5
-        
-        metric_names = {
-            'clarity': 'Clarity of explanations',
-            'structure': 'Structural organization',
-            'correctness': 'Technical accuracy',
-            'pacing': 'Pacing and delivery',
-            'communication': 'Communication effectiveness',
-            'engagement': 'Student engagement techniques',
-            'examples': 'Quality and relevance of examples',
-            'questioning': 'Use of questioning to promote thinking',
-            'adaptability': 'Adaptability to content difficulty',
-            'relevance': 'Topic relevance and context',
-        }
-        
-        for metric, name in metric_names.items():
-            score = getattr(metrics, metric)
-            if score is None:  # Skip optional metrics that are missing
-                continue
-            if score >= high_threshold:
-                strengths.append(f"{name} (score: {score})")
-            elif score < low_threshold:
-                weaknesses.append(f"{name} (score: {score})")
+        # Thresholds apply to the means as rounded in the metrics (round(), not np.round,
+        # which rounds 5.325 half-even from 532.5); NaN (missing) is neither
+        means = np.array([round(mean, 2) for mean in matrix.means().tolist()])
+        strong = np.flatnonzero(means >= self.high_threshold)
+        weak = np.flatnonzero(means < self.low_threshold)
         
+        strengths = [f"{self.metric_names[METRICS[i]]} (score: {float(means[i])})" for i in strong]
+        weaknesses = [f"{self.metric_names[METRICS[i]]} (score: {float(means[i])})" for i in weak]
         return strengths, weaknesses
     
     def analyze_topic_alignment(
@@ -152,9 +232,10 @@ class ScoringService:
         """
         Analyze how well the session aligns with the stated topic
         """
-        relevance_scores = [s.relevance.score for s in segments if s.relevance]
+        matrix = self.score_matrix(segments)
+        relevance, present = matrix.column('relevance')
         
-        if not relevance_scores:
+        if not present.any():
             return {
                 'stated_topic': stated_topic,
                 'average_relevance': None,
@@ -164,21 +245,21 @@ class ScoringService:
                 'alignment_quality': 'Not available (older evaluation)'
             }
         
-        avg_relevance = sum(relevance_scores) / len(relevance_scores)
+        avg_relevance = float(matrix.means()[METRIC_INDEX['relevance']])
         
-        # Detect topic drift
+        # Detect topic drift (reasons are only on the segment objects, not the matrix)
+        with_reasons = not isinstance(segments, ScoreMatrix)
         topic_drift = []
-        for i, seg in enumerate(segments):
-            if seg.relevance and seg.relevance.score < 6.0:
-                topic_drift.append({
-                    'segment_id': i,
-                    'score': seg.relevance.score,
-                    'reason': seg.relevance.reason
-                })
+        for i in matrix.below('relevance', 6.0):
+            topic_drift.append({
+                'segment_id': int(i),
+                'score': segments[i].relevance.score if with_reasons else float(relevance[i]),
+                'reason': segments[i].relevance.reason if with_reasons else None
+            })
         
         # Calculate related topics bonus
-        high_relevance_segments = [s for s in segments if s.relevance and s.relevance.score >= 8.0]
-        related_bonus = len(high_relevance_segments) / len(segments) * getattr(settings, 'RELATED_TOPIC_BONUS', 0.5)
+        high_relevance_count = int((present & (relevance >= 8.0)).sum())
+        related_bonus = high_relevance_count / len(matrix) * getattr(settings, 'RELATED_TOPIC_BONUS', 0.5)
         
         return {
             'stated_topic': stated_topic,
@@ -1,9 +1,25 @@
-from typing import List
+import re
+from typing import List, Optional, Tuple, Iterable, Iterator
+import numpy as np
 from models.transcript import TranscriptSegment
+from config import settings
+
+def merge_segments(group: List[TranscriptSegment], segment_id: int) -> TranscriptSegment:
+    """One logical segment out of consecutive raw segments"""
+    return TranscriptSegment(
+        segment_id=segment_id,
+        text=' '.join(seg.text for seg in group),
+        start_time=group[0].start_time,
+        end_time=group[-1].end_time,
+        confidence=sum(seg.confidence for seg in group) / len(group)
+    )
 
 class SegmentationService:
     """Service for segmenting transcripts into logical explanation units"""
     
+    # Strategies that need the whole transcript before placing any boundary
+    GLOBAL_STRATEGIES = ('dp', 'texttiling')
+    
     def __init__(self):
         # UPDATED: Aggressively increased thresholds for 1.5h sessions
         # Target: ~30-35 segments for a 90-minute session (~13,000 words)
@@ -19,6 +35,12 @@ class SegmentationService:
             'what we', 'what i', 'the next', 'going to',
             'important', 'note that', 'keep in mind',
         ]
+        
+        # 'greedy' (first cue after min_segment_words), 'dp' (cost-optimal boundaries at cues)
+        # or 'texttiling' (cost-optimal boundaries at lexical cohesion valleys)
+        self.strategy = settings.SEGMENTATION_STRATEGY
+        self.dp_engine = DPSegmentationEngine(self)
+        self.cohesion_scorer = CohesionScorer()
     
     def segment_transcript(self, segments: List[TranscriptSegment]) -> List[TranscriptSegment]:
         """
@@ -26,7 +48,7 @@ class SegmentationService:
         
         Args:
             segments: Raw transcript segments
-            
+        
         Returns:
             List of merged logical segments
         """
@@ -34,64 +56,400 @@ class SegmentationService:
         if not segments:
             return []
         
-        # If we have very few segments, just return them
-        if len(segments) <= 5:
-            print(f"⚠️ Only {len(segments)} segments received, returning as-is")
-            return segments
+        if self.strategy in self.GLOBAL_STRATEGIES:
+            # If we have very few segments, just return them
+            if len(segments) <= StreamingSegmenter.AS_IS_MAX_SEGMENTS:
+                print(f"⚠️ Only {len(segments)} segments received, returning as-is")
+                return segments
+            boundary_scores, weight = self.boundary_scores(segments)
+            logical_segments = self.dp_engine.segment(segments, boundary_scores, weight)
+            print(f"📊 Segmentation ({self.strategy}): {len(segments)} raw → {len(logical_segments)} logical segments")
+            return logical_segments
         
-        logical_segments = []
-        current_segment = {
-            'texts': [],
-            'start_time': segments[0].start_time,
-            'word_count': 0
-        }
-        
-        for i, seg in enumerate(segments):
-            words = seg.text.split()
-            word_count = len(words)
-            
-            current_segment['texts'].append(seg.text)
-            current_segment['word_count'] += word_count
-            
-            # Check if we should create a new segment
-            should_split = False
-            
-            # Split if we've reached max words
-            if current_segment['word_count'] >= self.max_segment_words:
-                should_split = True
-            
-            # Split if we detect a topic shift and have minimum words
-            elif current_segment['word_count'] >= self.min_segment_words:
-                if self._detect_topic_shift(seg.text):
-                    should_split = True
-            
-            # Always split at the last segment
-            if i == len(segments) - 1:
-                should_split = True
-            
-            if should_split and current_segment['texts']:
-                logical_segments.append(TranscriptSegment(
-                    segment_id=len(logical_segments),
-                    text=' '.join(current_segment['texts']),
-                    start_time=current_segment['start_time'],
-                    end_time=seg.end_time,
-                    confidence=sum(s.confidence for s in segments[max(0, i - len(current_segment['texts'])):i+1]) / (len(current_segment['texts']) or 1)
-                ))
-                
-                # Start new segment
-                if i < len(segments) - 1:
-                    current_segment = {
-                        'texts': [],
-                        'start_time': segments[i + 1].start_time,
-                        'word_count': 0
-                    }
-        
-        print(f"📊 Segmentation: {len(segments)} raw → {len(logical_segments)} logical segments")
-        return logical_segments
+        return list(self.iter_segments(segments))
+    
+    def stream(self):
+        """Segmenter that takes raw segments one at a time and emits each logical segment once closed"""
+        if self.strategy in self.GLOBAL_STRATEGIES:
+            return IncrementalSegmenter(self)
+        return StreamingSegmenter(self)
+    
+    def iter_segments(self, segments: Iterable[TranscriptSegment]) -> Iterator[TranscriptSegment]:
+        """Yield logical segments as soon as they close while raw segments are consumed"""
+        segmenter = self.stream()
+        for seg in segments:
+            yield from segmenter.feed(seg)
+        yield from segmenter.close()
+    
+    def boundary_scores(self, segments: List[TranscriptSegment]) -> Tuple[np.ndarray, float]:
+        """Boundary credits of the global strategy in use, and their weight"""
+        if self.strategy == 'texttiling':
+            return self.cohesion_scorer.boundary_scores(segments), settings.SEGMENTATION_COHESION_WEIGHT
+        return self.dp_engine.cue_scores(segments), self.dp_engine.cue_weight
     
     def _detect_topic_shift(self, text: str) -> bool:
         """Detect if text indicates a topic shift"""
         text_lower = text.lower()
         return any(indicator in text_lower for indicator in self.topic_shift_indicators)
 
-segmentation_service = SegmentationService()
\ No newline at end of file
+class StreamingSegmenter:
+    """
+    Incremental form of SegmentationService.segment_transcript
+    
+    A logical segment is closed as soon as the split rule fires on the segment
+    just fed, so it can be evaluated while the rest of the transcript is still
+    being transcribed. The first few raw segments are held back: a transcript
+    of five segments or fewer is returned as-is, which is only known at the end.
+    """
+    
+    # Matches the as-is threshold of segment_transcript
+    AS_IS_MAX_SEGMENTS = 5
+    
+    def __init__(self, service: SegmentationService):
+        self.service = service
+        self.raw_count = 0
+        self.emitted = 0
+        self._held: List[TranscriptSegment] = []
+        self._current: List[TranscriptSegment] = []
+        self._word_count = 0
+    
+    def feed(self, seg: TranscriptSegment) -> List[TranscriptSegment]:
+        """Add one raw segment; returns the logical segments it closed"""
+        self.raw_count += 1
+        if self.raw_count <= self.AS_IS_MAX_SEGMENTS:
+            self._held.append(seg)
+            return []
+        
+        closed = []
+        for held in self._held + [seg]:
+            closed.extend(self._add(held))
+        self._held = []
+        return closed
+    
+    def close(self) -> List[TranscriptSegment]:
+        """End of transcript: flush what is still open"""
+        if self._held:
+            # If we have very few segments, just return them
+            print(f"⚠️ Only {len(self._held)} segments received, returning as-is")
+            held, self._held = self._held, []
+            self.emitted += len(held)
+            return held
+        
+        closed = [self._flush()] if self._current else []
+        if self.raw_count:
+            print(f"📊 Segmentation: {self.raw_count} raw → {self.emitted} logical segments")
+        return closed
+    
+    def _add(self, seg: TranscriptSegment) -> List[TranscriptSegment]:
+        self._current.append(seg)
+        self._word_count += len(seg.text.split())
+        
+        # Split if we've reached max words
+        if self._word_count >= self.service.max_segment_words:
+            return [self._flush()]
+        
+        # Split if we detect a topic shift and have minimum words
+        if self._word_count >= self.service.min_segment_words and self.service._detect_topic_shift(seg.text):
+            return [self._flush()]
+        return []
+    
+    def _flush(self) -> TranscriptSegment:
+        current, self._current = self._current, []
+        self._word_count = 0
+        logical = merge_segments(current, self.emitted)
+        self.emitted += 1
+        return logical
+
+class IncrementalSegmenter:
+    """
+    Bounded-lookahead form of the whole-transcript strategies (dp, texttiling)
+    
+    Raw segments collect in a window until it holds LOOKAHEAD_SEGMENTS times
+    max_segment_words; the window is then split optimally and only its first
+    logical segment is emitted, as later boundaries may still move with the
+    text that follows. The window restarts at that boundary, so memory stays
+    bounded however long the session runs; close() emits the optimal split of
+    whatever is left.
+    """
+    
+    # Window size, in maximum-size logical segments
+    LOOKAHEAD_SEGMENTS = 3
+    
+    def __init__(self, service: SegmentationService):
+        self.service = service
+        self.lookahead_words = self.LOOKAHEAD_SEGMENTS * service.max_segment_words
+        self.raw_count = 0
+        self.emitted = 0
+        self._window: List[TranscriptSegment] = []
+        self._window_words = 0
+    
+    def feed(self, seg: TranscriptSegment) -> List[TranscriptSegment]:
+        """Add one raw segment; returns the logical segments it closed"""
+        self.raw_count += 1
+        self._window.append(seg)
+        self._window_words += len(seg.text.split())
+        # A transcript of five segments or fewer is returned as-is, known only at close
+        if self.raw_count <= StreamingSegmenter.AS_IS_MAX_SEGMENTS:
+            return []
+        
+        closed = []
+        while self._window_words >= self.lookahead_words:
+            closed.append(self._emit(self._boundaries()[0]))
+        return closed
+    
+    def close(self) -> List[TranscriptSegment]:
+        """End of transcript: split and flush the rest of the window"""
+        window, self._window = self._window, []
+        self._window_words = 0
+        if self.raw_count <= StreamingSegmenter.AS_IS_MAX_SEGMENTS:
+            if window:
+                # If we have very few segments, just return them
+                print(f"⚠️ Only {len(window)} segments received, returning as-is")
+            self.emitted += len(window)
+            return window
+        
+        closed = []
+        start = 0
+        for end in (self._boundaries(window) if window else []):
+            closed.append(merge_segments(window[start:end], self.emitted))
+            self.emitted += 1
+            start = end
+        print(f"📊 Segmentation ({self.service.strategy}): {self.raw_count} raw → {self.emitted} logical segments")
+        return closed
+    
+    def _boundaries(self, window: Optional[List[TranscriptSegment]] = None) -> List[int]:
+        window = self._window if window is None else window
+        engine = self.service.dp_engine
+        boundary_scores, weight = self.service.boundary_scores(window)
+        return engine.boundaries(engine.word_offsets(window), boundary_scores, weight)
+    
+    def _emit(self, end: int) -> TranscriptSegment:
+        group, self._window = self._window[:end], self._window[end:]
+        self._window_words -= sum(len(seg.text.split()) for seg in group)
+        logical = merge_segments(group, self.emitted)
+        self.emitted += 1
+        return logical
+
+class DPSegmentationEngine:
+    """
+    Cost-optimal segmentation by dynamic programming
+    
+    Cumulative word counts and boundary scores are precomputed as arrays.
+    A logical segment costs its squared relative deviation from target_words,
+    plus a penalty below min_segment_words, minus a credit for ending at a good
+    boundary: by default cue_weight when the next segment opens with a
+    topic-shift cue, or any [0, 1] boundary score (see CohesionScorer). Segments above max_segment_words are
+    infeasible (unless a single raw segment is that long). best[j], the cheapest
+    split of the first j raw segments, only looks back over the k raw segments
+    that fit in max_segment_words, so the whole run is O(n·k).
+    """
+    
+    # Hard cap on raw segments per logical segment, bounding k for very short cues
+    MAX_LOOKBACK = 400
+    # Words at the start of a segment searched for an opening cue
+    CUE_WINDOW_WORDS = 8
+    
+    def __init__(self, service: SegmentationService):
+        self.service = service
+        self.target_words = settings.SEGMENTATION_TARGET_WORDS
+        self.cue_weight = settings.SEGMENTATION_CUE_WEIGHT
+        phrases = sorted(service.topic_shift_indicators, key=len, reverse=True)
+        self._cue = re.compile(r"\b(?:" + "|".join(re.escape(p) for p in phrases) + r")\b")
+    
+    def word_offsets(self, segments: List[TranscriptSegment]) -> np.ndarray:
+        """cum_words[j] = words in segments[:j]"""
+        word_counts = np.fromiter((len(seg.text.split()) for seg in segments), dtype=np.float64, count=len(segments))
+        return np.concatenate(([0.0], np.cumsum(word_counts)))
+    
+    def cue_scores(self, segments: List[TranscriptSegment]) -> np.ndarray:
+        """cue[j] = 1.0 when segments[j] opens with a topic-shift cue"""
+        return np.fromiter(
+            (
+                1.0 if self._cue.search(' '.join(seg.text.lower().split()[:self.CUE_WINDOW_WORDS])) else 0.0
+                for seg in segments
+            ),
+            dtype=np.float64,
+            count=len(segments)
+        )
+    
+    def boundaries(self, cum_words: np.ndarray, boundary_scores: np.ndarray, weight: float) -> List[int]:
+        """
+        End index (exclusive) of every logical segment in the optimal split
+        
+        boundary_scores[j] in [0, 1] rates a boundary right before raw segment j;
+        it is credited as weight * score.
+        """
+        n = len(cum_words) - 1
+        target = float(self.target_words)
+        min_words = float(self.service.min_segment_words)
+        max_words = float(self.service.max_segment_words)
+        
+        # Bonus for ending a segment right before a good boundary (none after the last one)
+        boundary_bonus = np.zeros(n + 1)
+        boundary_bonus[1:n] = weight * boundary_scores[1:n]
+        
+        best = np.full(n + 1, np.inf)
+        best[0] = 0.0
+        back = np.zeros(n + 1, dtype=np.int64)
+        # First start index whose segment ending at j fits in max_words
+        first_fit = np.searchsorted(cum_words, cum_words - max_words, side='left')
+        
+        for j in range(1, n + 1):
+            lo = max(int(first_fit[j]), j - self.MAX_LOOKBACK, 0)
+            lo = min(lo, j - 1)  # a single raw segment is always allowed
+            words = cum_words[j] - cum_words[lo:j]
+            cost = ((words - target) / target) ** 2
+            cost += np.where(words < min_words, (min_words - words) / min_words, 0.0)
+            total = best[lo:j] + cost
+            offset = int(np.argmin(total))
+            best[j] = total[offset] - boundary_bonus[j]
+            back[j] = lo + offset
+        
+        ends = []
+        j = n
+        while j > 0:
+            ends.append(j)
+            j = int(back[j])
+        return ends[::-1]
+    
+    def segment(
+        self,
+        segments: List[TranscriptSegment],
+        boundary_scores: Optional[np.ndarray] = None,
+        weight: Optional[float] = None
+    ) -> List[TranscriptSegment]:
+        """Optimal split; boundaries are rated by opening cues unless boundary_scores is given"""
+        if boundary_scores is None:
+            boundary_scores, weight = self.cue_scores(segments), self.cue_weight
+        cum_words = self.word_offsets(segments)
+        logical_segments = []
+        start = 0
+        for end in self.boundaries(cum_words, boundary_scores, weight):
+            logical_segments.append(merge_segments(segments[start:end], len(logical_segments)))
+            start = end
+        return logical_segments
+
+class CohesionScorer:
+    """
+    TextTiling-style lexical cohesion boundary scores
+    
+    The transcript is cut into pseudo-sentences of SEQUENCE_WORDS words, each a
+    term-frequency vector over content words. At every gap, the cosine
+    similarity of the BLOCK_SEQUENCES pseudo-sentences on either side measures
+    how much vocabulary carries across; a topic change is a similarity valley.
+    Depth scores (how far the valley sits below the peaks around it) pick the
+    valleys, and each is credited to the nearest raw segment boundary.
+    """
+    
+    SEQUENCE_WORDS = 20
+    BLOCK_SEQUENCES = 6
+    # Moving-average width over the gap similarities
+    SMOOTHING_WIDTH = 3
+    
+    # Function words and lecture fillers carry no topic
+    STOPWORDS = frozenset("""
+        a about above after again all also am an and any are as at be because been before being
+        below between both but by can could did do does doing done down during each even ever
+        every few for from further get gets getting go goes going gonna got had has have having he
+        her here hers him his how i if in into is it its itself just kind know let like lot make
+        me more most much my need no nor not now of off okay ok on once one only or other our out
+        over own really right same see she should so some something such sure take than that the
+        their them then there these they thing things think this those through to too um uh under
+        until up us very want was way we well were what when where which while who whom why will
+        with would yeah yes you your actually alright basically wanna
+    """.split())
+    _PUNCTUATION = ".,;:!?\"'()[]{}-…"
+    
+    def tokenize(self, segments: List[TranscriptSegment]):
+        """Content terms as (sequence index, term id) arrays, plus every raw boundary's word offset"""
+        vocabulary = {}
+        rows: List[int] = []
+        terms: List[int] = []
+        offsets: List[int] = []
+        position = 0
+        for seg in segments:
+            offsets.append(position)
+            for word in seg.text.lower().split():
+                token = word.strip(self._PUNCTUATION)
+                if len(token) > 1 and token[0].isalpha() and token not in self.STOPWORDS:
+                    rows.append(position // self.SEQUENCE_WORDS)
+                    terms.append(vocabulary.setdefault(token, len(vocabulary)))
+                position += 1
+        sequences = -(-position // self.SEQUENCE_WORDS)
+        return np.array(rows, dtype=np.int64), np.array(terms, dtype=np.int64), sequences, np.array(offsets)
+    
+    def gap_similarity(self, rows: np.ndarray, terms: np.ndarray, sequences: int) -> np.ndarray:
+        """Cosine similarity of the blocks left and right of gaps 1..sequences-1"""
+        if sequences < 2 or len(terms) == 0:
+            return np.zeros(max(sequences - 1, 0))
+        
+        # Distinct (sequence, term) pairs with their counts
+        pairs, counts = np.unique(rows * (int(terms.max()) + 1) + terms, return_counts=True)
+        pair_rows, pair_terms = np.divmod(pairs, int(terms.max()) + 1)
+        counts = counts.astype(np.float64)
+        
+        # A term used in a single pseudo-sentence can't be on both sides of a gap:
+        # it only adds to its block's norm, so just the shared terms need columns
+        shared_mask = np.bincount(pair_terms)[pair_terms] > 1
+        private = np.bincount(pair_rows[~shared_mask], weights=counts[~shared_mask] ** 2, minlength=sequences)
+        shared_terms, columns = np.unique(pair_terms[shared_mask], return_inverse=True)
+        tf = np.zeros((sequences, len(shared_terms)))
+        tf[pair_rows[shared_mask], columns] = counts[shared_mask]
+        
+        # Block sums from cumulative sums along the sequence axis
+        cum_tf = np.vstack([np.zeros((1, tf.shape[1])), np.cumsum(tf, axis=0)])
+        cum_private = np.concatenate(([0.0], np.cumsum(private)))
+        gaps = np.arange(1, sequences)
+        lo = np.maximum(gaps - self.BLOCK_SEQUENCES, 0)
+        hi = np.minimum(gaps + self.BLOCK_SEQUENCES, sequences)
+        left = cum_tf[gaps] - cum_tf[lo]
+        right = cum_tf[hi] - cum_tf[gaps]
+        
+        dot = np.einsum('ij,ij->i', left, right)
+        left_norm = np.einsum('ij,ij->i', left, left) + cum_private[gaps] - cum_private[lo]
+        right_norm = np.einsum('ij,ij->i', right, right) + cum_private[hi] - cum_private[gaps]
+        norm = np.sqrt(left_norm * right_norm)
+        return np.divide(dot, norm, out=np.zeros_like(dot), where=norm > 0)
+    
+    def depth_scores(self, similarity: np.ndarray) -> np.ndarray:
+        """(left peak - s) + (right peak - s), climbing while similarity keeps rising"""
+        width = min(self.SMOOTHING_WIDTH, len(similarity))
+        if width > 1:
+            padded = np.pad(similarity, (width // 2, width - 1 - width // 2), mode='edge')
+            similarity = np.convolve(padded, np.ones(width) / width, mode='valid')
+        
+        # Hill-climb to the nearest peak on each side of every gap
+        n = len(similarity)
+        depth = np.zeros(n)
+        for i in range(n):
+            left = i
+            while left > 0 and similarity[left - 1] >= similarity[left]:
+                left -= 1
+            right = i
+            while right < n - 1 and similarity[right + 1] >= similarity[right]:
+                right += 1
+            depth[i] = similarity[left] + similarity[right] - 2 * similarity[i]
+        return depth
+    
+    def boundary_scores(self, segments: List[TranscriptSegment]) -> np.ndarray:
+        """score[j] in [0, 1]: depth of the cohesion valley at the boundary before segments[j]"""
+        scores = np.zeros(len(segments))
+        rows, terms, sequences, offsets = self.tokenize(segments)
+        depth = self.depth_scores(self.gap_similarity(rows, terms, sequences))
+        if len(depth) < 3 or depth.max() <= 0:
+            return scores
+        
+        # Valleys: local depth maxima deeper than mean - std/2 (Hearst's liberal cutoff)
+        neighbours = np.maximum(np.concatenate(([0.0], depth[:-1])), np.concatenate((depth[1:], [0.0])))
+        valleys = np.flatnonzero((depth >= neighbours) & (depth > depth.mean() - depth.std() / 2))
+        
+        # Gap g sits at word g * SEQUENCE_WORDS; credit the nearest raw boundary
+        positions = (valleys + 1) * self.SEQUENCE_WORDS
+        nearest = np.clip(np.searchsorted(offsets, positions), 1, len(offsets) - 1)
+        step_back = np.abs(offsets[nearest - 1] - positions) < np.abs(offsets[nearest] - positions)
+        nearest = np.where(step_back & (nearest > 1), nearest - 1, nearest)
+        np.maximum.at(scores, nearest, depth[valleys] / depth.max())
+        return scores
+
+# Create global instance
+segmentation_service = SegmentationService()
@@ -1,118 +1,554 @@
 import os
+import time
 import asyncio
+import mimetypes
 import google.generativeai as genai
-from typing import List, Tuple
+from typing import List, Tuple, Optional, Dict, Any, Callable, Awaitable
 from models.transcript import TranscriptSegment
 from config import settings
+from utils.json_repair import parse_json, JSONRepairError
+from utils.json_stream import IncrementalJSONParser
+from utils.media import audio_extractor, AudioExtractionError
+from utils.gemini_files import gemini_files
+from utils.captions import load_caption_segments
+from utils.file_handler import delete_file
+from utils.rate_limiter import rate_limiter
+from utils.telemetry import TRANSCRIPTION_TRUNCATIONS
+from google.api_core import exceptions as google_exceptions
 import re
-import json
+
+# Gemini bills audio at 32 tokens/second; the transcript adds a few more per second
+TOKENS_PER_AUDIO_SECOND = 36
+DEFAULT_TRANSCRIPTION_TOKENS = 30000
+
+ProgressCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+SegmentsCallback = Callable[[List[TranscriptSegment]], Awaitable[None]]
+
+class UploadProgress:
+    """
+    Aggregates bytes sent across every file of one transcription (one per window)
+    and forwards throttled snapshots, so the session document is not rewritten per chunk
+    """
+    
+    def __init__(self, callback: Optional[ProgressCallback], step_percent: int = 5):
+        self.callback = callback
+        self.step_percent = step_percent
+        self._files: Dict[str, Tuple[int, int]] = {}
+        self._last: Tuple[Optional[str], int] = (None, -1)
+    
+    async def report(self, stage: str, path: Optional[str] = None, sent: int = 0, total: int = 0):
+        if self.callback is None:
+            return
+        if path is not None:
+            self._files[path] = (sent, total)
+        uploaded = sum(sent for sent, _ in self._files.values())
+        size = sum(total for _, total in self._files.values())
+        percent = int(100 * uploaded / size) if size else 0
+        
+        last_stage, last_percent = self._last
+        step = percent - last_percent
+        if stage == last_stage and (step == 0 or (step < self.step_percent and percent < 100)):
+            return
+        self._last = (stage, percent)
+        try:
+            await self.callback({
+                'stage': stage,
+                'uploaded_bytes': uploaded,
+                'total_bytes': size,
+                'percent': percent,
+            })
+        except Exception as e:
+            # Progress is informational; never fail a transcription over it
+            print(f"⚠️ Could not report upload progress: {e}")
+
+# OPTIMIZED PROMPT: For long videos (45m+), granular segmentation (max 40 words)
+# creates too many tokens and causes the LLM to crash/truncate.
+# We now ask for natural logical segments/paragraphs.
+TRANSCRIPTION_PROMPT = """
+Transcribe this recording with detailed timestamps. 
+Break the transcription into logical segments (e.g., by sentence flow or topic shift).
+
+IMPORTANT: 
+- Create a NEW segment for each logical thought or sentence group.
+- aim for 50-100 words per segment to keep the JSON structure efficient.
+- Include timestamps for EVERY segment.
+
+Provide the output as a JSON array where each segment has:
+- 'text': The spoken text
+- 'start': Start time in seconds (float)
+- 'end': End time in seconds (float)
+
+Example format:
+[
+  {"text": "Welcome to today's lecture on Python decorators. We will cover the basics.", "start": 0.0, "end": 5.5},
+  {"text": "Decorators are a powerful feature in Python that allow you to modify behavior.", "start": 5.5, "end": 10.2}
+]
+
+Return ONLY the JSON array, no other text.
+"""
+
+def tail_prompt(start: float) -> str:
+    """Prompt for the part of a recording after a truncated answer stopped"""
+    return TRANSCRIPTION_PROMPT + f"""
+This is a continuation: the recording up to {start:.1f} seconds is already transcribed.
+Transcribe ONLY the speech from {start:.1f} seconds to the end of the recording.
+Keep timestamps relative to the start of the recording (the first segment starts at or after {start:.1f}).
+"""
+
+# A transcript ending this close to the recording's end counts as complete
+COVERAGE_TOLERANCE_SECONDS = 5.0
+
+class TranscriptSegmentStream:
+    """
+    Incremental reader of a streamed transcription answer
+    
+    Every complete {text, start, end} object is returned as soon as its closing
+    brace arrives, so a truncated answer still yields every segment before the
+    cut. coverage_end is the end timestamp of the last complete segment, and
+    complete tells whether the array was closed (the answer was not cut off).
+    """
+    
+    def __init__(self):
+        self._parser = IncrementalJSONParser()
+        self._text: List[str] = []
+        self.segments: List[dict] = []
+        self.coverage_end = 0.0
+    
+    @property
+    def complete(self) -> bool:
+        return self._parser.done
+    
+    def feed(self, chunk: str) -> List[dict]:
+        """Consume a chunk of the answer; returns the segments it completed"""
+        self._text.append(chunk)
+        completed = []
+        for key, value in self._parser.feed(chunk):
+            # Some answers wrap the list: {"segments": [...]}
+            items = value if self._parser.root_type == 'object' and isinstance(value, list) else [value]
+            for item in items:
+                seg = self._valid(item)
+                if seg is not None:
+                    completed.append(seg)
+        self.segments.extend(completed)
+        return completed
+    
+    def finish(self) -> List[dict]:
+        """End of stream: answers the incremental reader could not follow go through JSON repair"""
+        if self.segments or not ''.join(self._text).strip():
+            return []
+        try:
+            data = parse_json(''.join(self._text), expect='array')
+        except JSONRepairError:
+            return []
+        completed = [seg for seg in (self._valid(item) for item in data) if seg is not None]
+        self.segments.extend(completed)
+        return completed
+    
+    def _valid(self, item: Any) -> Optional[dict]:
+        if not isinstance(item, dict) or not item.get('text') or 'start' not in item or 'end' not in item:
+            return None
+        try:
+            start, end = float(item['start']), float(item['end'])
+        except (TypeError, ValueError):
+            return None
+        self.coverage_end = max(self.coverage_end, end)
+        return {'text': item['text'], 'start': start, 'end': end}
+
+def window_starts(duration: float, window: float, overlap: float) -> List[float]:
+    """Start times of overlapping windows covering [0, duration]"""
+    starts = [0.0]
+    step = window - overlap
+    while starts[-1] + window < duration:
+        starts.append(starts[-1] + step)
+    return starts
+
+def _words(text: str) -> set:
+    return set(re.findall(r"[a-z0-9']+", text.lower()))
+
+class WindowStitcher:
+    """
+    Merges per-window segments into one timeline as windows finish
+    
+    Timestamps are shifted by the window start. Each overlap region is split at
+    its midpoint and a segment is kept only by the window that owns its midpoint;
+    a segment repeated on both sides of a cut (same words) is dropped once more.
+    Windows may finish in any order: a window's segments are released as soon
+    as every earlier window has been stitched.
+    """
+    
+    def __init__(self, starts: List[float], window: float, overlap: float):
+        self.starts = starts
+        self.window = window
+        self.overlap = overlap
+        self.stitched: List[dict] = []
+        self._pending: Dict[int, List[dict]] = {}
+        self._next = 0
+    
+    def add(self, index: int, segments: List[dict]) -> List[dict]:
+        """Hand in one window's segments; returns the segments that became final"""
+        self._pending[index] = segments
+        released_from = len(self.stitched)
+        while self._next in self._pending:
+            self._stitch(self._next, self._pending.pop(self._next))
+            self._next += 1
+        return self.stitched[released_from:]
+    
+    def _stitch(self, index: int, segments: List[dict]):
+        starts, window, overlap = self.starts, self.window, self.overlap
+        start = starts[index]
+        cut_before = starts[index] + overlap / 2 if index > 0 else float('-inf')
+        cut_after = starts[index + 1] + overlap / 2 if index < len(starts) - 1 else float('inf')
+        stitched = self.stitched
+        
+        for seg in segments:
+            try:
+                seg_start, seg_end = float(seg['start']), float(seg['end'])
+            except (TypeError, ValueError):
+                continue
+            # The model sometimes runs past the clip; keep timestamps inside the window
+            seg_start, seg_end = min(seg_start, window), min(seg_end, window)
+            seg_start, seg_end = start + max(0.0, seg_start), start + max(0.0, seg_end)
+            middle = (seg_start + seg_end) / 2
+            if not cut_before <= middle < cut_after:
+                continue
+            
+            if stitched:
+                previous = stitched[-1]
+                if index > 0 and seg_start < start + overlap:
+                    words, previous_words = _words(seg['text']), _words(previous['text'])
+                    if words and len(words & previous_words) / len(words | previous_words) >= 0.6:
+                        continue
+                seg_start = max(seg_start, previous['end'])
+                seg_end = max(seg_end, seg_start)
+            stitched.append({'text': seg['text'], 'start': round(seg_start, 2), 'end': round(seg_end, 2)})
+
+def stitch_windows(
+    starts: List[float],
+    windows: List[List[dict]],
+    window: float,
+    overlap: float
+) -> List[dict]:
+    """Merge the segments of every window into one timeline (see WindowStitcher)"""
+    stitcher = WindowStitcher(starts, window, overlap)
+    for index, segments in enumerate(windows):
+        stitcher.add(index, segments)
+    return stitcher.stitched
 
 class TranscriptionService:
     def __init__(self):
         genai.configure(api_key=settings.GOOGLE_API_KEY)
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
-
-    async def transcribe_video(self, video_path: str) -> Tuple[str, List[TranscriptSegment]]:
+        self.model_name = 'gemini-2.5-flash'
+        self.model = genai.GenerativeModel(self.model_name)
+    
+    def transcription_key(
+        self,
+        use_original_video: Optional[bool] = None,
+        media_stats: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Settings that change the transcript of a recording; cached transcripts must match them
+        Pass the media_stats of a finished transcribe_video to key what was actually
+        uploaded (the video when audio extraction failed).
+        """
+        if use_original_video is None:
+            use_original_video = settings.TRANSCRIBE_ORIGINAL_VIDEO
+        if media_stats and media_stats.get('uploaded'):
+            source = media_stats['uploaded']
+        else:
+            source = 'video' if use_original_video or not audio_extractor.available() else 'audio'
+        # Only the speech track is windowed; window length and overlap move the stitch points
+        if source == 'audio' and settings.TRANSCRIPTION_WINDOWING_ENABLED:
+            window = settings.TRANSCRIPTION_WINDOW_SECONDS
+            overlap = min(settings.TRANSCRIPTION_WINDOW_OVERLAP_SECONDS, window / 4)
+            windowing = f"w{window:g}-{overlap:g}"
+        else:
+            windowing = "whole"
+        # Bump the trailing version when TRANSCRIPTION_PROMPT changes
+        return f"{self.model_name}:{source}:{windowing}:v1"
+    
+    async def transcribe_video(
+        self,
+        video_path: str,
+        use_original_video: Optional[bool] = None,
+        media_stats: Optional[Dict[str, Any]] = None,
+        on_progress: Optional[ProgressCallback] = None,
+        on_segments: Optional[SegmentsCallback] = None
+    ) -> Tuple[str, List[TranscriptSegment]]:
+        """
+        Transcribe a session recording with Gemini
+        
+        Only the extracted speech track is uploaded unless use_original_video
+        (default TRANSCRIBE_ORIGINAL_VIDEO) asks for the video itself. Sizes and
+        timings are written into media_stats when given; on_progress receives
+        {'stage', 'uploaded_bytes', 'total_bytes', 'percent'} while the upload runs.
+        on_segments receives segments in timeline order as soon as they are final
+        (window by window for long recordings), so later stages need not wait.
+        """
+        if use_original_video is None:
+            use_original_video = settings.TRANSCRIBE_ORIGINAL_VIDEO
+        media_stats = media_stats if media_stats is not None else {}
+        progress = UploadProgress(on_progress)
+        audio_path = None
+        segments: List[TranscriptSegment] = []
+        
+        async def emit(data: List[dict]):
+            batch = [
+                TranscriptSegment(
+                    segment_id=len(segments) + i,
+                    text=seg['text'],
+                    start_time=float(seg['start']),
+                    end_time=float(seg['end']),
+                    confidence=1.0
+                )
+                for i, seg in enumerate(data)
+            ]
+            segments.extend(batch)
+            if on_segments is not None and batch:
+                await on_segments(batch)
+        
         try:
             print(f"Transcribing {video_path} using Gemini...")
             
-            # Upload file to Gemini
-            video_file = genai.upload_file(path=video_path)
-            
-            # Wait for processing - CRITICAL FIX: Use asyncio.sleep to avoid blocking the server
-            while video_file.state.name == "PROCESSING":
-                await asyncio.sleep(2)  # Non-blocking sleep
-                video_file = genai.get_file(video_file.name)
-
-            if video_file.state.name == "FAILED":
-                raise Exception("Gemini video processing failed")
-
-            # OPTIMIZED PROMPT: For long videos (45m+), granular segmentation (max 40 words)
-            # creates too many tokens and causes the LLM to crash/truncate.
-            # We now ask for natural logical segments/paragraphs.
-            prompt = """
-            Transcribe this video with detailed timestamps. 
-            Break the transcription into logical segments (e.g., by sentence flow or topic shift).
+            upload_path, mime_type = video_path, None
+            media_stats['original_bytes'] = os.path.getsize(video_path)
+            if not use_original_video and audio_extractor.available():
+                try:
+                    audio = await audio_extractor.extract(video_path)
+                    audio_path = audio['path']
+                    upload_path, mime_type = audio_path, audio['mime_type']
+                    media_stats['audio_bytes'] = audio['output_bytes']
+                    media_stats['extraction_seconds'] = audio['extraction_seconds']
+                    print(
+                        f"🎧 Extracted speech track: {audio['input_bytes'] / 1e6:.1f} MB → "
+                        f"{audio['output_bytes'] / 1e6:.2f} MB in {audio['extraction_seconds']:.1f}s"
+                    )
+                except AudioExtractionError as e:
+                    print(f"⚠️ Audio extraction failed, uploading the original video: {e}")
+            media_stats['uploaded'] = 'audio' if audio_path else 'video'
             
-            IMPORTANT: 
-            - Create a NEW segment for each logical thought or sentence group.
-            - aim for 50-100 words per segment to keep the JSON structure efficient.
-            - Include timestamps for EVERY segment.
-            
-            Provide the output as a JSON array where each segment has:
-            - 'text': The spoken text
-            - 'start': Start time in seconds (float)
-            - 'end': End time in seconds (float)
-            
-            Example format:
-            [
-              {"text": "Welcome to today's lecture on Python decorators. We will cover the basics.", "start": 0.0, "end": 5.5},
-              {"text": "Decorators are a powerful feature in Python that allow you to modify behavior.", "start": 5.5, "end": 10.2}
-            ]
+            # Long recordings: overlapping windows transcribed concurrently, then stitched
+            duration = None
+            if audio_path and settings.TRANSCRIPTION_WINDOWING_ENABLED:
+                duration = await audio_extractor.probe_duration(audio_path)
+            if duration and duration > settings.TRANSCRIPTION_WINDOW_SECONDS * 1.25:
+                await self._transcribe_windows(audio_path, duration, media_stats, progress, on_stitched=emit)
+            else:
+                data, upload_seconds = await self._transcribe_file(upload_path, mime_type, duration, progress)
+                self._record_upload(media_stats, upload_seconds)
+                
+                # CRITICAL FIX: If Gemini returns too few segments, split them further
+                if len(data) < 10:
+                    print(f"⚠️ Gemini returned only {len(data)} segments, this seems too low. Attempting to split further...")
+                    data = self._split_large_segments(data)
+                await emit(data)
             
-            Return ONLY the JSON array, no other text.
-            """
+            print(f"✅ Transcription complete: {len(segments)} segments created")
             
-            response = await self.model.generate_content_async(
-                [video_file, prompt],
-                generation_config={"response_mime_type": "application/json"}
-            )
-            
-            # Parse response
-            response_text = response.text.strip()
+            full_text = " ".join([seg.text for seg in segments])
+            return full_text, segments
+        
+        except Exception as e:
+            print(f"❌ Gemini transcription failed: {e}")
+            # Fallback to mock only if explicitly enabled, and never after real segments went out
+            if settings.FALLBACK_TO_MOCK and not segments:
+                media_stats['mock'] = True
+                full_text, mock_segments = await self._mock_transcription(video_path)
+                if on_segments is not None:
+                    await on_segments(mock_segments)
+                return full_text, mock_segments
+            raise e
+        finally:
+            if audio_path:
+                delete_file(audio_path)
+    
+    async def _transcribe_file(
+        self,
+        path: str,
+        mime_type: Optional[str],
+        duration: Optional[float] = None,
+        progress: Optional[UploadProgress] = None
+    ) -> Tuple[List[dict], float]:
+        """Upload one media file and transcribe it; returns (raw segments, upload seconds)"""
+        progress = progress or UploadProgress(None)
+        mime_type = mime_type or mimetypes.guess_type(path)[0] or 'video/mp4'
+        
+        async def on_upload(sent: int, total: int):
+            await progress.report('uploading', path, sent, total)
+        
+        async def on_poll(state: str, waited: float):
+            await progress.report('processing')
+        
+        # Async resumable upload: the event loop keeps serving requests while bytes go out
+        upload_started = time.monotonic()
+        media_file = await gemini_files.upload(path, mime_type, on_progress=on_upload)
+        upload_seconds = time.monotonic() - upload_started
+        
+        try:
+            media_file = await gemini_files.wait_until_active(media_file, on_poll=on_poll)
+            await progress.report('transcribing')
+            data = await self._generate_transcript(media_file, duration)
+        finally:
+            await gemini_files.delete(media_file)
+        return data, upload_seconds
+    
+    async def _generate_transcript(self, media_file: Dict[str, Any], duration: Optional[float]) -> List[dict]:
+        """
+        Ask Gemini for the transcript of an ACTIVE uploaded file
+        
+        The answer is streamed and every complete segment is kept. When it is cut
+        off, only the tail after the last complete segment is requested again
+        (same uploaded file, continuation prompt), up to TRANSCRIPTION_TAIL_RETRIES times.
+        """
+        file_part = {"file_data": {"mime_type": media_file['mimeType'], "file_uri": media_file['uri']}}
+        data: List[dict] = []
+        coverage_end = 0.0
+        prompt = TRANSCRIPTION_PROMPT
+        
+        truncated = finished = False
+        for attempt in range(settings.TRANSCRIPTION_TAIL_RETRIES + 1):
+            stream = await self._stream_transcript(file_part, prompt, duration)
+            # A continuation may repeat the segment it was asked to start after
+            tail = [seg for seg in stream.segments if seg['end'] > coverage_end + 0.01]
+            for seg in tail:
+                seg['start'] = max(seg['start'], coverage_end)
+            data.extend(tail)
+            if data:
+                coverage_end = data[-1]['end']
             
-            # Remove markdown code blocks if present
-            if response_text.startswith('```json'):
-                response_text = response_text[7:]
-            if response_text.startswith('```'):
-                response_text = response_text[3:]
-            if response_text.endswith('```'):
-                response_text = response_text[:-3]
-            response_text = response_text.strip()
+            finished = stream.complete or bool(duration and coverage_end >= duration - COVERAGE_TOLERANCE_SECONDS)
+            if finished:
+                break
+            truncated = True
+            if not tail:
+                # Nothing new came back: another request would not get further
+                break
             
+            total = f" of {duration:.1f}s" if duration else ""
+            print(f"✂️ Transcription answer cut off at {coverage_end:.1f}s{total}; requesting only the tail")
+            prompt = tail_prompt(coverage_end)
+        
+        if truncated:
+            TRANSCRIPTION_TRUNCATIONS.inc(outcome='recovered' if finished else 'partial')
+        if not data:
+            raise Exception("Could not parse transcription response")
+        return data
+    
+    async def _stream_transcript(
+        self,
+        file_part: Dict[str, Any],
+        prompt: str,
+        duration: Optional[float]
+    ) -> TranscriptSegmentStream:
+        """One streamed transcription request; segments are parsed as the answer arrives"""
+        stream = TranscriptSegmentStream()
+        
+        # Same quota as every other Gemini call: go through the shared limiter
+        limiter = rate_limiter.for_provider('gemini')
+        estimated_tokens = int(duration * TOKENS_PER_AUDIO_SECOND) if duration else DEFAULT_TRANSCRIPTION_TOKENS
+        async with limiter.slot(estimated_tokens):
             try:
-                data = json.loads(response_text)
-            except json.JSONDecodeError:
-                # Fallback for truncated JSON in very long videos
-                print("⚠️ JSON parsing failed (likely truncated). Attempting recovery...")
-                if response_text.rfind("}") > 0:
-                    fixed_text = response_text[:response_text.rfind("}")+1] + "]"
+                response = await self.model.generate_content_async(
+                    [file_part, prompt],
+                    generation_config={"response_mime_type": "application/json"},
+                    stream=True
+                )
+                async for chunk in response:
                     try:
-                        data = json.loads(fixed_text)
-                    except:
-                        raise Exception("Could not parse transcription response")
-                else:
-                    raise Exception("Could not parse transcription response")
-
-            
-            # CRITICAL FIX: If Gemini returns too few segments, split them further
-            if len(data) < 10:
-                print(f"⚠️ Gemini returned only {len(data)} segments, this seems too low. Attempting to split further...")
-                data = self._split_large_segments(data)
-            
-            print(f"✅ Transcription complete: {len(data)} segments created")
-            
-            full_text = " ".join([seg['text'] for seg in data])
-            segments = []
+                        text = chunk.text
+                    except ValueError:
+                        # Chunks without text (e.g. the final finish_reason) carry nothing to parse
+                        continue
+                    stream.feed(text)
+            except google_exceptions.ResourceExhausted:
+                limiter.record_rate_limited()
+                raise
+        limiter.record_success()
+        
+        stream.finish()
+        if not stream.complete:
+            print(f"⚠️ Transcription answer truncated: salvaged {len(stream.segments)} segments up to {stream.coverage_end:.1f}s")
+        return stream
+    
+    async def _transcribe_windows(
+        self,
+        audio_path: str,
+        duration: float,
+        media_stats: Dict[str, Any],
+        progress: Optional[UploadProgress] = None,
+        on_stitched: Optional[Callable[[List[dict]], Awaitable[None]]] = None
+    ) -> List[dict]:
+        """
+        Transcribe overlapping windows of the speech track concurrently and stitch them
+        on_stitched receives each run of segments as soon as all earlier windows are in
+        """
+        window = settings.TRANSCRIPTION_WINDOW_SECONDS
+        overlap = min(settings.TRANSCRIPTION_WINDOW_OVERLAP_SECONDS, window / 4)
+        starts = window_starts(duration, window, overlap)
+        stitcher = WindowStitcher(starts, window, overlap)
+        # Released runs must reach on_stitched in order even when its consumer applies backpressure
+        release_lock = asyncio.Lock()
+        slots = asyncio.Semaphore(settings.TRANSCRIPTION_MAX_CONCURRENT_WINDOWS)
+        upload_times: List[float] = []
+        base_path = os.path.splitext(audio_path)[0]
+        
+        print(f"🪟 Transcribing {duration / 60:.1f} min in {len(starts)} windows of {window:.0f}s ({overlap:.0f}s overlap)")
+        
+        async def transcribe_window(index: int, start: float) -> List[dict]:
+            length = min(window, duration - start)
+            clip_path = f"{base_path}.window{index}.ogg"
+            async with slots:
+                try:
+                    await audio_extractor.extract_window(audio_path, start, length, clip_path)
+                    for attempt in range(settings.TRANSCRIPTION_WINDOW_RETRIES + 1):
+                        try:
+                            data, upload_seconds = await self._transcribe_file(clip_path, 'audio/ogg', length, progress)
+                            break
+                        except Exception as e:
+                            if attempt == settings.TRANSCRIPTION_WINDOW_RETRIES:
+                                raise
+                            print(f"⚠️ Window {index} attempt {attempt + 1} failed: {e}")
+                finally:
+                    delete_file(clip_path)
+            upload_times.append(upload_seconds)
             
-            for i, seg in enumerate(data):
-                segments.append(TranscriptSegment(
-                    segment_id=i,
-                    text=seg['text'],
-                    start_time=float(seg['start']),
-                    end_time=float(seg['end']),
-                    confidence=1.0
-                ))
-                
-            return full_text, segments
-
-        except Exception as e:
-            print(f"❌ Gemini transcription failed: {e}")
-            # Fallback to mock only if explicitly enabled
-            if settings.FALLBACK_TO_MOCK:
-                return await self._mock_transcription(video_path)
-            raise e
-
+            released = stitcher.add(index, data)
+            async with release_lock:
+                if on_stitched is not None and released:
+                    await on_stitched(released)
+            return data
+        
+        started = time.monotonic()
+        tasks = [asyncio.create_task(transcribe_window(i, start)) for i, start in enumerate(starts)]
+        try:
+            windows = await asyncio.gather(*tasks)
+        except Exception:
+            # One window failed for good: stop the others instead of letting them run on
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        
+        stitched = stitcher.stitched
+        media_stats['windows'] = len(starts)
+        media_stats['transcription_seconds'] = round(time.monotonic() - started, 2)
+        self._record_upload(media_stats, sum(upload_times))
+        print(f"🧵 Stitched {sum(len(w) for w in windows)} window segments into {len(stitched)}")
+        return stitched
+    
+    def _record_upload(self, media_stats: Dict[str, Any], upload_seconds: float):
+        """Upload time, and the time the speech track saved at the measured throughput"""
+        media_stats['upload_seconds'] = round(upload_seconds, 2)
+        original_bytes = media_stats.get('original_bytes', 0)
+        audio_bytes = media_stats.get('audio_bytes')
+        if audio_bytes is None or not original_bytes:
+            return
+        
+        media_stats['size_reduction'] = round(1 - audio_bytes / original_bytes, 4)
+        if upload_seconds > 0 and audio_bytes:
+            bytes_per_second = audio_bytes / upload_seconds
+            saved = (original_bytes - audio_bytes) / bytes_per_second
+            media_stats['upload_seconds_saved'] = round(saved - media_stats.get('extraction_seconds', 0.0), 2)
+    
     def _split_large_segments(self, segments: List[dict]) -> List[dict]:
         """
         Split large segments into smaller ones for better granularity
@@ -160,7 +596,28 @@ class TranscriptionService:
         
         print(f"📊 Segment splitting: {len(segments)} → {len(split_segments)} segments")
         return split_segments
-
+    
+    async def transcribe_captions(
+        self,
+        captions_path: str,
+        caption_format: Optional[str] = None
+    ) -> Tuple[str, List[TranscriptSegment]]:
+        """Build the transcript from an SRT/VTT/JSON caption file instead of transcribing"""
+        started = time.monotonic()
+        data = await load_caption_segments(captions_path, caption_format)
+        segments = [
+            TranscriptSegment(
+                segment_id=i,
+                text=seg['text'],
+                start_time=seg['start'],
+                end_time=seg['end'],
+                confidence=1.0
+            )
+            for i, seg in enumerate(data)
+        ]
+        print(f"📝 Parsed {len(segments)} caption segments in {time.monotonic() - started:.2f}s")
+        return " ".join(seg.text for seg in segments), segments
+    
     async def _mock_transcription(self, video_path: str):
         """Mock transcription for demo purposes"""
         # Generate mock data based on video length
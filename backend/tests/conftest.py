@@ -0,0 +1,58 @@
+import asyncio
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+
+# services/__init__ imports every service eagerly, and evidence_extractor.py does not
+# define evidence_extractor yet (routes/__init__ imports the route that needs it);
+# register the packages without running them so that tests can import the
+# modules they need directly
+for package in ('services', 'routes'):
+    if package not in sys.modules:
+        module = types.ModuleType(package)
+        module.__path__ = [str(BACKEND / package)]
+        sys.modules[package] = module
+
+class FakeProviders:
+    """Stands in for UnifiedLLMClient._call_provider: answers from a script, per provider"""
+    
+    def __init__(self, answers=None, delay=0.0):
+        self.answers = answers or {}
+        self.delay = delay
+        self.calls = []
+    
+    async def __call__(self, provider, prompt, response_format, temperature, task_type='evaluate', max_output_tokens=None):
+        self.calls.append((provider, prompt, max_output_tokens))
+        delay = self.delay.get(provider, 0.0) if isinstance(self.delay, dict) else self.delay
+        if delay:
+            await asyncio.sleep(delay)
+        # The last scripted answer repeats
+        script = self.answers.get(provider, [])
+        answer = script.pop(0) if len(script) > 1 else (script[0] if script else {'text': f'{provider} answer'})
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+@pytest.fixture
+def providers():
+    return FakeProviders()
+
+@pytest.fixture
+def client(providers):
+    """An LLM client with both providers configured, a memory-only cache and fake providers"""
+    from utils.circuit_breaker import CircuitBreakerRegistry
+    from utils.llm_client import UnifiedLLMClient
+    
+    client = UnifiedLLMClient()
+    client.gemini_api_key = 'gemini-key'
+    client.groq_api_key = 'groq-key'
+    client.cache_enabled = True
+    client.use_mock_fallback = True
+    client.circuit_breakers = CircuitBreakerRegistry()
+    client._call_provider = providers
+    return client
@@ -0,0 +1,79 @@
+import pytest
+from bson import ObjectId
+
+import routes.evaluations as evaluations
+from config import settings
+from models.transcript import TranscriptSegment
+from utils.media import audio_extractor
+
+class FakeCollection:
+    def __init__(self, document=None):
+        self.document = document
+        self.updates = []
+        self.queries = []
+    
+    async def update_one(self, query, update):
+        self.updates.append((query, update))
+    
+    async def find_one(self, query, sort=None):
+        self.queries.append(query)
+        return self.document
+
+class FakeDB:
+    def __init__(self, transcript=None):
+        self.sessions = FakeCollection()
+        self.transcripts = FakeCollection(transcript)
+
+SEGMENTS = [TranscriptSegment(segment_id=0, text='Hello.', start_time=0.0, end_time=1.0)]
+
+@pytest.fixture
+def transcribed(monkeypatch):
+    """Calls that reached transcribe_video"""
+    calls = []
+    
+    async def transcribe_video(video_path, use_original_video=None, media_stats=None, on_progress=None, on_segments=None):
+        calls.append(video_path)
+        media_stats['uploaded'] = 'video'
+        return 'Hello.', SEGMENTS
+    
+    monkeypatch.setattr(evaluations.transcription_service, 'transcribe_video', transcribe_video)
+    monkeypatch.setattr(settings, 'TRANSCRIPT_CACHE_ENABLED', True)
+    return calls
+
+@pytest.mark.asyncio
+async def test_missing_recording_skips_the_cache_and_still_transcribes(transcribed, tmp_path):
+    db = FakeDB()
+    session = {'_id': ObjectId(), 'video_path': str(tmp_path / 'demo_1.mp4')}
+    transcript = await evaluations.acquire_transcript(db, session, False, False, {})
+    assert transcribed == [session['video_path']]
+    assert transcript['content_hash'] is None
+    assert transcript['segments'] == SEGMENTS
+    # Nothing written back, no lookup with a null hash
+    assert db.sessions.updates == [] and db.transcripts.queries == []
+
+@pytest.mark.asyncio
+async def test_unhashed_recording_is_hashed_and_looked_up(transcribed, tmp_path, monkeypatch):
+    recording = tmp_path / 'lecture.mp4'
+    recording.write_bytes(b'recording bytes')
+    db = FakeDB()
+    session = {'_id': ObjectId(), 'video_path': str(recording)}
+    monkeypatch.setattr(audio_extractor, 'available', lambda: True)
+    transcript = await evaluations.acquire_transcript(db, session, False, False, {})
+    assert len(transcript['content_hash']) == 64
+    assert db.sessions.updates[0][1] == {'$set': {'content_hash': transcript['content_hash']}}
+    assert db.transcripts.queries[0]['content_hash'] == transcript['content_hash']
+    assert len(transcribed) == 1
+    # Looked up as the speech track, stored as the video that was actually uploaded
+    assert ':audio:' in db.transcripts.queries[0]['transcription_key']
+    assert ':video:' in transcript['transcription_key']
+
+@pytest.mark.asyncio
+async def test_cached_transcript_is_reused(transcribed):
+    cached = {'_id': ObjectId(), 'full_text': 'Hello.', 'source_segments': [seg.model_dump() for seg in SEGMENTS]}
+    db = FakeDB(transcript=cached)
+    session = {'_id': ObjectId(), 'video_path': 'missing.mp4', 'content_hash': 'abc'}
+    media_stats = {}
+    transcript = await evaluations.acquire_transcript(db, session, False, False, media_stats)
+    assert transcribed == []
+    assert transcript['segments'] == SEGMENTS
+    assert media_stats['transcript_cache'] == 'hit'
@@ -0,0 +1,157 @@
+import json
+
+import pytest
+
+from utils.captions import (
+    CaptionParseError,
+    CueMerger,
+    detect_format,
+    iter_caption_file,
+    iter_cues,
+    load_caption_segments,
+    parse_timestamp,
+    sniff_format,
+)
+
+SRT = """1
+00:00:01,000 --> 00:00:02,500
+<i>Today we look at</i>
+
+2
+00:00:02,500 --> 00:00:04,000
+list comprehensions.
+"""
+
+VTT = """WEBVTT
+Kind: captions
+
+NOTE written by hand
+with two lines
+
+intro
+00:01.000 --> 00:02.000 align:start
+<v Teacher>Hello <c.yellow>everyone</c></v>
+
+00:00:02.000 --> 00:00:03.500
+{\\an8}Let's begin.
+"""
+
+@pytest.mark.parametrize('filename, first_line, expected', [
+    ('lecture.SRT', '', 'srt'),
+    ('lecture.vtt', '', 'vtt'),
+    ('captions', '﻿WEBVTT', 'vtt'),
+    ('captions', '[{"text": "hi"', 'json'),
+    ('captions', '1', 'srt'),
+    ('captions', '00:00:01,000 --> 00:00:02,000', 'srt'),
+])
+def test_detect_format(filename, first_line, expected):
+    assert detect_format(filename, first_line) == expected
+
+def test_detect_format_rejects_unknown():
+    with pytest.raises(CaptionParseError):
+        detect_format('notes.txt', 'Some plain text')
+
+@pytest.mark.parametrize('value, seconds', [
+    ('00:00:01,250', 1.25),
+    ('01:02:03.500', 3723.5),
+    ('02:03.000', 123.0),
+])
+def test_parse_timestamp(value, seconds):
+    assert parse_timestamp(value) == pytest.approx(seconds)
+
+def test_parse_timestamp_rejects_garbage():
+    with pytest.raises(CaptionParseError):
+        parse_timestamp('aa:bb')
+
+def test_srt_cues():
+    assert list(iter_cues(SRT.splitlines(True))) == [
+        {'text': 'Today we look at', 'start': 1.0, 'end': 2.5},
+        {'text': 'list comprehensions.', 'start': 2.5, 'end': 4.0},
+    ]
+
+def test_vtt_cues_skip_header_and_notes_and_strip_markup():
+    assert list(iter_cues(VTT.splitlines())) == [
+        {'text': 'Hello everyone', 'start': 1.0, 'end': 2.0},
+        {'text': "Let's begin.", 'start': 2.0, 'end': 3.5},
+    ]
+
+def test_cue_ending_before_start_is_rejected():
+    with pytest.raises(CaptionParseError):
+        list(iter_cues(['1', '00:00:05,000 --> 00:00:04,000', 'backwards']))
+
+def test_merger_joins_cues_up_to_a_sentence_end():
+    merger = CueMerger()
+    assert merger.feed({'text': 'Today we look', 'start': 0.0, 'end': 1.0}) == []
+    assert merger.feed({'text': 'at loops.', 'start': 1.0, 'end': 2.0}) == [
+        {'text': 'Today we look at loops.', 'start': 0.0, 'end': 2.0}
+    ]
+    assert merger.close() == []
+
+def test_merger_splits_on_pause_and_max_words():
+    merger = CueMerger(max_words=4, max_gap_seconds=2.0)
+    assert merger.feed({'text': 'one two', 'start': 0.0, 'end': 1.0}) == []
+    assert merger.feed({'text': 'three', 'start': 5.0, 'end': 6.0}) == [
+        {'text': 'one two', 'start': 0.0, 'end': 1.0}
+    ]
+    assert merger.feed({'text': 'four five six', 'start': 6.0, 'end': 7.0}) == [
+        {'text': 'three four five six', 'start': 5.0, 'end': 7.0}
+    ]
+
+def test_merger_drops_rolling_repeats():
+    merger = CueMerger()
+    merger.feed({'text': 'we start with the basic loop', 'start': 0.0, 'end': 2.0})
+    merger.feed({'text': 'with the basic loop and then a', 'start': 2.0, 'end': 3.0})
+    assert merger.feed({'text': 'the the end.', 'start': 3.0, 'end': 4.0}) == [{
+        'text': 'we start with the basic loop and then a the the end.', 'start': 0.0, 'end': 4.0
+    }]
+
+@pytest.mark.asyncio
+async def test_json_caption_array_streams(tmp_path):
+    path = tmp_path / 'captions.json'
+    path.write_text(json.dumps([
+        {'text': 'First  cue', 'start': 0, 'end': 1.5},
+        {'text': '', 'start': 1.5, 'end': 2},
+        {'text': 'Second.', 'start_time': 2, 'end_time': 3},
+    ]), encoding='utf-8')
+    cues = [cue async for cue in iter_caption_file(str(path))]
+    assert cues == [
+        {'text': 'First cue', 'start': 0.0, 'end': 1.5},
+        {'text': 'Second.', 'start': 2.0, 'end': 3.0},
+    ]
+
+@pytest.mark.asyncio
+async def test_json_captions_under_segments_key(tmp_path):
+    path = tmp_path / 'captions.json'
+    path.write_text(json.dumps({'language': 'en', 'segments': [{'text': 'Hi.', 'start': 0, 'end': 1}]}))
+    assert await load_caption_segments(str(path)) == [{'text': 'Hi.', 'start': 0.0, 'end': 1.0}]
+
+@pytest.mark.asyncio
+async def test_truncated_json_captions_are_rejected(tmp_path):
+    path = tmp_path / 'captions.json'
+    path.write_text('[{"text": "Hi.", "start": 0, "end": 1}, {"text": "cut')
+    with pytest.raises(CaptionParseError):
+        await load_caption_segments(str(path))
+
+@pytest.mark.asyncio
+async def test_srt_file_is_merged_into_segments(tmp_path):
+    path = tmp_path / 'lecture.srt'
+    path.write_text(SRT, encoding='utf-8')
+    assert await load_caption_segments(str(path)) == [
+        {'text': 'Today we look at list comprehensions.', 'start': 1.0, 'end': 4.0}
+    ]
+
+@pytest.mark.asyncio
+async def test_empty_caption_file_is_rejected(tmp_path):
+    path = tmp_path / 'empty.vtt'
+    path.write_text('WEBVTT\n\n')
+    with pytest.raises(CaptionParseError):
+        await load_caption_segments(str(path))
+
+@pytest.mark.asyncio
+async def test_sniff_format_reads_content_when_extension_is_unknown(tmp_path):
+    path = tmp_path / 'captions_upload.txt'
+    path.write_text('WEBVTT\n\n00:00.000 --> 00:01.000\nHi.\n', encoding='utf-8')
+    assert await sniff_format(str(path), 'lecture.txt') == 'vtt'
+    assert await sniff_format(str(path), None) == 'vtt'
+    # A known extension is trusted
+    assert await sniff_format(str(path), 'lecture.srt') == 'srt'
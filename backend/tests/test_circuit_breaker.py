@@ -0,0 +1,127 @@
+import pytest
+
+import utils.circuit_breaker as circuit_breaker_module
+from config import settings
+from utils.circuit_breaker import CircuitBreaker, CircuitBreakerRegistry, CircuitState
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker_module, 'time', clock)
+    monkeypatch.setattr(settings, 'CIRCUIT_WINDOW_SECONDS', 60.0)
+    monkeypatch.setattr(settings, 'CIRCUIT_MIN_REQUESTS', 4)
+    monkeypatch.setattr(settings, 'CIRCUIT_ERROR_RATE', 0.5)
+    monkeypatch.setattr(settings, 'CIRCUIT_SLOW_CALL_SECONDS', 10.0)
+    monkeypatch.setattr(settings, 'CIRCUIT_SLOW_CALL_RATE', 0.8)
+    monkeypatch.setattr(settings, 'CIRCUIT_OPEN_SECONDS', 30.0)
+    monkeypatch.setattr(settings, 'CIRCUIT_HALF_OPEN_PROBES', 2)
+    return clock
+
+def tripped(breaker):
+    for _ in range(2):
+        breaker.record_success(1.0)
+    for _ in range(2):
+        breaker.record_failure(1.0)
+    return breaker
+
+def test_closed_circuit_needs_min_requests_before_tripping(clock):
+    breaker = CircuitBreaker('gemini')
+    for _ in range(3):
+        breaker.record_failure(1.0)
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.allow_request()
+    breaker.record_failure(1.0)
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.last_trip_reason == 'error rate 100%'
+
+def test_error_rate_trips_the_circuit(clock):
+    breaker = tripped(CircuitBreaker('gemini'))
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.times_opened == 1
+    assert not breaker.allow_request()
+    assert breaker.health_score() == 0.0
+
+def test_slow_calls_trip_the_circuit(clock):
+    breaker = CircuitBreaker('gemini')
+    breaker.record_success(1.0)
+    for _ in range(4):
+        breaker.record_success(12.0)
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.last_trip_reason.startswith('slow calls 80%')
+
+def test_old_outcomes_leave_the_window(clock):
+    breaker = CircuitBreaker('gemini')
+    for _ in range(3):
+        breaker.record_failure(1.0)
+    clock.now += 61
+    for _ in range(3):
+        breaker.record_success(1.0)
+    breaker.record_failure(1.0)
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.snapshot()['window_requests'] == 4
+
+def test_open_circuit_half_opens_and_closes_after_successful_probes(clock):
+    breaker = tripped(CircuitBreaker('gemini'))
+    clock.now += 29
+    assert not breaker.is_available()
+    clock.now += 1
+    assert breaker.is_available()
+    assert breaker.allow_request()
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.allow_request()
+    # Both probe slots are taken
+    assert not breaker.allow_request()
+    breaker.record_success(1.0)
+    assert breaker.state == CircuitState.HALF_OPEN
+    breaker.record_success(1.0)
+    assert breaker.state == CircuitState.CLOSED
+    # The failures that tripped it are forgotten
+    assert breaker.snapshot()['window_requests'] == 0
+
+def test_failed_probe_reopens_the_circuit(clock):
+    breaker = tripped(CircuitBreaker('gemini'))
+    clock.now += 30
+    assert breaker.allow_request()
+    breaker.record_failure(1.0)
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.last_trip_reason == 'probe failed'
+    assert breaker.times_opened == 2
+    assert breaker.snapshot()['half_open_in_seconds'] == 30.0
+
+def test_released_probe_frees_its_slot(clock):
+    breaker = tripped(CircuitBreaker('gemini'))
+    clock.now += 30
+    assert breaker.allow_request() and breaker.allow_request()
+    breaker.release_probe()
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.allow_request()
+
+def test_reset_closes_the_circuit(clock):
+    breaker = tripped(CircuitBreaker('gemini'))
+    breaker.reset()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.allow_request()
+    assert breaker.health_score() == 1.0
+
+def test_health_score_combines_errors_and_latency(clock):
+    breaker = CircuitBreaker('gemini')
+    breaker.record_success(20.0)
+    breaker.record_failure(20.0)
+    breaker.record_success(20.0)
+    assert breaker.health_score() == round((1 - 1 / 3) * 0.5, 3)
+
+def test_registry_selects_the_first_available_provider(clock):
+    registry = CircuitBreakerRegistry()
+    assert registry.select(['gemini', 'groq']) == 'gemini'
+    tripped(registry.for_provider('gemini'))
+    assert registry.select(['gemini', 'groq']) == 'groq'
+    tripped(registry.for_provider('groq'))
+    assert registry.select(['gemini', 'groq']) is None
+    assert registry.get_stats()['gemini']['state'] == 'open'
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from utils.hedging import HedgingPolicy
+
+@pytest.fixture
+def hedging(client):
+    policy = HedgingPolicy()
+    policy.enabled = True
+    policy.min_samples = 3
+    policy.min_delay = 0.01
+    policy.percentile = 95
+    for _ in range(3):
+        policy.record_latency('evaluate', 0.02)
+    client.hedging = policy
+    return policy
+
+def samples(policy):
+    return list(policy._tracker('evaluate')._samples)
+
+def test_no_delay_until_enough_history():
+    policy = HedgingPolicy()
+    policy.min_samples = 2
+    policy.min_delay = 0.5
+    policy.record_latency('evaluate', 3.0)
+    assert policy.hedge_delay('evaluate') is None
+    policy.record_latency('evaluate', 1.0)
+    assert policy.hedge_delay('evaluate') == 3.0
+    policy.record_latency('rewrite', 0.1)
+    policy.record_latency('rewrite', 0.1)
+    assert policy.hedge_delay('rewrite') == 0.5
+
+def test_budget_caps_the_hedge_rate():
+    policy = HedgingPolicy()
+    policy.budget.max_rate, policy.budget.burst, policy.budget.credit = 0.5, 1.0, 1.0
+    assert policy.can_hedge()
+    policy.record_hedge()
+    policy.start_request()
+    assert not policy.can_hedge()
+    policy.start_request()
+    assert policy.can_hedge()
+    assert policy.stats['budget_exhausted'] == 1
+
+@pytest.mark.asyncio
+async def test_slow_primary_is_hedged_and_only_its_latency_is_recorded(client, providers, hedging):
+    providers.delay = {'gemini': 0.2, 'groq': 0.01}
+    providers.answers = {'gemini': [{'from': 'gemini'}], 'groq': [{'from': 'groq'}]}
+    credit = hedging.budget.credit
+    assert await client.call_llm('prompt', use_cache=False) == {'from': 'groq'}
+    assert hedging.stats['hedged'] == 1 and hedging.stats['hedge_wins'] == 1
+    assert hedging.budget.credit == pytest.approx(min(hedging.budget.burst, credit + hedging.budget.max_rate) - 1.0)
+    # The backup's answer at ~0.02s is not a sample; the primary's ~0.2s is, once it finishes
+    assert samples(hedging) == [0.02] * 3
+    await asyncio.sleep(0.25)
+    assert len(samples(hedging)) == 4 and samples(hedging)[-1] >= 0.2
+
+@pytest.mark.asyncio
+async def test_refused_backup_does_not_spend_the_budget(client, providers, hedging):
+    providers.delay = {'gemini': 0.05}
+    client.circuit_breakers.for_provider('groq').allow_request = lambda: False
+    credit = hedging.budget.credit
+    assert await client.call_llm('prompt', use_cache=False) == {'text': 'gemini answer'}
+    assert hedging.stats['hedged'] == 0
+    assert hedging.budget.credit == pytest.approx(min(hedging.budget.burst, credit + hedging.budget.max_rate))
+    assert [call[0] for call in providers.calls] == ['gemini']
+    assert samples(hedging)[-1] >= 0.05
+
+@pytest.mark.asyncio
+async def test_fast_primary_is_not_hedged(client, providers, hedging):
+    assert await client.call_llm('prompt', use_cache=False) == {'text': 'gemini answer'}
+    assert hedging.stats['hedged'] == 0
+    assert len(samples(hedging)) == 4
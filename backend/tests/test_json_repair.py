@@ -0,0 +1,61 @@
+import pytest
+
+from utils.json_repair import parse_json, repair_json, strip_code_fences, JSONRepairError
+
+def test_valid_json_parses_strictly():
+    assert parse_json('{"clarity": {"score": 8, "reason": "ok"}}') == {'clarity': {'score': 8, 'reason': 'ok'}}
+
+def test_fences_inside_string_values_are_kept():
+    assert parse_json('{"a": "text with ``` inside", "b": 1}') == {'a': 'text with ``` inside', 'b': 1}
+
+def test_rewrite_quoting_a_code_block():
+    text = '{"rewrite": "Try this:\\n```python\\nprint(1)\\n```", "score": 7}'
+    assert parse_json(text) == {'rewrite': 'Try this:\n```python\nprint(1)\n```', 'score': 7}
+
+def test_leading_fence_is_removed():
+    assert parse_json('```json\n{"a": 1}\n```') == {'a': 1}
+    assert parse_json('```\n[1, 2]\n```') == [1, 2]
+
+def test_prose_around_fenced_block_is_repaired():
+    assert parse_json('Here you go:\n```json\n{"a": 1, "b": [1, 2,]}\n```') == {'a': 1, 'b': [1, 2]}
+
+def test_strip_code_fences():
+    assert strip_code_fences('```json\n{"a": 1}\n```') == '{"a": 1}'
+    assert strip_code_fences('{"a": 1}') == '{"a": 1}'
+
+@pytest.mark.parametrize('text, expected', [
+    ('{a: 1, b: True,}', {'a': 1, 'b': True}),
+    ("{'single': 1, \"a\": None}", {'single': 1, 'a': None}),
+    ('{"reason": "He said "yes" to it", "score": 5}', {'reason': 'He said "yes" to it', 'score': 5}),
+    ('{"text": "line one\nline two"}', {'text': 'line one\nline two'}),
+    ('{"a": .5, "b": 2.}', {'a': 0.5, 'b': 2.0}),
+    ('Sure! {"a": [1, 2], "b": "x"} Hope that helps.', {'a': [1, 2], 'b': 'x'}),
+])
+def test_repairs(text, expected):
+    assert parse_json(text) == expected
+
+def test_truncated_object_keeps_complete_values():
+    text = '{"clarity": {"score": 8, "reason": "ok"}, "structure": {"score": 7, "rea'
+    assert parse_json(text) == {'clarity': {'score': 8, 'reason': 'ok'}, 'structure': {'score': 7}}
+
+def test_truncated_array_drops_the_cut_key():
+    text = '[{"text": "a", "start": 1, "end": 2}, {"text": "b", "start": 3, "end":'
+    assert parse_json(text, expect='array') == [{'text': 'a', 'start': 1, 'end': 2}, {'text': 'b', 'start': 3}]
+
+def test_unescaped_quotes_that_shift_keys_are_rejected():
+    with pytest.raises(JSONRepairError):
+        parse_json('{"reason": "He said "yes", then left", "score": 5}')
+
+def test_unescaped_quote_that_cuts_the_last_value_is_rejected():
+    with pytest.raises(JSONRepairError):
+        parse_json('{"score": 8, "reason": "He said: "yes", then left"}')
+
+def test_expect_selects_the_root():
+    assert parse_json('[1] then {"a": 1}', expect='object') == {'a': 1}
+    assert parse_json('{"a": [1, 2]}', expect='array') == [1, 2]
+
+def test_no_json_raises():
+    with pytest.raises(JSONRepairError):
+        parse_json('no json here')
+    with pytest.raises(JSONRepairError):
+        repair_json('still nothing')
@@ -0,0 +1,53 @@
+import json
+
+from utils.json_stream import IncrementalJSONParser
+
+EVALUATION = {
+    'clarity': {'score': 8, 'reason': 'Uses {braces} and "quotes" in text'},
+    'structure': {'score': 7, 'reason': 'ok', 'evidence': ['a', 'b]']},
+    'pacing': 6,
+    'note': 'trailing, with comma',
+}
+
+def feed_all(text, chunk_size):
+    parser = IncrementalJSONParser()
+    members = []
+    for start in range(0, len(text), chunk_size):
+        members.extend(parser.feed(text[start:start + chunk_size]))
+    return parser, members
+
+def test_object_members_in_any_chunking():
+    text = '```json\n' + json.dumps(EVALUATION) + '\n```'
+    for chunk_size in (1, 3, 17, len(text)):
+        parser, members = feed_all(text, chunk_size)
+        assert dict(members) == EVALUATION
+        assert parser.root_type == 'object'
+        assert parser.done
+        assert parser.completed_keys == list(EVALUATION)
+
+def test_member_is_returned_as_soon_as_it_closes():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"clarity": {"score": 8, "reason": "ok"') == []
+    assert parser.feed('}, "struct') == [('clarity', {'score': 8, 'reason': 'ok'})]
+    assert parser.feed('ure": 5}') == [('structure', 5)]
+    assert parser.done
+
+def test_array_elements_are_indexed():
+    items = [{'text': 'a', 'start': 0}, {'text': 'b, c', 'start': 1}, 3]
+    _, members = feed_all(json.dumps(items), 4)
+    assert members == list(enumerate(items))
+
+def test_malformed_member_is_skipped():
+    parser, members = feed_all('[{"a": 1}, {"b": oops}, {"c": 3}]', 5)
+    assert members == [(0, {'a': 1}), (2, {'c': 3})]
+    assert parser.done
+
+def test_truncated_stream_is_not_done():
+    parser, members = feed_all('{"a": 1, "b": {"c": 2', 4)
+    assert members == [('a', 1)]
+    assert not parser.done
+
+def test_text_after_the_root_is_ignored():
+    parser = IncrementalJSONParser()
+    assert parser.feed('[1, 2] and then [3]') == [(0, 1), (1, 2)]
+    assert parser.feed('[4]') == []
@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from utils.llm_client import LLMClientError
+from utils.token_budget import estimate_tokens
+
+@pytest.mark.asyncio
+async def test_identical_call_is_served_from_the_cache(client, providers):
+    providers.answers['gemini'] = [{'score': 8}]
+    first = await client.call_llm('prompt', task_type='evaluate')
+    first['score'] = 1
+    assert await client.call_llm('prompt', task_type='evaluate') == {'score': 8}
+    assert len(providers.calls) == 1
+    await client.call_llm('prompt', task_type='evaluate', max_output_tokens=100)
+    assert len(providers.calls) == 2
+
+@pytest.mark.asyncio
+async def test_answer_rejected_by_validate_is_not_cached(client, providers):
+    providers.answers['gemini'] = [{'broken': True}, {'score': 8}]
+    valid = lambda result: 'score' in result
+    assert await client.call_llm('prompt', validate=valid) == {'broken': True}
+    assert await client.call_llm('prompt', validate=valid) == {'score': 8}
+    assert await client.call_llm('prompt', validate=valid) == {'score': 8}
+    assert len(providers.calls) == 2
+
+@pytest.mark.asyncio
+async def test_cached_answer_failing_validate_is_asked_again(client, providers):
+    providers.answers['gemini'] = [{'broken': True}, {'score': 8}]
+    await client.call_llm('prompt')
+    assert await client.call_llm('prompt', validate=lambda result: 'score' in result) == {'score': 8}
+    assert await client.call_llm('prompt') == {'score': 8}
+    assert len(providers.calls) == 2
+
+@pytest.mark.asyncio
+async def test_mock_answers_are_not_cached(client, providers):
+    providers.answers = {'gemini': [LLMClientError('down')], 'groq': [LLMClientError('down')]}
+    await client.call_llm('prompt', task_type='coherence', max_retries=2)
+    assert client.response_cache.stats['writes'] == 0
+
+@pytest.mark.asyncio
+async def test_fallback_answer_is_filed_under_the_model_that_answered(client, providers):
+    providers.answers = {'gemini': [LLMClientError('down'), {'from': 'gemini'}], 'groq': [{'from': 'groq'}]}
+    assert await client.call_llm('prompt', max_retries=2) == {'from': 'groq'}
+    entry = next(iter(client.response_cache._memory.values()))
+    assert entry[1] == {'from': 'groq'}
+    assert client.response_cache.stats['writes'] == 1
+    # The routed model has nothing cached, so Gemini is asked once it recovers
+    assert await client.call_llm('prompt', max_retries=2) == {'from': 'gemini'}
+    
+    routed_key = client.response_cache.make_key(
+        'prompt', 'evaluate', client.models['gemini'], 0.7, 'json', client.token_budget.max_output_tokens('evaluate')
+    )
+    assert await client.response_cache.get(routed_key) == {'from': 'gemini'}
+
+@pytest.mark.asyncio
+async def test_bypassed_task_is_never_cached(client, providers):
+    await client.call_llm('prompt', task_type='rewrite')
+    await client.call_llm('prompt', task_type='rewrite')
+    assert len(providers.calls) == 2
+    assert client.response_cache.stats['bypassed'] == 2
+
+@pytest.mark.asyncio
+async def test_oversized_prompt_is_cut_to_the_input_budget(client, providers, monkeypatch):
+    monkeypatch.setitem(client.token_budget.input_limits, 'coherence', 300)
+    session_text = " ".join(f"Sentence {i} of the session." for i in range(1000))
+    prompt = f"SESSION TEXT:\n{session_text}\n\nFind contradictions and return JSON."
+    await client.call_llm(prompt, task_type='coherence')
+    sent = providers.calls[0][1]
+    assert estimate_tokens(sent) <= 300
+    assert sent.startswith("SESSION TEXT:\nSentence 0 of the session.")
+    assert sent.endswith("session.\n\nFind contradictions and return JSON.")
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_request(client, providers):
+    providers.delay = 0.05
+    providers.answers['gemini'] = [{'score': 8, 'reason': {'text': 'ok'}}]
+    results = await asyncio.gather(*(client.call_llm('prompt', use_cache=False, hedge=False) for _ in range(3)))
+    assert len(providers.calls) == 1
+    assert client.coalesce_stats == {'leaders': 1, 'coalesced': 2}
+    assert all(result == {'score': 8, 'reason': {'text': 'ok'}} for result in results)
+    # Every caller gets its own copy, nested values included
+    results[1]['reason']['text'] = 'changed'
+    assert results[0]['reason']['text'] == 'ok' and results[2]['reason']['text'] == 'ok'
+    assert client._in_flight == {}
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_still_serves_its_waiters(client, providers):
+    providers.delay = 0.05
+    providers.answers['gemini'] = [{'score': 8}]
+    leader = asyncio.create_task(client.call_llm('prompt', use_cache=False, hedge=False))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(client.call_llm('prompt', use_cache=False, hedge=False))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    assert await waiter == {'score': 8}
+    assert leader.cancelled()
+    assert len(providers.calls) == 1
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_without_waiters_cancels_the_request(client, providers):
+    providers.delay = 0.05
+    leader = asyncio.create_task(client.call_llm('prompt', use_cache=False, hedge=False))
+    await asyncio.sleep(0.01)
+    request = next(iter(client._in_flight.values()))
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    await asyncio.sleep(0)
+    assert request.cancelled()
+    assert client._in_flight == {}
+
+@pytest.mark.asyncio
+async def test_coalesce_false_sends_every_call(client, providers):
+    providers.delay = 0.02
+    await asyncio.gather(*(client.call_llm('prompt', use_cache=False, coalesce=False, hedge=False) for _ in range(3)))
+    assert len(providers.calls) == 3
+    assert client.coalesce_stats == {'leaders': 0, 'coalesced': 0}
@@ -0,0 +1,65 @@
+import pytest
+
+import services.llm_evaluator as llm_evaluator_module
+from models.transcript import TranscriptSegment
+from services.llm_evaluator import LLMEvaluator
+
+METRICS = LLMEvaluator().required_keys
+
+def scores(value=8.0):
+    return {m: {'score': value, 'reason': 'ok', 'evidence': []} for m in METRICS}
+
+def batch_answer(segment_ids, value=8.0, broken=()):
+    """A batch answer; segments in broken lose their relevance metric"""
+    entries = []
+    for segment_id in segment_ids:
+        entry = dict(scores(value), segment_id=segment_id)
+        if segment_id in broken:
+            del entry['relevance']
+        entries.append(entry)
+    return {'evaluations': entries}
+
+@pytest.fixture
+def evaluator(client, monkeypatch):
+    monkeypatch.setattr(llm_evaluator_module, 'llm_client', client)
+    monkeypatch.setattr(llm_evaluator_module.settings, 'EVAL_BATCH_MAX_RETRIES', 2)
+    return LLMEvaluator()
+
+def segments(count):
+    return [
+        TranscriptSegment(segment_id=i, text=f'segment {i} explains loops', start_time=i * 10.0, end_time=i * 10.0 + 9)
+        for i in range(count)
+    ]
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_sent_again_instead_of_served_from_the_cache(evaluator, providers):
+    providers.answers['gemini'] = [batch_answer([0, 1], broken={0, 1}), batch_answer([0, 1], value=7.0)]
+    results = await evaluator.evaluate_batch(segments(2), 'python')
+    # Round two re-packs the same prompt; the invalid answer was not stored for it
+    assert len(providers.calls) == 2
+    assert providers.calls[0][1] == providers.calls[1][1]
+    assert {segment_id: result['clarity'].score for segment_id, result in results.items()} == {0: 7.0, 1: 7.0}
+
+@pytest.mark.asyncio
+async def test_only_failed_entries_are_retried(evaluator, providers):
+    providers.answers['gemini'] = [batch_answer([0, 1, 2], broken={1}), batch_answer([1], value=6.0)]
+    results = await evaluator.evaluate_batch(segments(3), 'python')
+    assert len(providers.calls) == 2
+    assert '[SEGMENT 1]' in providers.calls[1][1] and '[SEGMENT 0]' not in providers.calls[1][1]
+    assert [results[i]['clarity'].score for i in range(3)] == [8.0, 6.0, 8.0]
+
+@pytest.mark.asyncio
+async def test_valid_batch_answer_is_cached(evaluator, providers):
+    providers.answers['gemini'] = [batch_answer([0, 1])]
+    first = await evaluator.evaluate_batch(segments(2), 'python')
+    second = await evaluator.evaluate_batch(segments(2), 'python')
+    assert len(providers.calls) == 1
+    assert first == second
+
+@pytest.mark.asyncio
+async def test_segments_failing_every_round_are_evaluated_individually(evaluator, providers):
+    broken = batch_answer([0], broken={0})
+    providers.answers['gemini'] = [broken, broken, broken, scores(5.0)]
+    results = await evaluator.evaluate_batch(segments(1), 'python')
+    assert len(providers.calls) == 4
+    assert results[0]['clarity'].score == 5.0
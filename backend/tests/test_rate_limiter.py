@@ -0,0 +1,169 @@
+import asyncio
+
+import pytest
+
+import utils.rate_limiter as rate_limiter_module
+from config import settings
+from utils.rate_limiter import AIMDConcurrencyLimiter, ProviderRateLimiter, TokenBucket
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter_module, 'time', clock)
+    return clock
+
+def test_bucket_starts_full_and_refills_at_the_per_minute_rate(clock):
+    bucket = TokenBucket(per_minute=60)
+    assert bucket.time_until_available(60) == 0.0
+    bucket.consume(60)
+    assert bucket.time_until_available(1) == pytest.approx(1.0)
+    clock.now += 30
+    assert bucket.time_until_available(30) == 0.0
+    assert bucket.time_until_available(40) == pytest.approx(10.0)
+
+def test_bucket_never_fills_beyond_capacity(clock):
+    bucket = TokenBucket(per_minute=60, capacity=10)
+    clock.now += 3600
+    bucket.consume(0)
+    assert bucket.tokens == 10
+
+def test_request_larger_than_capacity_waits_for_a_full_bucket(clock):
+    bucket = TokenBucket(per_minute=60, capacity=10)
+    bucket.consume(10)
+    assert bucket.time_until_available(500) == pytest.approx(10.0)
+    clock.now += 10
+    assert bucket.time_until_available(500) == 0.0
+    bucket.consume(500)
+    assert bucket.tokens == -490
+
+def test_adjust_charges_the_difference_and_may_go_into_debt(clock):
+    bucket = TokenBucket(per_minute=600)
+    bucket.consume(100)
+    bucket.adjust(700)
+    assert bucket.tokens == -200
+    assert bucket.time_until_available(100) == pytest.approx(30.0)
+    bucket.adjust(-10000)
+    assert bucket.tokens == bucket.capacity
+
+def test_aimd_window_grows_additively_and_halves_on_rate_limits():
+    limiter = AIMDConcurrencyLimiter(initial_limit=4, min_limit=1, max_limit=5, decrease_factor=0.5)
+    for _ in range(4):
+        limiter.on_success()
+    assert 4.9 < limiter.limit <= 5
+    for _ in range(10):
+        limiter.on_success()
+    assert limiter.limit == 5
+    limiter.on_rate_limited()
+    assert limiter.limit == 2.5
+    for _ in range(5):
+        limiter.on_rate_limited()
+    assert limiter.limit == 1
+    limiter.in_flight = 1
+    assert not limiter.has_capacity()
+
+def test_rate_limited_provider_is_blocked_for_retry_after(clock):
+    limiter = ProviderRateLimiter('gemini', requests_per_minute=60, tokens_per_minute=60000)
+    limiter.record_rate_limited(retry_after=12)
+    stats = limiter.get_stats()
+    assert stats['rate_limited'] == 1
+    assert stats['blocked_for_seconds'] == 12.0
+    limiter.record_token_usage(estimated_tokens=1000, actual_tokens=3000)
+    assert limiter.get_stats()['token_budget_available'] == 58000
+
+@pytest.mark.asyncio
+async def test_slot_holds_calls_beyond_the_concurrency_window(monkeypatch):
+    monkeypatch.setattr(settings, 'LLM_INITIAL_CONCURRENCY', 2)
+    monkeypatch.setattr(settings, 'LLM_INTERACTIVE_RESERVED_SLOTS', 0)
+    limiter = ProviderRateLimiter('gemini', requests_per_minute=600, tokens_per_minute=600000)
+    peak = 0
+    
+    async def call():
+        nonlocal peak
+        async with limiter.slot(100):
+            peak = max(peak, limiter.concurrency.in_flight)
+            await asyncio.sleep(0.01)
+    
+    await asyncio.gather(*(call() for _ in range(6)))
+    assert peak == 2
+    assert limiter.get_stats()['requests'] == 6
+    assert limiter.concurrency.in_flight == 0
+
+def single_slot_limiter(monkeypatch, slots=1, reserved=0, aging_seconds=60.0):
+    monkeypatch.setattr(settings, 'LLM_INITIAL_CONCURRENCY', slots)
+    monkeypatch.setattr(settings, 'LLM_INTERACTIVE_RESERVED_SLOTS', reserved)
+    monkeypatch.setattr(settings, 'LLM_PRIORITY_AGING_SECONDS', aging_seconds)
+    return ProviderRateLimiter('gemini', requests_per_minute=600, tokens_per_minute=600000)
+
+async def admission_order(limiter, priorities):
+    """Queue one call per priority behind a held slot; returns the order they get in"""
+    order = []
+    release = asyncio.Event()
+    
+    async def holder():
+        async with limiter.slot(1, priority='normal'):
+            await release.wait()
+    
+    async def call(name, priority):
+        async with limiter.slot(1, priority=priority):
+            order.append(name)
+    
+    held = asyncio.create_task(holder())
+    await asyncio.sleep(0)
+    calls = []
+    for name, priority in priorities:
+        calls.append(asyncio.create_task(call(name, priority)))
+        await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(held, *calls)
+    return order
+
+@pytest.mark.asyncio
+async def test_waiting_calls_are_admitted_by_priority(monkeypatch):
+    limiter = single_slot_limiter(monkeypatch)
+    order = await admission_order(limiter, [
+        ('bulk', 'bulk'), ('normal', 'normal'), ('interactive', 'interactive'), ('bulk 2', 'bulk')
+    ])
+    assert order == ['interactive', 'normal', 'bulk', 'bulk 2']
+    assert limiter.get_stats()['by_priority']['bulk']['requests'] == 2
+
+@pytest.mark.asyncio
+async def test_priority_comes_from_the_calling_task(monkeypatch):
+    limiter = single_slot_limiter(monkeypatch)
+    
+    async def bulk_call():
+        with rate_limiter_module.llm_priority('bulk'):
+            async with limiter.slot(1):
+                pass
+    
+    await bulk_call()
+    async with limiter.slot(1):
+        pass
+    stats = limiter.get_stats()['by_priority']
+    assert stats['bulk']['requests'] == 1 and stats['normal']['requests'] == 1
+
+def test_long_waiting_bulk_call_overtakes_newer_interactive_ones(clock):
+    bulk = rate_limiter_module._Ticket('bulk', 1, aging_seconds=10.0, seq=0)
+    clock.now += 15
+    interactive = rate_limiter_module._Ticket('interactive', 1, aging_seconds=10.0, seq=1)
+    assert interactive.key < bulk.key
+    clock.now += 10
+    later = rate_limiter_module._Ticket('interactive', 1, aging_seconds=10.0, seq=2)
+    assert bulk.key < later.key
+
+@pytest.mark.asyncio
+async def test_reserved_slots_are_kept_for_interactive_calls(monkeypatch):
+    limiter = single_slot_limiter(monkeypatch, slots=2, reserved=1)
+    async with limiter.slot(1, priority='bulk'):
+        assert not limiter._eligible(rate_limiter_module._Ticket('bulk', 1, 60.0, 99))
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(limiter.slot(1, priority='normal').__aenter__(), 0.05)
+        async with limiter.slot(1, priority='interactive'):
+            assert limiter.concurrency.in_flight == 2
+    assert limiter.get_stats()['queued'] == {'interactive': 0, 'normal': 0, 'bulk': 0}
@@ -0,0 +1,123 @@
+import random
+
+import pytest
+
+from models.evaluation import SegmentEvaluation
+from services.scoring import METRICS, ScoreMatrix, ScoringService
+
+CORE = METRICS[:5]
+ADVANCED = METRICS[5:]
+
+def document(segment_id, scores):
+    """A stored segment evaluation with the given {metric: score}"""
+    return dict(
+        {m: {'score': s, 'reason': f'{m} reason', 'evidence': []} for m, s in scores.items()},
+        segment_id=segment_id, text='...', overall_segment_score=0.0
+    )
+
+def random_documents(count, seed=11):
+    rng = random.Random(seed)
+    documents = []
+    for i in range(count):
+        metrics = CORE + tuple(m for m in ADVANCED if rng.random() < 0.7)
+        documents.append(document(i, {m: round(rng.uniform(1.0, 10.0), 1) for m in metrics}))
+    return documents
+
+def loop_means(segments):
+    """Per-metric means as ScoringService computed them before ScoreMatrix"""
+    means = {}
+    for m in METRICS:
+        scores = [getattr(s, m).score for s in segments if getattr(s, m)]
+        means[m] = round(sum(scores) / len(scores), 2) if scores else None
+    return means
+
+@pytest.fixture
+def service():
+    return ScoringService()
+
+@pytest.fixture
+def segments():
+    return [SegmentEvaluation(**doc) for doc in random_documents(60)]
+
+def test_matrix_segment_scores_match_the_scalar_formula(service, segments):
+    assert service.compute_segment_scores(segments) == [service.compute_segment_score(s) for s in segments]
+
+def test_overall_metrics_match_the_loop_means(service, segments):
+    metrics = service.compute_overall_metrics(segments)
+    assert metrics.model_dump() == loop_means(segments)
+    assert service.compute_overall_metrics(ScoreMatrix.from_segments(segments)) == metrics
+
+def test_from_documents_matches_from_segments(segments):
+    from_documents = ScoreMatrix.from_documents([s.model_dump() for s in segments])
+    from_segments = ScoreMatrix.from_segments(segments)
+    assert (from_documents.scores == from_segments.scores).all()
+    assert (from_documents.mask == from_segments.mask).all()
+
+def test_missing_metrics_are_masked(service):
+    segments = [
+        SegmentEvaluation(**document(0, {m: 7.0 for m in CORE})),
+        SegmentEvaluation(**document(1, {m: 9.0 for m in CORE + ('relevance',)})),
+    ]
+    matrix = ScoreMatrix.from_segments(segments)
+    assert matrix.mask[0].tolist() == [True] * 5 + [False] * 5
+    assert matrix.mask[1, METRICS.index('relevance')]
+    metrics = service.compute_overall_metrics(matrix)
+    assert metrics.clarity == 8.0
+    assert metrics.relevance == 9.0
+    assert metrics.engagement is None
+    # A missing metric adds nothing rather than counting as zero
+    assert service.compute_segment_scores(matrix) == [service.compute_segment_score(s) for s in segments]
+
+def test_overall_score_matches_the_metrics(service, segments):
+    metrics = service.compute_overall_metrics(segments)
+    expected = round(sum(
+        getattr(metrics, m) * service.weights[m] for m in METRICS if getattr(metrics, m) is not None
+    ), 2)
+    assert service.compute_overall_score(metrics) == pytest.approx(expected, abs=0.01)
+
+def test_strengths_and_weaknesses_use_the_rounded_means(service):
+    # clarity averages to 5.325: round() gives 5.33, np.round 5.32 (half-even from 532.5)
+    scores = [
+        dict({m: 8.0 for m in CORE}, clarity=5.325, pacing=6.5),
+        dict({m: 8.0 for m in CORE}, clarity=5.325, pacing=6.49),
+    ]
+    segments = [SegmentEvaluation(**document(i, s)) for i, s in enumerate(scores)]
+    strengths, weaknesses = service.identify_strengths_and_weaknesses(segments)
+    metrics = service.compute_overall_metrics(segments)
+    assert weaknesses == [f"Clarity of explanations (score: {metrics.clarity})"]
+    assert metrics.clarity == 5.33
+    assert metrics.model_dump() == loop_means(segments)
+    # pacing averages to 6.495 and rounds up to the threshold
+    assert metrics.pacing == 6.5
+    assert strengths == [
+        f"{service.metric_names[m]} (score: 8.0)" for m in ('structure', 'correctness', 'communication')
+    ]
+    assert service.identify_strengths_and_weaknesses(ScoreMatrix.from_documents(
+        [s.model_dump() for s in segments]
+    )) == (strengths, weaknesses)
+
+def test_topic_drift_segments(service):
+    relevance = [9.0, 5.5, None, 3.0, 8.0]
+    segments = [
+        SegmentEvaluation(**document(i, dict({m: 7.0 for m in CORE}, **({} if r is None else {'relevance': r}))))
+        for i, r in enumerate(relevance)
+    ]
+    alignment = service.analyze_topic_alignment(segments, 'python')
+    assert [(d['segment_id'], d['score'], d['reason']) for d in alignment['topic_drift_segments']] == [
+        (1, 5.5, 'relevance reason'), (3, 3.0, 'relevance reason')
+    ]
+    assert alignment['average_relevance'] == 6.38
+    assert alignment['related_topics_bonus'] == round(2 / 5 * 0.5, 2)
+    from_matrix = service.analyze_topic_alignment(ScoreMatrix.from_segments(segments), 'python')
+    assert [d['segment_id'] for d in from_matrix['topic_drift_segments']] == [1, 3]
+
+def test_older_evaluations_have_no_alignment(service):
+    segments = [SegmentEvaluation(**document(0, {m: 7.0 for m in CORE}))]
+    assert service.analyze_topic_alignment(segments, 'python')['average_relevance'] is None
+
+def test_empty_session(service):
+    matrix = ScoreMatrix.from_documents([])
+    assert service.compute_segment_scores(matrix) == []
+    assert service.identify_strengths_and_weaknesses([]) == ([], [])
+    metrics = service.compute_overall_metrics([])
+    assert metrics.clarity == 0 and metrics.relevance is None
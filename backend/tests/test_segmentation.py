@@ -0,0 +1,151 @@
+import random
+
+import numpy as np
+import pytest
+
+from models.transcript import TranscriptSegment
+from services.segmentation import SegmentationService
+
+FILLER = "the loop variable stays inside the expression while the generator yields values".split()
+
+def make_segments(sizes, topics=None, cues=(), seed=3):
+    """Raw segments of the given word counts; topics[i] adds topic-specific vocabulary"""
+    rng = random.Random(seed)
+    segments = []
+    clock = 0.0
+    for index, size in enumerate(sizes):
+        words = [
+            f"topic{topics[index]}term{rng.randint(0, 19)}" if topics and rng.random() < 0.4 else rng.choice(FILLER)
+            for _ in range(size)
+        ]
+        if index in cues:
+            words[:2] = ["moving", "on"]
+        segments.append(TranscriptSegment(
+            segment_id=index, text=" ".join(words), start_time=clock, end_time=clock + size / 2.5
+        ))
+        clock += size / 2.5
+    return segments
+
+def word_count(seg):
+    return len(seg.text.split())
+
+@pytest.fixture
+def service():
+    service = SegmentationService()
+    service.strategy = 'dp'
+    return service
+
+def assert_partition(raw, logical):
+    """Logical segments cover the raw ones in order, with sequential ids"""
+    assert [seg.segment_id for seg in logical] == list(range(len(logical)))
+    assert " ".join(seg.text for seg in logical) == " ".join(seg.text for seg in raw)
+    assert logical[0].start_time == raw[0].start_time
+    assert logical[-1].end_time == raw[-1].end_time
+    assert all(a.end_time <= b.start_time for a, b in zip(logical, logical[1:]))
+
+def test_dp_segments_stay_within_max_words(service):
+    sizes = [random.Random(seed).randint(15, 90) for seed in range(200)]
+    raw = make_segments(sizes, cues=set(range(0, 200, 7)))
+    logical = service.segment_transcript(raw)
+    assert_partition(raw, logical)
+    assert all(word_count(seg) <= service.max_segment_words for seg in logical)
+    # Evenly sized around the target rather than filled up to the cap
+    assert all(word_count(seg) >= service.min_segment_words for seg in logical[:-1])
+
+def test_dp_keeps_a_long_raw_segment_whole(service):
+    raw = make_segments([80] * 6 + [900] + [80] * 6)
+    logical = service.segment_transcript(raw)
+    assert_partition(raw, logical)
+    long_ones = [seg for seg in logical if word_count(seg) > service.max_segment_words]
+    assert [seg.text for seg in long_ones] == [raw[6].text]
+
+def test_dp_prefers_a_boundary_at_a_cue(service):
+    engine = service.dp_engine
+    cum_words = np.arange(9) * 100.0
+    cues = np.zeros(8)
+    assert engine.boundaries(cum_words, cues, 1.0) == [4, 8]
+    cues[3] = 1.0
+    assert engine.boundaries(cum_words, cues, 0.0) == [4, 8]
+    assert engine.boundaries(cum_words, cues, 1.0) == [3, 8]
+
+def test_cue_scores_look_at_the_opening_words(service):
+    raw = make_segments([20, 20, 20], cues={1})
+    assert service.dp_engine.cue_scores(raw).tolist() == [0.0, 1.0, 0.0]
+
+def test_few_segments_are_returned_as_is(service):
+    raw = make_segments([30] * 5)
+    assert service.segment_transcript(raw) == raw
+    assert service.segment_transcript([]) == []
+
+def test_greedy_splits_at_a_cue_after_min_words(service):
+    service.strategy = 'greedy'
+    raw = make_segments([100] * 10, cues={2, 4})
+    logical = service.segment_transcript(raw)
+    assert_partition(raw, logical)
+    # The cue at 300 words closes a segment, the one at 200 words doesn't; max_segment_words closes the next
+    assert [word_count(seg) for seg in logical] == [300, 600, 100]
+
+def two_topic_transcript(change=20):
+    """Forty 40-word segments, on topic 1 from segment change on"""
+    return make_segments([40] * 40, topics=[0] * change + [1] * (40 - change))
+
+def test_cohesion_scores_are_normalised(service):
+    scores = service.cohesion_scorer.boundary_scores(two_topic_transcript())
+    assert scores.shape == (40,)
+    assert scores[0] == 0.0
+    assert scores.min() >= 0.0 and scores.max() == pytest.approx(1.0)
+
+def test_cohesion_valley_sits_at_the_topic_change(service):
+    scores = service.cohesion_scorer.boundary_scores(two_topic_transcript())
+    assert abs(int(np.argmax(scores)) - 20) <= 1
+
+def test_cohesion_scores_of_a_short_transcript_are_zero(service):
+    scores = service.cohesion_scorer.boundary_scores(make_segments([10, 10, 10]))
+    assert scores.tolist() == [0.0, 0.0, 0.0]
+
+def test_texttiling_places_a_boundary_at_the_topic_change(service):
+    service.strategy = 'texttiling'
+    # Off the even split: length alone would cut at segments 10, 20 and 30
+    raw = two_topic_transcript(change=14)
+    logical = service.segment_transcript(raw)
+    assert_partition(raw, logical)
+    assert all(word_count(seg) <= service.max_segment_words for seg in logical)
+    starts = {seg.start_time for seg in logical}
+    assert starts & {raw[13].start_time, raw[14].start_time, raw[15].start_time}
+    
+    service.strategy = 'dp'
+    starts = {seg.start_time for seg in service.segment_transcript(raw)}
+    assert not starts & {raw[13].start_time, raw[14].start_time, raw[15].start_time}
+
+@pytest.mark.parametrize('strategy', ['dp', 'texttiling'])
+def test_incremental_segmenter_emits_early_with_a_bounded_window(service, strategy):
+    service.strategy = strategy
+    sizes = [random.Random(seed).randint(15, 90) for seed in range(300)]
+    raw = make_segments(sizes, topics=[index // 12 for index in range(300)], cues=set(range(0, 300, 9)))
+    segmenter = service.stream()
+    logical = []
+    emitted_at = []
+    for index, seg in enumerate(raw):
+        closed = segmenter.feed(seg)
+        logical.extend(closed)
+        emitted_at.extend([index] * len(closed))
+        # Only the lookahead window is held, however long the transcript
+        assert sum(word_count(held) for held in segmenter._window) < segmenter.lookahead_words
+    logical.extend(segmenter.close())
+    
+    assert_partition(raw, logical)
+    assert all(word_count(seg) <= service.max_segment_words for seg in logical)
+    assert emitted_at[0] < 3 * service.max_segment_words // 15
+    assert emitted_at[-1] < len(raw) - 1
+
+def test_incremental_segmenter_keeps_a_long_raw_segment_whole(service):
+    raw = make_segments([60] * 20 + [2000] + [60] * 20)
+    logical = list(service.iter_segments(raw))
+    assert_partition(raw, logical)
+    assert [seg.text for seg in logical if word_count(seg) > service.max_segment_words] == [raw[20].text]
+
+def test_incremental_segmenter_returns_few_segments_as_is(service):
+    raw = make_segments([400] * 5)
+    segmenter = service.stream()
+    assert [segmenter.feed(seg) for seg in raw] == [[]] * 5
+    assert segmenter.close() == raw
@@ -0,0 +1,40 @@
+from utils.token_budget import estimate_request_tokens, estimate_tokens, fit_prompt, trim_text
+
+TRANSCRIPT = " ".join(f"Sentence number {i} explains one more step of the loop." for i in range(400))
+INSTRUCTIONS = "You are an expert educational evaluator. Score the segment below."
+CLOSING = "Return only the JSON described in the instructions."
+
+def test_trim_text_ends_on_a_sentence():
+    trimmed = trim_text(TRANSCRIPT, 100)
+    assert estimate_tokens(trimmed) <= 100
+    assert trimmed.endswith("loop.")
+    assert TRANSCRIPT.startswith(trimmed)
+    assert trim_text("Short text.", 100) == "Short text."
+
+def test_trim_text_falls_back_to_a_word_boundary():
+    trimmed = trim_text("word " * 400, 10)
+    assert trimmed and estimate_tokens(trimmed) <= 10
+    assert not trimmed.endswith(" ")
+
+def test_fit_prompt_cuts_the_largest_block_and_keeps_the_instructions():
+    prompt = f"{INSTRUCTIONS}\n\nTEACHING SEGMENT:\n{TRANSCRIPT}\n\n{CLOSING}"
+    fitted = fit_prompt(prompt, 500)
+    assert estimate_tokens(fitted) <= 500
+    assert fitted.startswith(INSTRUCTIONS + "\n\nTEACHING SEGMENT:\nSentence number 0")
+    assert fitted.endswith("loop.\n\n" + CLOSING)
+
+def test_fit_prompt_cuts_several_blocks_when_one_is_not_enough():
+    prompt = "\n\n".join([INSTRUCTIONS, TRANSCRIPT[:3000], TRANSCRIPT[:2900], CLOSING])
+    fitted = fit_prompt(prompt, 400)
+    assert estimate_tokens(fitted) <= 400
+    blocks = fitted.split("\n\n")
+    assert blocks[0] == INSTRUCTIONS and blocks[-1] == CLOSING
+    assert all(block for block in blocks[1:3])
+
+def test_prompt_within_budget_is_unchanged():
+    prompt = f"{INSTRUCTIONS}\n\n{CLOSING}"
+    assert fit_prompt(prompt, 1000) == prompt
+
+def test_request_estimate_caps_the_answer_allowance():
+    assert estimate_request_tokens("x" * 400, 100) == estimate_tokens("x" * 400) + 100
+    assert estimate_request_tokens("x" * 400, 8192) == estimate_tokens("x" * 400) + 512
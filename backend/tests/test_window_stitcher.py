@@ -0,0 +1,101 @@
+import pytest
+
+from config import settings
+from services.transcription import (
+    TranscriptionService,
+    WindowStitcher,
+    audio_extractor,
+    stitch_windows,
+    window_starts,
+)
+
+WINDOW, OVERLAP = 600.0, 15.0
+DURATION = 1500.0
+NUMBERS = "zero one two three four five six seven eight nine".split()
+
+def spoken(n):
+    """Distinct words per segment so the duplicate check never matches neighbours"""
+    return " ".join(NUMBERS[int(digit)] for digit in str(n)) + f" item{n}"
+
+# Ground truth: one 4-second segment every 5 seconds
+TIMELINE = [{'text': spoken(n), 'start': n * 5.0, 'end': n * 5.0 + 4.0} for n in range(int(DURATION // 5))]
+
+def transcribe(start):
+    """What the model returns for a window: the segments inside it, relative to its start"""
+    return [
+        {'text': seg['text'], 'start': seg['start'] - start, 'end': seg['end'] - start}
+        for seg in TIMELINE if seg['start'] >= start and seg['end'] <= start + WINDOW
+    ]
+
+def test_window_starts_cover_the_recording():
+    starts = window_starts(DURATION, WINDOW, OVERLAP)
+    assert starts == [0.0, 585.0, 1170.0]
+    assert starts[-1] + WINDOW >= DURATION
+    assert window_starts(100.0, WINDOW, OVERLAP) == [0.0]
+
+def test_stitched_timeline_has_every_segment_once_in_order():
+    starts = window_starts(DURATION, WINDOW, OVERLAP)
+    stitched = stitch_windows(starts, [transcribe(start) for start in starts], WINDOW, OVERLAP)
+    assert [seg['text'] for seg in stitched] == [seg['text'] for seg in TIMELINE]
+    assert [(seg['start'], seg['end']) for seg in stitched] == [(seg['start'], seg['end']) for seg in TIMELINE]
+
+def test_windows_are_released_in_order():
+    starts = window_starts(DURATION, WINDOW, OVERLAP)
+    windows = [transcribe(start) for start in starts]
+    stitcher = WindowStitcher(starts, WINDOW, OVERLAP)
+    assert stitcher.add(2, windows[2]) == []
+    first = stitcher.add(0, windows[0])
+    assert first and first[-1]['start'] < starts[1] + OVERLAP
+    rest = stitcher.add(1, windows[1])
+    assert first + rest == stitcher.stitched == stitch_windows(starts, windows, WINDOW, OVERLAP)
+
+def test_segment_repeated_across_a_cut_is_dropped():
+    starts = [0.0, 585.0]
+    # The second window hears the last sentence of the first one a second later
+    windows = [
+        [{'text': 'before the cut', 'start': 585.0, 'end': 590.0},
+         {'text': 'so this is the overlap sentence', 'start': 590.5, 'end': 592.0}],
+        [{'text': 'so this is the overlap sentence', 'start': 7.0, 'end': 9.0},
+         {'text': 'after the cut', 'start': 9.5, 'end': 12.0}],
+    ]
+    stitched = stitch_windows(starts, windows, WINDOW, OVERLAP)
+    assert [seg['text'] for seg in stitched] == [
+        'before the cut', 'so this is the overlap sentence', 'after the cut'
+    ]
+
+def test_timestamps_are_clamped_and_monotonic():
+    starts = [0.0, 585.0]
+    windows = [
+        [{'text': 'a b c', 'start': 10.0, 'end': 20.0}, {'text': 'runs past', 'start': 580.0, 'end': 700.0}],
+        [{'text': 'x y z', 'start': 'n/a', 'end': 1.0}, {'text': 'early', 'start': 14.0, 'end': 16.0}],
+    ]
+    stitched = stitch_windows(starts, windows, WINDOW, OVERLAP)
+    assert stitched[1] == {'text': 'runs past', 'start': 580.0, 'end': 600.0}
+    assert all(a['end'] <= b['start'] for a, b in zip(stitched, stitched[1:]))
+    assert all(seg['start'] <= seg['end'] for seg in stitched)
+
+def test_transcription_key_follows_windowing_settings(monkeypatch):
+    service = TranscriptionService()
+    monkeypatch.setattr(audio_extractor, 'available', lambda: True)
+    monkeypatch.setattr(settings, 'TRANSCRIPTION_WINDOWING_ENABLED', True)
+    monkeypatch.setattr(settings, 'TRANSCRIPTION_WINDOW_SECONDS', 600.0)
+    monkeypatch.setattr(settings, 'TRANSCRIPTION_WINDOW_OVERLAP_SECONDS', 15.0)
+    key = service.transcription_key(use_original_video=False)
+    assert ':audio:w600-15:' in key
+    
+    monkeypatch.setattr(settings, 'TRANSCRIPTION_WINDOW_SECONDS', 300.0)
+    assert service.transcription_key(use_original_video=False) != key
+    monkeypatch.setattr(settings, 'TRANSCRIPTION_WINDOW_SECONDS', 40.0)
+    assert ':audio:w40-10:' in service.transcription_key(use_original_video=False)
+    
+    monkeypatch.setattr(settings, 'TRANSCRIPTION_WINDOWING_ENABLED', False)
+    assert ':audio:whole:' in service.transcription_key(use_original_video=False)
+    assert ':video:whole:' in service.transcription_key(use_original_video=True)
+
+def test_transcription_key_follows_the_uploaded_source(monkeypatch):
+    service = TranscriptionService()
+    monkeypatch.setattr(audio_extractor, 'available', lambda: True)
+    monkeypatch.setattr(settings, 'TRANSCRIPTION_WINDOWING_ENABLED', False)
+    # Extraction failed and the video went up instead
+    assert ':video:whole:' in service.transcription_key(False, {'uploaded': 'video'})
+    assert ':audio:whole:' in service.transcription_key(False, {'uploaded': 'audio'})
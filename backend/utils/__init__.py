@@ -1,18 +1,22 @@
 from .auth import create_access_token, verify_token
-from .file_handler import save_upload_file, delete_file, get_file_size
+from .file_handler import save_upload_file, hash_file, delete_file, get_file_size
 
 # ===== NEW: Import LLM client =====
 from .llm_client import llm_client, UnifiedLLMClient
+from .http_pool import http_pool, ProviderHTTPPool
 # ===== END NEW =====
 
 __all__ = [
     'create_access_token',
     'verify_token',
     'save_upload_file',
+    'hash_file',
     'delete_file',
     'get_file_size',
     # ===== NEW =====
     'llm_client',
     'UnifiedLLMClient',
+    'http_pool',
+    'ProviderHTTPPool',
     # ===== END NEW =====
 ]
\ No newline at end of file
@@ -0,0 +1,228 @@
+import os
+import re
+from typing import Dict, Any, Optional, List, Iterable, Iterator, AsyncIterator
+import aiofiles
+from utils.json_stream import IncrementalJSONParser
+
+CAPTION_FORMATS = ('srt', 'vtt', 'json')
+
+class CaptionParseError(ValueError):
+    """Raised when a caption file is not valid SRT, VTT or JSON captions"""
+    pass
+
+_TIMING = re.compile(r'^\s*(\S+)\s+-->\s+(\S+)')
+# SRT <i>/<b>/<font>, VTT voice/class/inline timestamp tags, and ASS overrides like {\an8}
+_MARKUP = re.compile(r'<[^>]*>|\{\\[^}]*\}')
+_SENTENCE_END = re.compile(r'[.!?]["\')\]]*$')
+
+def detect_format(filename: str, first_line: str = "") -> str:
+    """Caption format from the file extension, falling back to the first line"""
+    extension = os.path.splitext(filename or "")[1].lower().lstrip('.')
+    if extension in CAPTION_FORMATS:
+        return extension
+    first_line = first_line.lstrip('﻿').strip()
+    if first_line.startswith('WEBVTT'):
+        return 'vtt'
+    if first_line[:1] in ('[', '{'):
+        return 'json'
+    if first_line.isdigit() or _TIMING.match(first_line):
+        return 'srt'
+    raise CaptionParseError(f"Unsupported caption format: {filename}")
+
+def parse_timestamp(value: str) -> float:
+    """'HH:MM:SS,mmm' (SRT), 'HH:MM:SS.mmm' or 'MM:SS.mmm' (VTT) → seconds"""
+    try:
+        parts = value.replace(',', '.').split(':')
+        seconds = float(parts[-1])
+        for unit, part in zip((60, 3600), reversed(parts[:-1])):
+            seconds += int(part) * unit
+        return seconds
+    except (ValueError, IndexError):
+        raise CaptionParseError(f"Invalid timestamp: {value!r}")
+
+class CueParser:
+    """
+    Line-by-line SRT/VTT parser: only the cue being read is kept in memory
+    
+    Both formats are blank-line separated blocks; a block with a '-->' timing
+    line is a cue (anything above the timing line is an identifier), any other
+    block (WEBVTT header, NOTE, STYLE, REGION) is skipped.
+    """
+    
+    def __init__(self):
+        self._block: List[str] = []
+        self.line_number = 0
+    
+    def feed(self, line: str) -> Optional[Dict[str, Any]]:
+        """Consume one line; returns a cue when the line ends one"""
+        self.line_number += 1
+        line = line.rstrip('\r\n').lstrip('﻿')
+        if line.strip():
+            self._block.append(line)
+            return None
+        return self._flush()
+    
+    def close(self) -> Optional[Dict[str, Any]]:
+        return self._flush()
+    
+    def _flush(self) -> Optional[Dict[str, Any]]:
+        block, self._block = self._block, []
+        for index, line in enumerate(block):
+            timing = _TIMING.match(line)
+            if timing is None:
+                continue
+            text = ' '.join(_MARKUP.sub('', text_line).strip() for text_line in block[index + 1:])
+            text = ' '.join(text.split())
+            if not text:
+                return None
+            start, end = parse_timestamp(timing.group(1)), parse_timestamp(timing.group(2))
+            if end < start:
+                raise CaptionParseError(f"Cue ends before it starts near line {self.line_number}")
+            return {'text': text, 'start': start, 'end': end}
+        return None
+
+def iter_cues(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Cues of an SRT/VTT document given as lines"""
+    parser = CueParser()
+    for line in lines:
+        cue = parser.feed(line)
+        if cue is not None:
+            yield cue
+    cue = parser.close()
+    if cue is not None:
+        yield cue
+
+def _json_cue(item: Any) -> Optional[Dict[str, Any]]:
+    """One element of a JSON caption list ({text, start, end} or {text, start_time, end_time})"""
+    if not isinstance(item, dict):
+        raise CaptionParseError(f"Caption entries must be objects, got {type(item).__name__}")
+    text = ' '.join(str(item.get('text', '')).split())
+    if not text:
+        return None
+    try:
+        start = float(item['start'] if 'start' in item else item['start_time'])
+        end = float(item['end'] if 'end' in item else item['end_time'])
+    except (KeyError, TypeError, ValueError):
+        raise CaptionParseError(f"Caption entry without numeric start/end: {text[:60]!r}")
+    return {'text': text, 'start': start, 'end': end}
+
+async def sniff_format(path: str, filename: Optional[str] = None) -> str:
+    """Caption format of a saved file: the upload's extension, else its first line"""
+    async with aiofiles.open(path, 'r', encoding='utf-8-sig', errors='replace') as f:
+        first_line = await f.readline()
+    return detect_format(filename or path, first_line)
+
+async def iter_caption_file(path: str, caption_format: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Stream the cues of a caption file as {'text', 'start', 'end'} dicts"""
+    async with aiofiles.open(path, 'r', encoding='utf-8-sig', errors='replace') as f:
+        if caption_format is None:
+            first_line = await f.readline()
+            caption_format = detect_format(path, first_line)
+            await f.seek(0)
+        
+        if caption_format == 'json':
+            # A top-level array streams element by element; {"segments": [...]} arrives whole
+            parser = IncrementalJSONParser()
+            while True:
+                chunk = await f.read(64 * 1024)
+                if not chunk:
+                    break
+                for key, value in parser.feed(chunk):
+                    if parser.root_type == 'array':
+                        items = [value]
+                    elif key == 'segments' and isinstance(value, list):
+                        items = value
+                    else:
+                        continue
+                    for item in items:
+                        cue = _json_cue(item)
+                        if cue is not None:
+                            yield cue
+            if not parser.done:
+                raise CaptionParseError("JSON captions are truncated or not a list of segments")
+            return
+        
+        parser = CueParser()
+        async for line in f:
+            cue = parser.feed(line)
+            if cue is not None:
+                yield cue
+        cue = parser.close()
+        if cue is not None:
+            yield cue
+
+class CueMerger:
+    """
+    Joins caption cues into sentence-sized transcript segments
+    
+    Platform captions are cut every few words, often mid-sentence; the rest of
+    the pipeline expects segments of a sentence or so (like the transcription
+    output), so cues are joined up to a sentence end, a pause or max_words.
+    Rolling captions that repeat the previous cue's last line are de-duplicated.
+    """
+    
+    def __init__(self, max_words: int = 40, max_gap_seconds: float = 2.0):
+        self.max_words = max_words
+        self.max_gap_seconds = max_gap_seconds
+        self._texts: List[str] = []
+        self._start = 0.0
+        self._end = 0.0
+        self._words = 0
+        self._previous_words: List[str] = []
+    
+    def _new_words(self, words: List[str]) -> List[str]:
+        """Drop the words a rolling caption repeats from the end of the previous cue"""
+        previous = self._previous_words
+        for overlap in range(min(len(previous), len(words)), 0, -1):
+            # Short overlaps ("the", "and so") are more likely real repetition than rolling
+            if overlap < min(3, len(words)):
+                break
+            if previous[-overlap:] == words[:overlap]:
+                return words[overlap:]
+        return words
+    
+    def feed(self, cue: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Add a cue; returns the segments it completed"""
+        words = cue['text'].split()
+        new_words = self._new_words(words)
+        self._previous_words = words
+        text = ' '.join(new_words)
+        if not text:
+            self._end = max(self._end, cue['end'])
+            return []
+        
+        completed = []
+        if self._texts and cue['start'] - self._end > self.max_gap_seconds:
+            completed.append(self._flush())
+        if not self._texts:
+            self._start = cue['start']
+        self._texts.append(text)
+        self._end = max(self._end, cue['end'])
+        self._words += len(new_words)
+        
+        if self._words >= self.max_words or _SENTENCE_END.search(text):
+            completed.append(self._flush())
+        return completed
+    
+    def close(self) -> List[Dict[str, Any]]:
+        return [self._flush()] if self._texts else []
+    
+    def _flush(self) -> Dict[str, Any]:
+        segment = {'text': ' '.join(self._texts), 'start': self._start, 'end': self._end}
+        self._texts, self._words = [], 0
+        return segment
+
+async def load_caption_segments(
+    path: str,
+    caption_format: Optional[str] = None,
+    max_words: int = 40
+) -> List[Dict[str, Any]]:
+    """Parse a caption file into sentence-sized {'text', 'start', 'end'} segments"""
+    merger = CueMerger(max_words=max_words)
+    segments: List[Dict[str, Any]] = []
+    async for cue in iter_caption_file(path, caption_format):
+        segments.extend(merger.feed(cue))
+    segments.extend(merger.close())
+    if not segments:
+        raise CaptionParseError("Caption file contains no captions")
+    return segments
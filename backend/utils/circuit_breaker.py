@@ -0,0 +1,191 @@
+import time
+from collections import deque
+from enum import Enum
+from typing import Dict, Any, List, Optional
+from config import settings
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker driven by a rolling window of outcomes
+    
+    CLOSED: all traffic flows; trips to OPEN when the error rate or the share of
+            slow calls in the window crosses its threshold.
+    OPEN: no traffic until open_seconds have passed, then HALF_OPEN.
+    HALF_OPEN: a few probe requests are let through; enough successes close the
+               circuit, any failure re-opens it.
+    """
+    
+    def __init__(self, provider: str):
+        self.provider = provider
+        self.window_seconds = settings.CIRCUIT_WINDOW_SECONDS
+        self.min_requests = settings.CIRCUIT_MIN_REQUESTS
+        self.error_rate_threshold = settings.CIRCUIT_ERROR_RATE
+        self.slow_call_seconds = settings.CIRCUIT_SLOW_CALL_SECONDS
+        self.slow_call_rate_threshold = settings.CIRCUIT_SLOW_CALL_RATE
+        self.open_seconds = settings.CIRCUIT_OPEN_SECONDS
+        self.half_open_probes = settings.CIRCUIT_HALF_OPEN_PROBES
+        
+        self.state = CircuitState.CLOSED
+        self.opened_at = 0.0
+        self.last_trip_reason: Optional[str] = None
+        self.times_opened = 0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        # (timestamp, succeeded, latency_seconds)
+        self._events: deque = deque()
+    
+    def allow_request(self) -> bool:
+        """Whether a request may be sent now (claims a probe slot when half-open)"""
+        if self.state == CircuitState.OPEN:
+            if time.monotonic() - self.opened_at < self.open_seconds:
+                return False
+            self._transition(CircuitState.HALF_OPEN)
+        
+        if self.state == CircuitState.HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_probes:
+                return False
+            self._probes_in_flight += 1
+        
+        return True
+    
+    def is_available(self) -> bool:
+        """Read-only version of allow_request"""
+        if self.state == CircuitState.OPEN:
+            return time.monotonic() - self.opened_at >= self.open_seconds
+        if self.state == CircuitState.HALF_OPEN:
+            return self._probes_in_flight < self.half_open_probes
+        return True
+    
+    def record_success(self, latency: float):
+        self._record(True, latency)
+        if self.state == CircuitState.HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_probes:
+                self._transition(CircuitState.CLOSED)
+        elif self.state == CircuitState.CLOSED:
+            self._evaluate()
+    
+    def record_failure(self, latency: float):
+        self._record(False, latency)
+        if self.state == CircuitState.HALF_OPEN:
+            self._trip("probe failed")
+        elif self.state == CircuitState.CLOSED:
+            self._evaluate()
+    
+    def release_probe(self):
+        """Give back a probe slot for an outcome that says nothing about health (e.g. a 429)"""
+        if self.state == CircuitState.HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+    
+    def reset(self):
+        self._events.clear()
+        self._transition(CircuitState.CLOSED)
+    
+    def _record(self, succeeded: bool, latency: float):
+        now = time.monotonic()
+        self._events.append((now, succeeded, latency))
+        self._prune(now)
+    
+    def _prune(self, now: float):
+        while self._events and now - self._events[0][0] > self.window_seconds:
+            self._events.popleft()
+    
+    def _rates(self) -> Dict[str, float]:
+        total = len(self._events)
+        if not total:
+            return {'requests': 0, 'error_rate': 0.0, 'slow_call_rate': 0.0, 'avg_latency': 0.0}
+        errors = sum(1 for _, ok, _ in self._events if not ok)
+        slow = sum(1 for _, _, latency in self._events if latency >= self.slow_call_seconds)
+        return {
+            'requests': total,
+            'error_rate': errors / total,
+            'slow_call_rate': slow / total,
+            'avg_latency': sum(latency for _, _, latency in self._events) / total,
+        }
+    
+    def _evaluate(self):
+        rates = self._rates()
+        if rates['requests'] < self.min_requests:
+            return
+        if rates['error_rate'] >= self.error_rate_threshold:
+            self._trip(f"error rate {rates['error_rate']:.0%}")
+        elif rates['slow_call_rate'] >= self.slow_call_rate_threshold:
+            self._trip(f"slow calls {rates['slow_call_rate']:.0%} over {self.slow_call_seconds}s")
+    
+    def _trip(self, reason: str):
+        self.last_trip_reason = reason
+        self.times_opened += 1
+        self._transition(CircuitState.OPEN)
+        print(f"🔴 Circuit for {self.provider} opened: {reason}")
+    
+    def _transition(self, state: CircuitState):
+        if state == CircuitState.CLOSED and self.state != CircuitState.CLOSED:
+            print(f"🟢 Circuit for {self.provider} closed")
+            # Start fresh so the failures that tripped it don't re-open it immediately
+            self._events.clear()
+        self.state = state
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        if state == CircuitState.OPEN:
+            self.opened_at = time.monotonic()
+    
+    def health_score(self) -> float:
+        """0.0 (unusable) to 1.0 (healthy), combining success rate and latency"""
+        if self.state == CircuitState.OPEN:
+            return 0.0
+        self._prune(time.monotonic())
+        rates = self._rates()
+        if not rates['requests']:
+            return 1.0
+        latency_factor = min(1.0, self.slow_call_seconds / max(rates['avg_latency'], 1e-3))
+        return round((1.0 - rates['error_rate']) * latency_factor, 3)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        self._prune(time.monotonic())
+        rates = self._rates()
+        retry_in = 0.0
+        if self.state == CircuitState.OPEN:
+            retry_in = max(0.0, self.open_seconds - (time.monotonic() - self.opened_at))
+        return {
+            'state': self.state.value,
+            'health_score': self.health_score(),
+            'window_requests': rates['requests'],
+            'error_rate': round(rates['error_rate'], 3),
+            'slow_call_rate': round(rates['slow_call_rate'], 3),
+            'avg_latency_seconds': round(rates['avg_latency'], 3),
+            'times_opened': self.times_opened,
+            'last_trip_reason': self.last_trip_reason,
+            'half_open_in_seconds': round(retry_in, 1),
+        }
+
+class CircuitBreakerRegistry:
+    """One breaker per LLM provider"""
+    
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+    
+    def for_provider(self, provider: str) -> CircuitBreaker:
+        breaker = self._breakers.get(provider)
+        if breaker is None:
+            breaker = CircuitBreaker(provider)
+            self._breakers[provider] = breaker
+        return breaker
+    
+    def select(self, candidates: List[str]) -> Optional[str]:
+        """First candidate whose circuit lets a request through, in preference order"""
+        for provider in candidates:
+            if self.for_provider(provider).allow_request():
+                return provider
+        return None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {provider: breaker.snapshot() for provider, breaker in self._breakers.items()}
+
+# Create global instance
+circuit_breakers = CircuitBreakerRegistry()
@@ -0,0 +1,167 @@
+import asyncio
+import hashlib
+import time
+from typing import Dict, Any, Optional, List
+from config import settings
+from utils.http_pool import http_pool
+from utils.token_budget import estimate_tokens
+
+class GeminiContextCache:
+    """
+    Bookkeeping for Gemini explicit context caches (cachedContents API)
+    
+    Services register the static prefix of their prompts (e.g. the evaluation
+    rubric) once. When a Gemini request starts with a registered prefix, the
+    prefix is uploaded as cached content, the request only carries the rest,
+    and the handle is reused until shortly before it expires. Any failure falls
+    back to sending the prompt inline.
+    """
+    
+    def __init__(self):
+        self.enabled = settings.GEMINI_CONTEXT_CACHE_ENABLED
+        self.ttl_seconds = settings.GEMINI_CONTEXT_CACHE_TTL_SECONDS
+        self.min_tokens = settings.GEMINI_CONTEXT_CACHE_MIN_TOKENS
+        # Handles are replaced this long before they expire, so no request races the expiry
+        self.refresh_margin = 60.0
+        # After a failed create, calls go inline for this long before caching is retried
+        self.retry_after_failure = 300.0
+        
+        self._prefixes: List[str] = []
+        self._handles: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._disabled_until = 0.0
+        
+        self.stats = {
+            'hits': 0,
+            'created': 0,
+            'refreshed': 0,
+            'create_failed': 0,
+            'invalidated': 0,
+            'inline': 0,
+        }
+    
+    def register_prefix(self, prefix: str) -> bool:
+        """Mark a stable prompt prefix as cacheable; prefixes under the provider minimum are ignored"""
+        if estimate_tokens(prefix) < self.min_tokens:
+            return False
+        if prefix not in self._prefixes:
+            self._prefixes.append(prefix)
+            # Longest match wins when one registered prefix extends another
+            self._prefixes.sort(key=len, reverse=True)
+        return True
+    
+    def match(self, text: str) -> Optional[str]:
+        for prefix in self._prefixes:
+            if text.startswith(prefix):
+                return prefix
+        return None
+    
+    def _key(self, prefix: str, model: str) -> str:
+        return hashlib.sha256(f"{model}\n{prefix}".encode('utf-8')).hexdigest()
+    
+    async def attach(self, payload: Dict[str, Any], model: str, api_key: str) -> Optional[str]:
+        """
+        Move a registered prefix of the payload's prompt into cached content
+        Rewrites the payload in place and returns the cache name, or None to send inline.
+        """
+        if not self.enabled or not self._prefixes or time.monotonic() < self._disabled_until:
+            return None
+        
+        parts = payload['contents'][0]['parts']
+        text = parts[-1].get('text', '')
+        prefix = self.match(text)
+        if prefix is None:
+            return None
+        
+        name = await self._get_or_create(prefix, model, api_key)
+        if name is None:
+            self.stats['inline'] += 1
+            return None
+        
+        parts[-1] = {'text': text[len(prefix):].lstrip()}
+        payload['cachedContent'] = name
+        return name
+    
+    async def _get_or_create(self, prefix: str, model: str, api_key: str) -> Optional[str]:
+        key = self._key(prefix, model)
+        handle = self._handles.get(key)
+        if handle is not None and handle['expires_at'] - time.monotonic() > self.refresh_margin:
+            self.stats['hits'] += 1
+            return handle['name']
+        
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Another caller may have created it while we waited
+            handle = self._handles.get(key)
+            if handle is not None and handle['expires_at'] - time.monotonic() > self.refresh_margin:
+                self.stats['hits'] += 1
+                return handle['name']
+            
+            created = await self._create(prefix, model, api_key)
+            if created is None:
+                return None
+            if handle is not None:
+                self.stats['refreshed'] += 1
+            self._handles[key] = created
+            return created['name']
+    
+    async def _create(self, prefix: str, model: str, api_key: str) -> Optional[Dict[str, Any]]:
+        url = f"/v1beta/cachedContents?key={api_key}"
+        body = {
+            "model": f"models/{model}",
+            "contents": [{"role": "user", "parts": [{"text": prefix}]}],
+            "ttl": f"{int(self.ttl_seconds)}s",
+            "displayName": "mindtrace-prompt-prefix",
+        }
+        try:
+            response = await http_pool.post('gemini', url, json=body)
+        except Exception as e:
+            return self._creation_failed(f"{type(e).__name__}: {e}")
+        
+        if response.status_code != 200:
+            return self._creation_failed(f"{response.status_code} - {response.text[:200]}")
+        
+        data = response.json()
+        self.stats['created'] += 1
+        cached_tokens = data.get('usageMetadata', {}).get('totalTokenCount', estimate_tokens(prefix))
+        print(f"🗄️ Gemini context cache created: {data.get('name')} (~{cached_tokens} tokens)")
+        return {
+            'name': data['name'],
+            'model': model,
+            'tokens': cached_tokens,
+            # Local clock: the server's expireTime only matters to within the refresh margin
+            'expires_at': time.monotonic() + self.ttl_seconds,
+        }
+    
+    def _creation_failed(self, reason: str) -> None:
+        self.stats['create_failed'] += 1
+        self._disabled_until = time.monotonic() + self.retry_after_failure
+        print(f"⚠️ Gemini context cache unavailable ({reason}); sending prompts inline")
+        return None
+    
+    def invalidate(self, name: str):
+        """Forget a handle the provider rejected (expired or deleted)"""
+        for key, handle in list(self._handles.items()):
+            if handle['name'] == name:
+                del self._handles[key]
+                self.stats['invalidated'] += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            **self.stats,
+            'enabled': self.enabled,
+            'registered_prefixes': len(self._prefixes),
+            'handles': [
+                {
+                    'name': handle['name'],
+                    'model': handle['model'],
+                    'tokens': handle['tokens'],
+                    'expires_in_seconds': round(handle['expires_at'] - now),
+                }
+                for handle in self._handles.values()
+            ],
+        }
+
+# Create global instance
+context_cache = GeminiContextCache()
@@ -1,30 +1,45 @@
 import os
 import uuid
+import hashlib
+import aiofiles
 from fastapi import UploadFile
 from config import settings
 
-async def save_upload_file(file: UploadFile, prefix: str = "") -> tuple[str, str]:
+async def save_upload_file(file: UploadFile, prefix: str = "") -> tuple[str, str, str]:
     """
-    Save uploaded file to disk
+    Save uploaded file to disk, hashing it while it streams
     
     Args:
         file: The uploaded file
         prefix: Optional prefix for filename
-        
+    
     Returns:
-        Tuple of (filename, full_path)
+        Tuple of (filename, full_path, sha256 of the content)
     """
     # Generate unique filename
     file_extension = os.path.splitext(file.filename)[1]
     unique_filename = f"{prefix}{uuid.uuid4()}{file_extension}"
     file_path = os.path.join(settings.UPLOAD_DIR, unique_filename)
     
-    # Save file
-    with open(file_path, "wb") as f:
-        content = await file.read()
-        f.write(content)
+    # Save file in chunks so a long recording is never held in memory at once
+    digest = hashlib.sha256()
+    async with aiofiles.open(file_path, "wb") as f:
+        while True:
+            chunk = await file.read(settings.UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            digest.update(chunk)
+            await f.write(chunk)
     
-    return unique_filename, file_path
+    return unique_filename, file_path, digest.hexdigest()
+
+def hash_file(file_path: str) -> str:
+    """sha256 of a file on disk (blocking; run it in a thread from async code)"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(settings.UPLOAD_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
 
 def delete_file(file_path: str) -> bool:
     """Delete file from disk"""
@@ -0,0 +1,180 @@
+import asyncio
+import os
+import time
+from typing import Dict, Any, Optional, Callable, Awaitable
+import aiofiles
+import httpx
+from config import settings
+from utils.http_pool import http_pool
+
+class GeminiFileError(Exception):
+    """Raised when a file cannot be uploaded or never becomes ACTIVE"""
+    pass
+
+# Resumable uploads take chunks in multiples of 256 KiB
+_UPLOAD_GRANULARITY = 256 * 1024
+
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
+class GeminiFilesClient:
+    """
+    Async client for the Gemini Files API (resumable upload, state polling, delete)
+    
+    Replaces the blocking genai.upload_file/get_file calls: the upload is sent
+    in chunks through the shared HTTP pool, an interrupted chunk resumes from
+    the offset the server confirms, and processing is polled with backoff.
+    """
+    
+    def __init__(self):
+        self.chunk_bytes = max(
+            _UPLOAD_GRANULARITY,
+            settings.GEMINI_UPLOAD_CHUNK_BYTES // _UPLOAD_GRANULARITY * _UPLOAD_GRANULARITY
+        )
+        self.max_retries = settings.GEMINI_UPLOAD_MAX_RETRIES
+        self.poll_initial = settings.GEMINI_FILE_POLL_INITIAL_SECONDS
+        self.poll_max = settings.GEMINI_FILE_POLL_MAX_SECONDS
+        self.processing_timeout = settings.GEMINI_FILE_PROCESSING_TIMEOUT_SECONDS
+        # Chunks can take far longer than an LLM response
+        self.timeout = httpx.Timeout(settings.GEMINI_UPLOAD_TIMEOUT_SECONDS, connect=settings.LLM_HTTP_CONNECT_TIMEOUT)
+        
+        self.stats = {
+            'uploads': 0,
+            'bytes_uploaded': 0,
+            'chunk_retries': 0,
+            'upload_seconds': 0.0,
+            'polls': 0,
+        }
+    
+    @property
+    def api_key(self) -> str:
+        return settings.GOOGLE_API_KEY.strip() if settings.GOOGLE_API_KEY else ""
+    
+    async def upload(
+        self,
+        path: str,
+        mime_type: str,
+        display_name: Optional[str] = None,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> Dict[str, Any]:
+        """Upload a local file; returns the file resource (name, uri, mimeType, state)"""
+        total = os.path.getsize(path)
+        started = time.monotonic()
+        
+        response = await http_pool.post(
+            'gemini',
+            f"/upload/v1beta/files?key={self.api_key}",
+            headers={
+                "X-Goog-Upload-Protocol": "resumable",
+                "X-Goog-Upload-Command": "start",
+                "X-Goog-Upload-Header-Content-Length": str(total),
+                "X-Goog-Upload-Header-Content-Type": mime_type,
+            },
+            json={"file": {"displayName": display_name or os.path.basename(path)}},
+            timeout=self.timeout
+        )
+        upload_url = response.headers.get("x-goog-upload-url")
+        if response.status_code != 200 or not upload_url:
+            raise GeminiFileError(f"Could not start upload: {response.status_code} - {response.text[:200]}")
+        
+        offset = 0
+        failures = 0
+        result = None
+        async with aiofiles.open(path, "rb") as source:
+            while result is None:
+                await source.seek(offset)
+                chunk = await source.read(self.chunk_bytes)
+                last = offset + len(chunk) >= total
+                try:
+                    response = await http_pool.post(
+                        'gemini',
+                        upload_url,
+                        headers={
+                            "X-Goog-Upload-Command": "upload, finalize" if last else "upload",
+                            "X-Goog-Upload-Offset": str(offset),
+                        },
+                        content=chunk,
+                        timeout=self.timeout
+                    )
+                    error = None
+                except httpx.HTTPError as e:
+                    response, error = None, e
+                
+                if response is not None and response.status_code == 200:
+                    offset += len(chunk)
+                    failures = 0
+                    if last:
+                        result = response.json().get("file", {})
+                    if on_progress is not None:
+                        await on_progress(offset, total)
+                    continue
+                
+                if response is not None and response.status_code != 429 and response.status_code < 500:
+                    raise GeminiFileError(f"Upload rejected: {response.status_code} - {response.text[:200]}")
+                failures += 1
+                if failures > self.max_retries:
+                    raise GeminiFileError(f"Upload failed at byte {offset}: {error or response.status_code}")
+                self.stats['chunk_retries'] += 1
+                await asyncio.sleep(min(self.poll_max, 2 ** (failures - 1)))
+                offset = await self._confirmed_offset(upload_url, offset)
+        
+        elapsed = time.monotonic() - started
+        self.stats['uploads'] += 1
+        self.stats['bytes_uploaded'] += total
+        self.stats['upload_seconds'] += elapsed
+        return result
+    
+    async def _confirmed_offset(self, upload_url: str, offset: int) -> int:
+        """Ask the server how many bytes it has kept, so the retry resends only the rest"""
+        try:
+            response = await http_pool.post(
+                'gemini',
+                upload_url,
+                headers={"X-Goog-Upload-Command": "query"},
+                timeout=self.timeout
+            )
+        except httpx.HTTPError:
+            return offset
+        received = response.headers.get("x-goog-upload-size-received")
+        print(f"⚠️ Upload chunk at byte {offset} failed; resuming from {received or offset}")
+        return int(received) if received is not None else offset
+    
+    async def wait_until_active(
+        self,
+        file: Dict[str, Any],
+        on_poll: Optional[Callable[[str, float], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        """Poll a file until processing finishes, backing off from poll_initial up to poll_max"""
+        delay = self.poll_initial
+        started = time.monotonic()
+        while file.get("state", "ACTIVE") == "PROCESSING":
+            waited = time.monotonic() - started
+            if waited > self.processing_timeout:
+                raise GeminiFileError(f"{file.get('name')} still PROCESSING after {waited:.0f}s")
+            if on_poll is not None:
+                await on_poll(file.get("state"), waited)
+            
+            await asyncio.sleep(delay)
+            delay = min(self.poll_max, delay * 1.5)
+            
+            self.stats['polls'] += 1
+            response = await http_pool.request('gemini', "GET", f"/v1beta/{file['name']}?key={self.api_key}")
+            if response.status_code != 200:
+                raise GeminiFileError(f"Could not read {file.get('name')}: {response.status_code} - {response.text[:200]}")
+            file = response.json()
+        
+        if file.get("state") == "FAILED":
+            raise GeminiFileError("Gemini video processing failed")
+        return file
+    
+    async def delete(self, file: Dict[str, Any]):
+        """Best-effort delete (files expire after 48 hours anyway)"""
+        try:
+            await http_pool.request('gemini', "DELETE", f"/v1beta/{file['name']}?key={self.api_key}")
+        except httpx.HTTPError as e:
+            print(f"⚠️ Could not delete {file.get('name')}: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, 'upload_seconds': round(self.stats['upload_seconds'], 2)}
+
+# Create global instance
+gemini_files = GeminiFilesClient()
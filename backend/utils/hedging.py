@@ -0,0 +1,116 @@
+import math
+from collections import deque
+from typing import Dict, Any, Optional
+from config import settings
+
+class LatencyTracker:
+    """Rolling window of recent call latencies for one task type"""
+    
+    def __init__(self, window: int):
+        self._samples: deque = deque(maxlen=window)
+    
+    def record(self, latency: float):
+        self._samples.append(latency)
+    
+    def __len__(self) -> int:
+        return len(self._samples)
+    
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        rank = max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)
+        return ordered[min(rank, len(ordered) - 1)]
+
+class HedgeBudget:
+    """
+    Caps hedges at a fraction of all requests
+    Every request earns `max_rate` credit (up to `burst`); a hedge spends 1.
+    """
+    
+    def __init__(self, max_rate: float, burst: float):
+        self.max_rate = max_rate
+        self.burst = burst
+        self.credit = burst
+    
+    def deposit(self):
+        self.credit = min(self.burst, self.credit + self.max_rate)
+    
+    def available(self) -> bool:
+        return self.credit >= 1.0
+    
+    def spend(self):
+        self.credit -= 1.0
+
+class HedgingPolicy:
+    """
+    Decides when a slow LLM request should be duplicated to the secondary provider
+    
+    The hedge delay is the configured latency percentile of recent primary
+    calls of the same task type, so only the slowest tail gets a second request.
+    """
+    
+    def __init__(self):
+        self.enabled = settings.LLM_HEDGING_ENABLED
+        self.percentile = settings.LLM_HEDGE_PERCENTILE
+        self.min_samples = settings.LLM_HEDGE_MIN_SAMPLES
+        self.min_delay = settings.LLM_HEDGE_MIN_DELAY_SECONDS
+        self.window = settings.LLM_HEDGE_WINDOW
+        self.budget = HedgeBudget(settings.LLM_HEDGE_MAX_RATE, settings.LLM_HEDGE_BURST)
+        self._trackers: Dict[str, LatencyTracker] = {}
+        self.stats = {
+            'requests': 0,
+            'hedged': 0,
+            'hedge_wins': 0,
+            'budget_exhausted': 0,
+        }
+    
+    def _tracker(self, task_type: str) -> LatencyTracker:
+        tracker = self._trackers.get(task_type)
+        if tracker is None:
+            tracker = LatencyTracker(self.window)
+            self._trackers[task_type] = tracker
+        return tracker
+    
+    def record_latency(self, task_type: str, latency: float):
+        self._tracker(task_type).record(latency)
+    
+    def hedge_delay(self, task_type: str) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there is too little history"""
+        tracker = self._tracker(task_type)
+        if len(tracker) < self.min_samples:
+            return None
+        return max(self.min_delay, tracker.percentile(self.percentile))
+    
+    def start_request(self):
+        self.stats['requests'] += 1
+        self.budget.deposit()
+    
+    def can_hedge(self) -> bool:
+        """Whether the budget allows a hedge now; nothing is spent until record_hedge"""
+        if self.budget.available():
+            return True
+        self.stats['budget_exhausted'] += 1
+        return False
+    
+    def record_hedge(self):
+        """Charge the budget for a backup request that was actually sent"""
+        self.budget.spend()
+        self.stats['hedged'] += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        requests = self.stats['requests']
+        delays = {}
+        for task_type in self._trackers:
+            delay = self.hedge_delay(task_type)
+            if delay is not None:
+                delays[task_type] = round(delay, 3)
+        return {
+            'enabled': self.enabled,
+            **self.stats,
+            'hedge_rate': round(self.stats['hedged'] / requests, 4) if requests else 0.0,
+            'delays': delays,
+        }
+
+# Create global instance
+hedging_policy = HedgingPolicy()
@@ -0,0 +1,135 @@
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional
+import httpx
+from config import settings
+
+try:
+    import h2  # noqa: F401  (required by httpx for HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+class ProviderHTTPPool:
+    """
+    Shared, provider-aware HTTP connection pool for LLM APIs
+    Each provider gets one long-lived httpx.AsyncClient so TCP/TLS handshakes
+    are paid once and connections are reused across concurrent requests.
+    """
+    
+    def __init__(self):
+        self.base_urls = {
+            'gemini': settings.GEMINI_BASE_URL,
+            'groq': settings.GROQ_BASE_URL,
+        }
+        self.http2 = settings.LLM_HTTP2 and HTTP2_AVAILABLE
+        if settings.LLM_HTTP2 and not HTTP2_AVAILABLE:
+            print("⚠️ HTTP/2 requested but the 'h2' package is missing, using HTTP/1.1")
+        
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+    
+    def _build_client(self, provider: str) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY,
+        )
+        timeout = httpx.Timeout(
+            settings.LLM_HTTP_TIMEOUT,
+            connect=settings.LLM_HTTP_CONNECT_TIMEOUT,
+            pool=settings.LLM_HTTP_POOL_TIMEOUT,
+        )
+        return httpx.AsyncClient(
+            base_url=self.base_urls[provider],
+            http2=self.http2,
+            limits=limits,
+            timeout=timeout,
+        )
+    
+    def client(self, provider: str) -> httpx.AsyncClient:
+        """Get (lazily creating) the pooled client for a provider"""
+        client = self._clients.get(provider)
+        if client is None or client.is_closed:
+            client = self._build_client(provider)
+            self._clients[provider] = client
+            self._stats.setdefault(provider, {
+                'requests': 0,
+                'errors': 0,
+                'in_flight': 0,
+                'peak_in_flight': 0,
+            })
+        return client
+    
+    async def request(self, provider: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request through the provider's pool, tracking utilization"""
+        client = self.client(provider)
+        stats = self._stats[provider]
+        stats['requests'] += 1
+        stats['in_flight'] += 1
+        stats['peak_in_flight'] = max(stats['peak_in_flight'], stats['in_flight'])
+        try:
+            return await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            stats['errors'] += 1
+            raise
+        finally:
+            stats['in_flight'] -= 1
+    
+    async def post(self, provider: str, url: str, **kwargs) -> httpx.Response:
+        return await self.request(provider, "POST", url, **kwargs)
+    
+    @asynccontextmanager
+    async def stream(self, provider: str, method: str, url: str, **kwargs):
+        """Streaming variant of request(); the connection stays checked out until the block exits"""
+        client = self.client(provider)
+        stats = self._stats[provider]
+        stats['requests'] += 1
+        stats['in_flight'] += 1
+        stats['peak_in_flight'] = max(stats['peak_in_flight'], stats['in_flight'])
+        try:
+            async with client.stream(method, url, **kwargs) as response:
+                yield response
+        except httpx.HTTPError:
+            stats['errors'] += 1
+            raise
+        finally:
+            stats['in_flight'] -= 1
+    
+    async def warm(self, providers: Optional[list] = None):
+        """Open one connection per provider (all when providers is None) ahead of the first real request"""
+        for provider in list(self.base_urls) if providers is None else providers:
+            try:
+                await self.client(provider).head("/")
+                print(f"🔌 Warmed {provider} connection pool (http2={self.http2})")
+            except httpx.HTTPError as e:
+                print(f"⚠️ Could not warm {provider} connection pool: {e}")
+    
+    def _open_connections(self, client: httpx.AsyncClient) -> Dict[str, int]:
+        """Peek at the underlying httpcore pool; best effort since it is not public API"""
+        pool = getattr(getattr(client, '_transport', None), '_pool', None)
+        connections = getattr(pool, 'connections', None)
+        if connections is None:
+            return {}
+        idle = sum(1 for conn in connections if conn.is_idle())
+        return {'open_connections': len(connections), 'idle_connections': idle}
+    
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {}
+        for provider, client in self._clients.items():
+            provider_stats = dict(self._stats[provider])
+            provider_stats.update(self._open_connections(client))
+            provider_stats['max_connections'] = settings.LLM_HTTP_MAX_CONNECTIONS
+            provider_stats['utilization'] = round(
+                provider_stats['in_flight'] / settings.LLM_HTTP_MAX_CONNECTIONS, 3
+            )
+            provider_stats['http2'] = self.http2
+            stats[provider] = provider_stats
+        return stats
+    
+    async def close(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+# Create global instance
+http_pool = ProviderHTTPPool()
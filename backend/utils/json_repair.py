@@ -0,0 +1,314 @@
+import re
+import json
+from typing import Any, List, Optional
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+class JSONRepairError(ValueError):
+    """Raised when no JSON value can be recovered from the text"""
+    pass
+
+_FENCE = re.compile(r'```(?:json|JSON)?\s*\n?(.*?)(?:```|$)', re.DOTALL)
+_SCALAR = re.compile(
+    r'-?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?|true\b|false\b|null\b|True\b|False\b|None\b'
+)
+_BARE_KEY = re.compile(r'[A-Za-z_][\w\-]*')
+_PY_LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+_ESCAPABLE = set('"\\/bfnrtu')
+# "key":, 'key': or bare key: as written in the source text
+_SOURCE_KEY = re.compile(r"""(?<!\\)"([^"\\\n]+)"\s*:|(?<=[{,])\s*'?([A-Za-z_][\w\-]*)'?\s*:""")
+
+# Counters for the stats endpoint: how often the fast path was enough
+parse_stats = {'fast_path': 0, 'repaired': 0, 'failed': 0}
+
+def loads(text) -> Any:
+    """json.loads using orjson when installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(text)
+    return json.loads(text)
+
+def strip_code_fences(text: str) -> str:
+    """Return the body of the first ``` fenced block, or the text itself"""
+    text = text.strip()
+    if '```' not in text:
+        return text
+    match = _FENCE.search(text)
+    return match.group(1).strip() if match else text
+
+def _find_root(text: str, expect: Optional[str]) -> int:
+    if expect == 'object':
+        return text.find('{')
+    if expect == 'array':
+        return text.find('[')
+    starts = [i for i in (text.find('{'), text.find('[')) if i >= 0]
+    return min(starts) if starts else -1
+
+class _Frame:
+    __slots__ = ('closer', 'state', 'pair_start')
+    
+    def __init__(self, closer: str, state: str, pair_start: int):
+        self.closer = closer
+        # objects: key -> colon -> value -> comma; arrays: value -> comma
+        self.state = state
+        self.pair_start = pair_start
+
+def _next_significant(text: str, pos: int) -> str:
+    n = len(text)
+    while pos < n and text[pos] in ' \t\r\n':
+        pos += 1
+    return text[pos] if pos < n else ''
+
+def _scan_string(text: str, pos: int, is_key: bool):
+    """
+    Read a string starting at the opening quote
+    Returns (json_string, next_pos, closed). Quotes that are not followed by a
+    structural character are treated as unescaped content quotes.
+    """
+    n = len(text)
+    out = ['"']
+    pos += 1
+    while pos < n:
+        char = text[pos]
+        if char == '\\':
+            following = text[pos + 1] if pos + 1 < n else ''
+            if following == 'u' and re.match(r'[0-9a-fA-F]{4}', text[pos + 2:pos + 6]):
+                out.append(text[pos:pos + 6])
+                pos += 6
+                continue
+            if following and following in _ESCAPABLE and following != 'u':
+                out.append(char + following)
+                pos += 2
+                continue
+            out.append('\\\\')
+            pos += 1
+            continue
+        if char == '"':
+            follower = _next_significant(text, pos + 1)
+            closes = follower == ':' if is_key else follower in (',', '}', ']', '')
+            if closes:
+                out.append('"')
+                return ''.join(out), pos + 1, True
+            out.append('\\"')
+            pos += 1
+            continue
+        if char == '\n':
+            out.append('\\n')
+        elif char == '\r':
+            out.append('\\r')
+        elif char == '\t':
+            out.append('\\t')
+        elif ord(char) < 0x20:
+            out.append(f'\\u{ord(char):04x}')
+        else:
+            out.append(char)
+        pos += 1
+    return ''.join(out), pos, False
+
+def repair_json(text: str, expect: Optional[str] = None) -> str:
+    """
+    Rewrite almost-JSON into valid JSON in one left-to-right pass
+    
+    Handles prose around the value, trailing/duplicate commas, unescaped quotes
+    and raw newlines inside strings, bare keys, Python literals, and truncation
+    (the output is rolled back to the last complete value and all open
+    containers are closed). expect='object'/'array' picks the root type.
+    Raises JSONRepairError when an unescaped quote would cut a string short.
+    """
+    start = _find_root(text, expect)
+    if start < 0:
+        raise JSONRepairError("No JSON object or array found")
+    
+    out: List[str] = []
+    stack: List[_Frame] = []
+    # Longest prefix of `out` that is valid once the recorded closers are appended
+    checkpoint = (0, '')
+    pos, n = start, len(text)
+    
+    def closers() -> str:
+        return ''.join(frame.closer for frame in reversed(stack))
+    
+    def value_done():
+        nonlocal checkpoint
+        if stack:
+            stack[-1].state = 'comma'
+        checkpoint = (len(out), closers())
+    
+    while pos < n:
+        char = text[pos]
+        if char in ' \t\r\n':
+            pos += 1
+            continue
+        if not stack and out:
+            break  # root value complete; ignore trailing prose
+        frame = stack[-1] if stack else None
+        in_object = frame is not None and frame.closer == '}'
+        if in_object and frame.state == 'colon' and char not in ":'":
+            # A "key" with no colon is string content cut off by an unescaped
+            # quote: the repair would silently shorten the previous value
+            raise JSONRepairError(f"Text after an unescaped quote would be lost near position {pos}")
+        
+        if char == '"':
+            is_key = in_object and frame.state == 'key'
+            if frame is not None and not is_key and frame.state != 'value':
+                pos += 1  # stray quote where no string belongs
+                continue
+            string, pos, closed = _scan_string(text, pos, is_key)
+            if not closed:
+                if not is_key:
+                    # Truncated inside a value: keep what arrived
+                    out.append(string + '"')
+                    value_done()
+                break
+            out.append(string)
+            if is_key:
+                frame.state = 'colon'
+            else:
+                value_done()
+            continue
+        
+        if char in '{[':
+            if frame is not None and frame.state != 'value':
+                pos += 1
+                continue
+            out.append(char)
+            stack.append(_Frame('}' if char == '{' else ']', 'key' if char == '{' else 'value', len(out)))
+            checkpoint = (len(out), closers())
+            pos += 1
+            continue
+        
+        if char in '}]':
+            if frame is None:
+                break
+            if in_object and frame.state in ('colon', 'value'):
+                # Key without a value: drop the dangling pair
+                del out[frame.pair_start:]
+            while out and out[-1] == ',':
+                out.pop()
+            out.append(frame.closer)
+            stack.pop()
+            value_done()
+            pos += 1
+            continue
+        
+        if char == ':':
+            if in_object and frame.state == 'colon':
+                out.append(':')
+                frame.state = 'value'
+            pos += 1
+            continue
+        
+        if char == ',':
+            if frame is not None and frame.state == 'comma':
+                out.append(',')
+                frame.state = 'key' if in_object else 'value'
+                frame.pair_start = len(out)
+            pos += 1
+            continue
+        
+        if in_object and frame.state == 'key':
+            match = _BARE_KEY.match(text, pos)
+            if match:
+                out.append(json.dumps(match.group()))
+                frame.state = 'colon'
+                pos = match.end()
+                continue
+        
+        if frame is not None and frame.state == 'value':
+            match = _SCALAR.match(text, pos)
+            if match:
+                if match.end() >= n:
+                    break  # a number at the very end may be cut short
+                token = _PY_LITERALS.get(match.group(), match.group())
+                if token.endswith('.'):
+                    token += '0'
+                if token.startswith('.') or token.startswith('-.'):
+                    token = token.replace('.', '0.', 1)
+                out.append(token)
+                value_done()
+                pos = match.end()
+                continue
+        
+        pos += 1  # anything else (comments, prose, stray characters) is skipped
+    
+    if stack:
+        length, closing = checkpoint
+        del out[length:]
+        while out and out[-1] == ',':
+            out.pop()
+        out.append(closing)
+    
+    repaired = ''.join(out)
+    if not repaired:
+        raise JSONRepairError("No JSON value could be recovered")
+    return repaired
+
+def _collect_keys(value: Any, keys: set) -> set:
+    if isinstance(value, dict):
+        for key, item in value.items():
+            keys.add(key)
+            _collect_keys(item, keys)
+    elif isinstance(value, list):
+        for item in value:
+            _collect_keys(item, keys)
+    return keys
+
+def _check_keys(source: str, value: Any):
+    """
+    Refuse a repair that mapped values to the wrong keys
+    
+    Every key of the repaired value must be written as a key in the source, and
+    a source key may only be missing at the end (dropped with a truncated tail):
+    an unescaped quote that shifts the pairs loses keys in the middle instead.
+    """
+    repaired_keys = _collect_keys(value, set())
+    source_keys = [(match.group(1) or match.group(2), match.start()) for match in _SOURCE_KEY.finditer(source)]
+    invented = repaired_keys - {key for key, _ in source_keys}
+    if invented:
+        raise JSONRepairError(f"Repair produced keys not in the text: {sorted(invented)}")
+    last_kept = max((position for key, position in source_keys if key in repaired_keys), default=-1)
+    lost = [key for key, position in source_keys if key not in repaired_keys and position < last_kept]
+    if lost:
+        raise JSONRepairError(f"Repair lost keys: {lost}")
+
+def _loads_expected(text: str, expect: Optional[str]) -> Any:
+    value = loads(text)
+    if expect is not None and not isinstance(value, dict if expect == 'object' else list):
+        raise ValueError(f"Expected a JSON {expect}")
+    return value
+
+def parse_json(text: str, expect: Optional[str] = None) -> Any:
+    """
+    Parse an LLM answer as JSON: strict parse first (orjson), repair only on failure
+    expect='object' or 'array' selects the root when the text contains both.
+    A leading ``` fence is removed before the second strict attempt; fences
+    elsewhere are left alone, they may be inside string values.
+    """
+    cleaned = text.strip()
+    try:
+        value = _loads_expected(cleaned, expect)
+        parse_stats['fast_path'] += 1
+        return value
+    except ValueError:
+        pass
+    
+    if cleaned.startswith('```'):
+        cleaned = strip_code_fences(cleaned)
+        try:
+            value = _loads_expected(cleaned, expect)
+            parse_stats['fast_path'] += 1
+            return value
+        except ValueError:
+            pass
+    
+    try:
+        value = loads(repair_json(cleaned, expect))
+        _check_keys(cleaned, value)
+    except ValueError as e:
+        parse_stats['failed'] += 1
+        raise JSONRepairError(f"Could not repair JSON: {e}; content: {cleaned[:200]}")
+    parse_stats['repaired'] += 1
+    return value
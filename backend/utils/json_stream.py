@@ -0,0 +1,111 @@
+import json
+from typing import Any, List, Optional, Tuple, Union
+
+class IncrementalJSONParser:
+    """
+    Incremental parser for a streamed top-level JSON object or array
+    
+    Text is fed in arbitrary chunks. Each top-level member (an object's key/value
+    pair or an array element) is returned as soon as its closing character has
+    arrived, without waiting for the rest of the document. Everything before the
+    root '{' or '[' (e.g. a markdown fence) is skipped.
+    """
+    
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0              # next character to scan
+        self._member_start = None  # start of the member currently being read
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._index = 0            # next array index
+        
+        self.root_type: Optional[str] = None  # 'object' or 'array'
+        self.done = False
+        self.completed_keys: List[Union[str, int]] = []
+    
+    def feed(self, chunk: str) -> List[Tuple[Union[str, int], Any]]:
+        """Consume a chunk and return the members completed by it"""
+        if self.done:
+            return []
+        
+        self._buffer += chunk
+        completed = []
+        buffer = self._buffer
+        
+        while self._pos < len(buffer):
+            char = buffer[self._pos]
+            
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            
+            elif self.root_type is None:
+                if char in '{[':
+                    self.root_type = 'object' if char == '{' else 'array'
+                    self._depth = 1
+                    self._member_start = self._pos + 1
+            
+            elif char == '"':
+                self._in_string = True
+            
+            elif char in '{[':
+                self._depth += 1
+            
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 1:
+                    # A nested value just closed: its member is complete
+                    self._emit(buffer[self._member_start:self._pos + 1], completed)
+                    self._member_start = None
+                elif self._depth == 0:
+                    if self._member_start is not None:
+                        self._emit(buffer[self._member_start:self._pos], completed)
+                    self.done = True
+                    self._pos += 1
+                    break
+            
+            elif char == ',' and self._depth == 1:
+                if self._member_start is not None:
+                    # Scalar member, terminated by the comma
+                    self._emit(buffer[self._member_start:self._pos], completed)
+                self._member_start = self._pos + 1
+            
+            self._pos += 1
+        
+        self._compact()
+        return completed
+    
+    def _emit(self, text: str, completed: list):
+        text = text.strip()
+        if not text:
+            return
+        try:
+            if self.root_type == 'object':
+                member = json.loads('{' + text + '}')
+                for key, value in member.items():
+                    completed.append((key, value))
+                    self.completed_keys.append(key)
+            else:
+                value = json.loads(text)
+                completed.append((self._index, value))
+                self.completed_keys.append(self._index)
+                self._index += 1
+        except json.JSONDecodeError:
+            # Malformed member: skip it and keep streaming the rest
+            print(f"⚠️ Skipping malformed streamed JSON member: {text[:80]}")
+            if self.root_type == 'array':
+                self._index += 1
+    
+    def _compact(self):
+        """Drop consumed text so memory stays proportional to one member"""
+        keep_from = self._member_start if self._member_start is not None else self._pos
+        if keep_from > 0:
+            self._buffer = self._buffer[keep_from:]
+            self._pos -= keep_from
+            if self._member_start is not None:
+                self._member_start -= keep_from
@@ -2,12 +2,29 @@
 
 import json
 import asyncio
-import re
-from typing import Dict, Any, Optional, List
-from datetime import datetime
-import httpx
+import copy
+import inspect
+import hashlib
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional, List, Tuple, Callable, AsyncIterator
+from datetime import datetime, timedelta
 import google.generativeai as genai
 from config import settings
+from db import db
+from utils.http_pool import http_pool
+from utils.rate_limiter import rate_limiter, llm_priority
+from utils.json_stream import IncrementalJSONParser
+from utils.circuit_breaker import circuit_breakers
+from utils.hedging import hedging_policy
+from utils.token_budget import token_budget, token_usage, estimate_tokens, estimate_request_tokens, fit_prompt
+from utils.json_repair import parse_json, parse_stats, JSONRepairError
+from utils.context_cache import context_cache
+from utils.telemetry import (
+    LLM_QUEUE_WAIT, LLM_NETWORK_LATENCY, LLM_PARSE_TIME, LLM_REQUESTS, LLM_RETRIES,
+    LLM_MOCK_FALLBACKS, LLM_RATE_LIMITED, LLM_TOKENS, LLM_CACHE_HITS
+)
 
 class LLMClientError(Exception):
     """Base exception for LLM client errors"""
@@ -15,7 +32,195 @@ class LLMClientError(Exception):
 
 class RateLimitError(LLMClientError):
     """Raised when rate limit is exceeded"""
-    pass
+    
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def _parse_retry_after(response) -> Optional[float]:
+    """Read the provider's back-off hint from a 429 response (header or Gemini RetryInfo)"""
+    header = response.headers.get('retry-after')
+    if header:
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            try:
+                retry_at = parsedate_to_datetime(header)
+                return max(0.0, (retry_at - datetime.now(retry_at.tzinfo)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+    try:
+        for detail in response.json().get('error', {}).get('details', []):
+            delay = detail.get('retryDelay')
+            if delay and delay.endswith('s'):
+                return float(delay[:-1])
+    except (ValueError, AttributeError):
+        pass
+    return None
+
+class LLMResponseCache:
+    """
+    Content-addressed cache for LLM responses
+    A small in-memory LRU sits in front of a MongoDB collection; both tiers expire entries by TTL
+    """
+    
+    def __init__(
+        self,
+        collection_name: str,
+        ttl_seconds: int,
+        max_memory_entries: int,
+        max_documents: int
+    ):
+        self.collection_name = collection_name
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_entries = max_memory_entries
+        self.max_documents = max_documents
+        
+        # key -> (expires_at as epoch seconds, response)
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._writes_since_trim = 0
+        
+        self.stats = {
+            'hits': 0,
+            'memory_hits': 0,
+            'mongo_hits': 0,
+            'misses': 0,
+            'writes': 0,
+            'bypassed': 0,
+            'evictions': 0,
+        }
+    
+    @staticmethod
+    def make_key(
+        prompt: str,
+        task_type: str,
+        model: str,
+        temperature: float,
+        response_format: str,
+        max_output_tokens: int
+    ) -> str:
+        """Hash every input that can change the response"""
+        payload = json.dumps({
+            'prompt': prompt,
+            'task_type': task_type,
+            'model': model,
+            'temperature': temperature,
+            'response_format': response_format,
+            # A short budget can truncate the answer; never serve it to a larger one
+            'max_output_tokens': max_output_tokens,
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _collection(self):
+        """Mongo tier is only available once the database is connected"""
+        if db.client is None:
+            return None
+        return db.get_collection(self.collection_name)
+    
+    async def ensure_indexes(self):
+        """TTL index lets MongoDB expire stale entries on its own"""
+        collection = self._collection()
+        if collection is None:
+            return
+        try:
+            await collection.create_index("expires_at", expireAfterSeconds=0)
+            await collection.create_index("created_at")
+        except Exception as e:
+            print(f"⚠️ Could not create LLM cache indexes: {e}")
+    
+    def _remember(self, key: str, response: Any, expires_at: float):
+        """Insert into the memory tier, evicting least recently used entries"""
+        self._memory[key] = (expires_at, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.stats['evictions'] += 1
+    
+    async def get(self, key: str) -> Optional[Any]:
+        """Return a copy of the cached response, or None on a miss"""
+        now = time.time()
+        
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, response = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self.stats['hits'] += 1
+                self.stats['memory_hits'] += 1
+                return copy.deepcopy(response)
+            del self._memory[key]
+        
+        collection = self._collection()
+        if collection is not None:
+            try:
+                doc = await collection.find_one({"_id": key})
+            except Exception as e:
+                print(f"⚠️ LLM cache lookup failed: {e}")
+                doc = None
+            
+            if doc:
+                remaining = (doc['expires_at'] - datetime.utcnow()).total_seconds()
+                if remaining > 0:
+                    self._remember(key, doc['response'], now + remaining)
+                    self.stats['hits'] += 1
+                    self.stats['mongo_hits'] += 1
+                    return copy.deepcopy(doc['response'])
+        
+        self.stats['misses'] += 1
+        return None
+    
+    async def set(self, key: str, response: Any, task_type: str, model: str):
+        """Store a response in both tiers"""
+        self._remember(key, copy.deepcopy(response), time.time() + self.ttl_seconds)
+        self.stats['writes'] += 1
+        
+        collection = self._collection()
+        if collection is None:
+            return
+        
+        created_at = datetime.utcnow()
+        try:
+            await collection.replace_one(
+                {"_id": key},
+                {
+                    "_id": key,
+                    "task_type": task_type,
+                    "model": model,
+                    "response": response,
+                    "created_at": created_at,
+                    "expires_at": created_at + timedelta(seconds=self.ttl_seconds),
+                },
+                upsert=True
+            )
+        except Exception as e:
+            print(f"⚠️ LLM cache write failed: {e}")
+            return
+        
+        # Size-based eviction is amortised: only count documents every 100 writes
+        self._writes_since_trim += 1
+        if self._writes_since_trim >= 100:
+            self._writes_since_trim = 0
+            await self._trim(collection)
+    
+    async def _trim(self, collection):
+        """Delete the oldest documents once the collection exceeds its size limit"""
+        try:
+            excess = await collection.count_documents({}) - self.max_documents
+            if excess <= 0:
+                return
+            oldest = await collection.find({}, {"_id": 1}).sort("created_at", 1).limit(excess).to_list(None)
+            await collection.delete_many({"_id": {"$in": [doc['_id'] for doc in oldest]}})
+            self.stats['evictions'] += len(oldest)
+        except Exception as e:
+            print(f"⚠️ LLM cache trim failed: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'memory_entries': len(self._memory),
+            'hit_rate': round(self.stats['hits'] / lookups, 3) if lookups else 0.0,
+        }
 
 class UnifiedLLMClient:
     """
@@ -39,47 +244,251 @@ class UnifiedLLMClient:
             'pacing': 'gemini'         # Analytical task
         }
         
-        # Initialize HTTP client
-        self.http_client = httpx.AsyncClient(timeout=60.0)
+        self.models = {
+            'gemini': settings.GEMINI_MODEL,
+            'groq': settings.GROQ_MODEL,
+        }
+        
+        # Response cache (per-task opt-out for high-temperature tasks)
+        self.cache_enabled = settings.LLM_CACHE_ENABLED
+        self.cache_bypass_tasks = set(settings.LLM_CACHE_BYPASS_TASKS)
+        self.response_cache = LLMResponseCache(
+            collection_name=settings.LLM_CACHE_COLLECTION,
+            ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+            max_memory_entries=settings.LLM_CACHE_MEMORY_ENTRIES,
+            max_documents=settings.LLM_CACHE_MAX_DOCUMENTS
+        )
+        
+        # Single-flight coalescing of identical concurrent requests
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        # Callers currently waiting on each in-flight request besides its leader
+        self._in_flight_waiters: Dict[str, int] = {}
+        self.coalesce_stats = {'leaders': 0, 'coalesced': 0}
+        
+        # Shared connection pool (one keep-alive client per provider)
+        self.http_pool = http_pool
+        
+        # Shared per-provider rate limiter (token buckets + AIMD concurrency)
+        self.rate_limiter = rate_limiter
+        
+        # Per-provider circuit breakers (open circuits are skipped without waiting)
+        self.circuit_breakers = circuit_breakers
+        
+        # Tail-latency hedging to the secondary provider (budget-capped)
+        self.hedging = hedging_policy
+        # Primaries outrun by their hedge, kept referenced until they finish
+        self._outrun_primaries: set = set()
+        
+        # Per-task output caps and token accounting (per call, per session)
+        self.token_budget = token_budget
+        self.token_usage = token_usage
+        
+        # Gemini cachedContents for registered static prompt prefixes
+        self.context_cache = context_cache
+        
+    async def start(self):
+        """Prepare persistent resources (called from the app lifespan)"""
+        await self.response_cache.ensure_indexes()
         
+        configured = [
+            provider for provider, key in (('gemini', self.gemini_api_key), ('groq', self.groq_api_key))
+            if key
+        ]
+        await self.http_pool.warm(configured)
+    
     async def call_llm(
         self, 
         prompt: str, 
         task_type: str = 'evaluate',
         response_format: str = 'json',
         temperature: float = 0.7,
-        max_retries: int = 3
+        max_retries: int = 3,
+        use_cache: Optional[bool] = None,
+        coalesce: bool = True,
+        hedge: Optional[bool] = None,
+        max_output_tokens: Optional[int] = None,
+        priority: Optional[str] = None,
+        validate: Optional[Callable[[Dict[str, Any]], bool]] = None
     ) -> Dict[str, Any]:
         """
         Main LLM call method with intelligent routing and fallback
+        
+        Responses from real providers are cached by content hash. Pass use_cache
+        to override the per-task default (tasks in LLM_CACHE_BYPASS_TASKS skip it).
+        Concurrent calls with the same key share one in-flight request unless
+        coalesce=False (e.g. when deliberately sampling several answers).
+        Pass hedge to override LLM_HEDGING_ENABLED for this call, and
+        max_output_tokens to override the task's output cap (LLM_MAX_OUTPUT_TOKENS).
+        priority ('interactive', 'normal', 'bulk') overrides the calling task's
+        priority class in the provider queues. validate(result) returning False
+        keeps an answer out of the cache (and skips a cached one), e.g. for
+        answers that fail the caller's schema.
         """
+        if priority is not None:
+            with llm_priority(priority):
+                return await self.call_llm(
+                    prompt, task_type, response_format, temperature, max_retries,
+                    use_cache, coalesce, hedge, max_output_tokens, validate=validate
+                )
+        
+        prompt = self._fit_input(prompt, task_type)
         
         # Determine which provider to use
         provider = self.task_routing.get(task_type, 'gemini')
+        model = self.models.get(provider, provider)
+        request_key = self.response_cache.make_key(
+            prompt, task_type, model, temperature, response_format,
+            self.token_budget.max_output_tokens(task_type, max_output_tokens)
+        )
+        
+        if not coalesce:
+            return await self._call_cached(
+                request_key, prompt, task_type, response_format, temperature, max_retries, use_cache, provider, model, hedge, max_output_tokens,
+                validate
+            )
+        
+        # Single-flight: join an identical request that is already running
+        in_flight = self._in_flight.get(request_key)
+        if in_flight is not None:
+            self.coalesce_stats['coalesced'] += 1
+            self._in_flight_waiters[request_key] = self._in_flight_waiters.get(request_key, 0) + 1
+            try:
+                result = await asyncio.shield(in_flight)
+            finally:
+                self._in_flight_waiters[request_key] -= 1
+                if not self._in_flight_waiters[request_key]:
+                    self._in_flight_waiters.pop(request_key, None)
+            return copy.deepcopy(result)
+        
+        # The call runs as its own task so that cancelling the leader (e.g. its
+        # client disconnected) does not fail the waiters that joined it
+        task = asyncio.ensure_future(self._call_cached(
+            request_key, prompt, task_type, response_format, temperature, max_retries, use_cache, provider, model, hedge, max_output_tokens,
+            validate
+        ))
+        self._in_flight[request_key] = task
+        task.add_done_callback(lambda done: self._forget_in_flight(request_key, done))
+        self.coalesce_stats['leaders'] += 1
+        try:
+            result = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not self._in_flight_waiters.get(request_key):
+                task.cancel()
+            raise
+        # Waiters copy the shared result; the leader needs its own copy while any still have to
+        return copy.deepcopy(result) if self._in_flight_waiters.get(request_key) else result
+    
+    def _fit_input(self, prompt: str, task_type: str) -> str:
+        """Trim a prompt over the task's input budget (LLM_MAX_INPUT_TOKENS)"""
+        max_input = self.token_budget.max_input_tokens(task_type)
+        prompt_tokens = estimate_tokens(prompt)
+        if prompt_tokens <= max_input:
+            return prompt
+        print(f"✂️ {task_type} prompt is ~{prompt_tokens} tokens, trimming to its {max_input}-token input budget")
+        return fit_prompt(prompt, max_input)
+    
+    def _forget_in_flight(self, request_key: str, task: asyncio.Task):
+        if self._in_flight.get(request_key) is task:
+            del self._in_flight[request_key]
+        if not task.cancelled():
+            task.exception()  # retrieved here when every caller has gone away
+    
+    async def _call_cached(
+        self,
+        request_key: str,
+        prompt: str,
+        task_type: str,
+        response_format: str,
+        temperature: float,
+        max_retries: int,
+        use_cache: Optional[bool],
+        provider: str,
+        model: str,
+        hedge: Optional[bool] = None,
+        max_output_tokens: Optional[int] = None,
+        validate: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ) -> Dict[str, Any]:
+        """Serve from the response cache, or call the providers and store the answer"""
+        use_response_cache = self._should_use_cache(task_type, use_cache)
+        if use_response_cache:
+            cached = await self.response_cache.get(request_key)
+            if cached is not None and validate is not None and not validate(cached):
+                # Stored before the caller checked answers; ask again and overwrite it
+                cached = None
+            if cached is not None:
+                self.token_usage.record_cache_hit(task_type)
+                LLM_CACHE_HITS.inc(task=task_type)
+                return cached
+        else:
+            self.response_cache.stats['bypassed'] += 1
+        
+        result, answered_by = await self._call_with_fallback(
+            prompt, task_type, response_format, temperature, max_retries, provider, hedge, max_output_tokens
+        )
+        
+        # Never cache mock output - it would mask the real provider once it recovers
+        if use_response_cache and answered_by and (validate is None or validate(result)):
+            answered_model = self.models.get(answered_by, answered_by)
+            if answered_model != model:
+                # A fallback provider answered: file it under its own model, not the routed one
+                request_key = self.response_cache.make_key(
+                    prompt, task_type, answered_model, temperature, response_format,
+                    self.token_budget.max_output_tokens(task_type, max_output_tokens)
+                )
+            await self.response_cache.set(request_key, result, task_type, answered_model)
+        
+        return result
+    
+    def _should_use_cache(self, task_type: str, use_cache: Optional[bool]) -> bool:
+        if not self.cache_enabled:
+            return False
+        if use_cache is not None:
+            return use_cache
+        return task_type not in self.cache_bypass_tasks
+    
+    async def _call_with_fallback(
+        self,
+        prompt: str,
+        task_type: str,
+        response_format: str,
+        temperature: float,
+        max_retries: int,
+        provider: str,
+        hedge: Optional[bool] = None,
+        max_output_tokens: Optional[int] = None
+    ) -> Tuple[Dict[str, Any], Optional[str]]:
+        """
+        Retry loop with provider switching
+        Returns the response and the provider that answered (None for mock)
+        """
+        use_hedging = self.hedging.enabled if hedge is None else hedge
         
         for attempt in range(max_retries):
             try:
-                # Try selected provider
-                if provider == 'gemini' and self.gemini_api_key:
-                    return await self._call_gemini(prompt, response_format, temperature)
-                elif provider == 'groq' and self.groq_api_key:
-                    return await self._call_groq(prompt, response_format, temperature)
-                else:
-                    # If preferred provider key is missing, try the other one
-                    if provider == 'gemini' and self.groq_api_key:
-                        return await self._call_groq(prompt, response_format, temperature)
-                    elif provider == 'groq' and self.gemini_api_key:
-                        return await self._call_gemini(prompt, response_format, temperature)
-                    elif self.use_mock_fallback:
-                        return self._generate_mock_response(task_type)
-                    else:
-                        raise LLMClientError("No LLM provider available")
+                # Use the selected provider unless its key is missing or its circuit is open
+                target = self._select_provider(provider)
+                if target is None:
+                    if self.use_mock_fallback:
+                        LLM_MOCK_FALLBACKS.inc(task=task_type)
+                        return self._generate_mock_response(task_type), None
+                    raise LLMClientError("No LLM provider available (missing keys or open circuits)")
+                provider = target
+                if attempt > 0:
+                    LLM_RETRIES.inc(provider=provider, task=task_type)
+                
+                if use_hedging:
+                    return await self._call_hedged(
+                        provider, task_type, prompt, response_format, temperature, max_output_tokens
+                    )
+                return await self._call_provider(
+                    provider, prompt, response_format, temperature, task_type, max_output_tokens
+                ), provider
                         
             except RateLimitError:
                 if attempt < max_retries - 1:
+                    # No fixed sleep: the limiter already honours Retry-After for this
+                    # provider, so switching lets the other one take the request at once
                     print(f"Rate limit hit for {provider}. Retrying...")
-                    await asyncio.sleep(2 ** attempt)
-                    # Switch provider if possible to avoid rate limit
                     provider = 'groq' if provider == 'gemini' else 'gemini'
                     continue
                 raise
@@ -89,40 +498,423 @@ class UnifiedLLMClient:
                 
                 if attempt < max_retries - 1:
                     # For other tasks, switch provider to maximize success chance
+                    failed_provider = provider
                     provider = 'groq' if provider == 'gemini' else 'gemini'
                     print(f"Switching to {provider} for retry...")
                     
-                    await asyncio.sleep(2 ** attempt)
+                    # Back off only when the retry would land on the provider that just failed
+                    if self._peek_provider(provider) in (None, failed_provider):
+                        await asyncio.sleep(2 ** attempt)
                     continue
                     
                 # Final fallback to mock if enabled
                 if self.use_mock_fallback:
                     print(f"All LLM calls failed, using mock response. Last error: {e}")
-                    return self._generate_mock_response(task_type)
+                    LLM_MOCK_FALLBACKS.inc(task=task_type)
+                    return self._generate_mock_response(task_type), None
                 raise
     
-    async def _call_gemini(
-        self, 
-        prompt: str, 
+    async def _call_hedged(
+        self,
+        provider: str,
+        task_type: str,
+        prompt: str,
         response_format: str,
-        temperature: float
+        temperature: float,
+        max_output_tokens: Optional[int] = None
+    ) -> Tuple[Dict[str, Any], str]:
+        """
+        Call the provider; if it runs past the task's latency percentile, send the same
+        request to the other provider and take whichever answers first
+        Returns the response and the provider that gave it
+        """
+        self.hedging.start_request()
+        started = time.monotonic()
+        primary = asyncio.create_task(
+            self._call_provider(provider, prompt, response_format, temperature, task_type, max_output_tokens)
+        )
+        secondary = None
+        outrun = False
+        
+        def record_primary_latency(task: asyncio.Task):
+            # Only the primary's own latency feeds the hedge delay: a hedged call's
+            # time to the backup's answer would pull the percentile down
+            self._outrun_primaries.discard(task)
+            if not task.cancelled() and task.exception() is None:
+                self.hedging.record_latency(task_type, time.monotonic() - started)
+        
+        primary.add_done_callback(record_primary_latency)
+        try:
+            delay = self.hedging.hedge_delay(task_type)
+            if delay is not None:
+                done, _ = await asyncio.wait({primary}, timeout=delay)
+                backup = next((p for p in self._provider_candidates(provider) if p != provider), None)
+                # The budget is only charged once the backup's breaker has let the request through
+                if (
+                    not done
+                    and backup is not None
+                    and self.circuit_breakers.for_provider(backup).is_available()
+                    and self.hedging.can_hedge()
+                    and self.circuit_breakers.for_provider(backup).allow_request()
+                ):
+                    self.hedging.record_hedge()
+                    print(f"⏱️ {task_type} on {provider} passed {delay:.1f}s, hedging to {backup}")
+                    secondary = asyncio.create_task(
+                        self._call_provider(backup, prompt, response_format, temperature, task_type, max_output_tokens)
+                    )
+            
+            answered_by = provider
+            if secondary is None:
+                result = await primary
+            else:
+                pending = {primary, secondary}
+                result = None
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    winner = next((task for task in done if task.exception() is None), None)
+                    if winner is not None:
+                        if winner is secondary:
+                            self.hedging.stats['hedge_wins'] += 1
+                            answered_by = backup
+                            outrun = True
+                        result = winner.result()
+                        break
+                if result is None:
+                    # Both failed: surface the primary's error so the retry loop reacts to it
+                    raise primary.exception()
+            
+            return result, answered_by
+        finally:
+            # Cancel the loser (or everything, if we were cancelled ourselves); an outrun
+            # primary is already being answered and finishes only to measure its latency
+            if outrun and not primary.done():
+                self._outrun_primaries.add(primary)
+            elif not primary.done():
+                primary.cancel()
+            if secondary is not None and not secondary.done():
+                secondary.cancel()
+    
+    async def stream_llm(
+        self,
+        prompt: str,
+        expected_keys: List[str],
+        on_item: Optional[Callable[[str, Any], Any]] = None,
+        task_type: str = 'evaluate',
+        temperature: float = 0.7,
+        max_retries: int = 3,
+        use_cache: Optional[bool] = None,
+        validate: Optional[Callable[[Dict[str, Any]], bool]] = None
     ) -> Dict[str, Any]:
-        """Call Google Gemini API"""
+        """
+        Streaming variant of call_llm for JSON-object answers
+        
+        Uses Gemini streamGenerateContent and calls on_item(key, value) as soon as
+        each top-level key of the answer is complete. A retry only asks for the keys
+        that are still missing, starting at the first incomplete one. Falls back to
+        call_llm when Gemini is not configured or streaming keeps failing.
+        """
+        prompt = self._fit_input(prompt, task_type)
+        provider = self._resolve_provider(self.task_routing.get(task_type, 'gemini'))
+        breaker = self.circuit_breakers.for_provider('gemini')
+        if provider != 'gemini' or not breaker.is_available():
+            # Only Gemini streams; the normal path still handles Groq, open circuits and mock
+            result = await self.call_llm(prompt, task_type, 'json', temperature, max_retries, use_cache, validate=validate)
+            for key in expected_keys:
+                if key in result:
+                    await self._emit_item(on_item, key, result[key])
+            return result
         
-        # Using Gemini 2.5 Flash
-        url = f"https://generativelanguage.googleapis.com/v1/models/gemini-2.5-flash:generateContent?key={self.gemini_api_key}"
+        cache_key = None
+        if self._should_use_cache(task_type, use_cache):
+            cache_key = self.response_cache.make_key(
+                prompt, task_type, self.models['gemini'], temperature, 'json',
+                self.token_budget.max_output_tokens(task_type)
+            )
+            cached = await self.response_cache.get(cache_key)
+            if cached is not None and validate is not None and not validate(cached):
+                cached = None
+            if cached is not None:
+                self.token_usage.record_cache_hit(task_type)
+                LLM_CACHE_HITS.inc(task=task_type)
+                for key in expected_keys:
+                    if key in cached:
+                        await self._emit_item(on_item, key, cached[key])
+                return cached
+        else:
+            self.response_cache.stats['bypassed'] += 1
+        
+        completed: Dict[str, Any] = {}
+        limiter = self.rate_limiter.for_provider('gemini')
+        
+        for attempt in range(max_retries):
+            if not breaker.allow_request():
+                break
+            missing = [key for key in expected_keys if key not in completed]
+            attempt_prompt = self._build_resume_prompt(prompt, completed, missing) if completed else prompt
+            
+            usage: Dict[str, int] = {}
+            estimated = estimate_request_tokens(attempt_prompt, self.token_budget.max_output_tokens(task_type))
+            queued = time.monotonic()
+            try:
+                async with limiter.slot(estimated):
+                    started = time.monotonic()
+                    LLM_QUEUE_WAIT.observe(started - queued, provider='gemini', task=task_type)
+                    try:
+                        async for key, value in self._stream_gemini(
+                            attempt_prompt, temperature, self.token_budget.max_output_tokens(task_type), usage
+                        ):
+                            if key in completed:
+                                continue
+                            completed[key] = value
+                            await self._emit_item(on_item, key, value)
+                    except RateLimitError as e:
+                        limiter.record_rate_limited(e.retry_after)
+                        breaker.release_probe()
+                        self._record_rate_limited('gemini', task_type)
+                        raise
+                    except asyncio.CancelledError:
+                        breaker.release_probe()
+                        raise
+                    except Exception:
+                        breaker.record_failure(time.monotonic() - started)
+                        LLM_REQUESTS.inc(provider='gemini', task=task_type, outcome='error')
+                        raise
+                limiter.record_success()
+                breaker.record_success(time.monotonic() - started)
+                LLM_REQUESTS.inc(provider='gemini', task=task_type, outcome='success')
+                # Parsing is interleaved with the stream, so the whole stream counts as network time
+                LLM_NETWORK_LATENCY.observe(time.monotonic() - started, provider='gemini', task=task_type)
+                self._record_usage(limiter, task_type, 'gemini', attempt_prompt, estimated, usage, started)
+                
+                if all(key in completed for key in expected_keys):
+                    break
+                print(f"⚠️ Gemini stream closed with {len(completed)}/{len(expected_keys)} keys")
+                
+            except Exception as e:
+                print(f"Streaming attempt {attempt+1} failed after {len(completed)} keys: {e}")
+        
+        missing = [key for key in expected_keys if key not in completed]
+        if not missing:
+            if cache_key and (validate is None or validate(completed)):
+                await self.response_cache.set(cache_key, completed, task_type, self.models['gemini'])
+            return completed
+        
+        # Streaming gave up: finish the remaining keys with a regular call
+        print(f"Completing {len(missing)} missing keys without streaming")
+        fallback_prompt = self._build_resume_prompt(prompt, completed, missing) if completed else prompt
+        result = await self.call_llm(fallback_prompt, task_type, 'json', temperature, max_retries, use_cache=False)
+        for key in missing:
+            if key in result:
+                completed[key] = result[key]
+                await self._emit_item(on_item, key, result[key])
+        return completed
+    
+    async def _emit_item(self, on_item: Optional[Callable[[str, Any], Any]], key: str, value: Any):
+        if on_item is None:
+            return
+        try:
+            outcome = on_item(key, value)
+            if inspect.isawaitable(outcome):
+                await outcome
+        except Exception as e:
+            # A failing consumer must not abort the stream
+            print(f"⚠️ Stream consumer failed for '{key}': {e}")
+    
+    def _build_resume_prompt(self, prompt: str, completed: Dict[str, Any], missing: List[str]) -> str:
+        """Ask only for the keys an interrupted answer did not deliver"""
+        return (
+            f"{prompt}\n\n"
+            f"NOTE: A previous answer was interrupted. These keys were already received and must NOT be repeated: "
+            f"{', '.join(completed)}.\n"
+            f"Return ONLY a JSON object containing the remaining keys, in this order: {', '.join(missing)}."
+        )
+    
+    async def _stream_gemini(
+        self,
+        prompt: str,
+        temperature: float,
+        max_output_tokens: int = 8192,
+        usage: Optional[Dict[str, int]] = None
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Yield (key, value) pairs of a JSON answer as Gemini streams it (server-sent events)"""
+        payload = self._build_gemini_payload(prompt, 'json', temperature, max_output_tokens)
+        cached = await self.context_cache.attach(payload, self.models['gemini'], self.gemini_api_key)
+        # cachedContent is a v1beta request field
+        version = 'v1beta' if cached else 'v1'
+        url = f"/{version}/models/{self.models['gemini']}:streamGenerateContent?alt=sse&key={self.gemini_api_key}"
+        parser = IncrementalJSONParser()
+        
+        async with self.http_pool.stream('gemini', 'POST', url, json=payload) as response:
+            if response.status_code != 200:
+                await response.aread()
+                if response.status_code == 429:
+                    raise RateLimitError("Gemini rate limit exceeded", _parse_retry_after(response))
+                if cached and response.status_code in (400, 403, 404):
+                    # Expired or deleted cache: the retry is sent with a fresh handle or inline
+                    self.context_cache.invalidate(cached)
+                raise LLMClientError(f"Gemini API error: {response.status_code} - {response.text}")
+            
+            async for line in response.aiter_lines():
+                if not line.startswith('data:'):
+                    continue
+                try:
+                    chunk = json.loads(line[5:].strip())
+                except json.JSONDecodeError:
+                    continue
+                
+                if usage is not None and 'usageMetadata' in chunk:
+                    usage.update(self._gemini_usage(chunk))
+                
+                for candidate in chunk.get('candidates', [])[:1]:
+                    if candidate.get('finishReason') == 'SAFETY':
+                        raise LLMClientError("Gemini generation blocked due to safety settings.")
+                    for part in candidate.get('content', {}).get('parts', []):
+                        for key, value in parser.feed(part.get('text', '')):
+                            yield key, value
+        
+        if not parser.done:
+            raise LLMClientError("Gemini stream ended before the JSON object was complete")
+    
+    def _provider_candidates(self, provider: str) -> List[str]:
+        """Configured providers in preference order"""
+        keys = {'gemini': self.gemini_api_key, 'groq': self.groq_api_key}
+        other = 'groq' if provider == 'gemini' else 'gemini'
+        return [p for p in (provider, other) if keys.get(p)]
+    
+    def _select_provider(self, provider: str) -> Optional[str]:
+        """Pick the preferred provider, or the other one if its circuit is open (claims a probe if half-open)"""
+        return self.circuit_breakers.select(self._provider_candidates(provider))
+    
+    def _peek_provider(self, provider: str) -> Optional[str]:
+        """Like _select_provider but without claiming anything"""
+        for candidate in self._provider_candidates(provider):
+            if self.circuit_breakers.for_provider(candidate).is_available():
+                return candidate
+        return None
+    
+    def _resolve_provider(self, provider: str) -> Optional[str]:
+        """Return the provider to call, falling back to the other one if no key is configured"""
+        keys = {'gemini': self.gemini_api_key, 'groq': self.groq_api_key}
+        if keys.get(provider):
+            return provider
+        other = 'groq' if provider == 'gemini' else 'gemini'
+        if keys.get(other):
+            return other
+        return None
+    
+    async def _call_provider(
+        self,
+        provider: str,
+        prompt: str,
+        response_format: str,
+        temperature: float,
+        task_type: str = 'evaluate',
+        max_output_tokens: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Call one provider inside its rate limiter slot"""
+        limiter = self.rate_limiter.for_provider(provider)
+        breaker = self.circuit_breakers.for_provider(provider)
+        output_cap = self.token_budget.max_output_tokens(task_type, max_output_tokens)
+        estimated = estimate_request_tokens(prompt, output_cap)
+        usage: Dict[str, Any] = {}
+        queued = time.monotonic()
+        
+        try:
+            async with limiter.slot(estimated):
+                # Latency for the breaker excludes time spent queueing in the limiter
+                started = time.monotonic()
+                LLM_QUEUE_WAIT.observe(started - queued, provider=provider, task=task_type)
+                try:
+                    if provider == 'gemini':
+                        result = await self._call_gemini(prompt, response_format, temperature, output_cap, usage)
+                    else:
+                        result = await self._call_groq(prompt, response_format, temperature, output_cap, usage)
+                except RateLimitError as e:
+                    limiter.record_rate_limited(e.retry_after)
+                    breaker.release_probe()
+                    self._record_rate_limited(provider, task_type)
+                    raise
+                except Exception:
+                    breaker.record_failure(time.monotonic() - started)
+                    LLM_REQUESTS.inc(provider=provider, task=task_type, outcome='error')
+                    raise
+        except asyncio.CancelledError:
+            breaker.release_probe()
+            raise
+        
+        elapsed = time.monotonic() - started
+        limiter.record_success()
+        breaker.record_success(elapsed)
+        parse_seconds = usage.get('parse_seconds', 0.0)
+        LLM_REQUESTS.inc(provider=provider, task=task_type, outcome='success')
+        LLM_NETWORK_LATENCY.observe(elapsed - parse_seconds, provider=provider, task=task_type)
+        LLM_PARSE_TIME.observe(parse_seconds, provider=provider, task=task_type)
+        self._record_usage(limiter, task_type, provider, prompt, estimated, usage, started)
+        return result
+    
+    def _record_rate_limited(self, provider: str, task_type: str):
+        LLM_REQUESTS.inc(provider=provider, task=task_type, outcome='rate_limited')
+        LLM_RATE_LIMITED.inc(provider=provider)
+    
+    def _record_usage(
+        self,
+        limiter,
+        task_type: str,
+        provider: str,
+        prompt: str,
+        estimated: int,
+        usage: Dict[str, Any],
+        started: float
+    ):
+        """Account a finished call; fall back to estimates when the provider sent no usage"""
+        reported = 'prompt_tokens' in usage
+        prompt_tokens = usage.get('prompt_tokens', estimate_tokens(prompt))
+        completion_tokens = usage.get('completion_tokens', 0)
+        cached_tokens = usage.get('cached_tokens', 0)
+        if reported:
+            # Correct the limiter's tokens/min bucket with what was actually spent
+            limiter.record_token_usage(estimated, prompt_tokens + completion_tokens)
+        self.token_usage.record(
+            task_type, provider, prompt_tokens, completion_tokens,
+            time.monotonic() - started, estimated=not reported, cached_tokens=cached_tokens
+        )
+        LLM_TOKENS.inc(prompt_tokens, provider=provider, task=task_type, kind='prompt')
+        if cached_tokens:
+            LLM_TOKENS.inc(cached_tokens, provider=provider, task=task_type, kind='cached_prompt')
+        LLM_TOKENS.inc(completion_tokens, provider=provider, task=task_type, kind='completion')
+    
+    def _gemini_usage(self, data: Dict[str, Any]) -> Dict[str, int]:
+        metadata = data.get('usageMetadata', {})
+        prompt_tokens = metadata.get('promptTokenCount', 0)
+        # Output includes thinking tokens, which are billed like candidates
+        completion_tokens = metadata.get('candidatesTokenCount', 0) + metadata.get('thoughtsTokenCount', 0)
+        return {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            # Part of prompt_tokens served from a context cache (billed at the cached rate)
+            'cached_tokens': metadata.get('cachedContentTokenCount', 0),
+        }
+    
+    def _build_gemini_payload(
+        self,
+        prompt: str,
+        response_format: str,
+        temperature: float,
+        max_output_tokens: int = 8192
+    ) -> Dict[str, Any]:
+        """Request body shared by generateContent and streamGenerateContent"""
         
         if response_format == 'json':
             if not ('json' in prompt.lower() and 'return' in prompt.lower()):
                 prompt = prompt + "\n\nYou MUST return ONLY a valid JSON object. No markdown, no code blocks, no explanations - just pure JSON."
         
-        payload = {
+        return {
             "contents": [{"parts": [{"text": prompt}]}],
             "generationConfig": {
                 "temperature": temperature,
                 "topP": 0.95,
                 "topK": 40,
-                "maxOutputTokens": 8192,
+                "maxOutputTokens": max_output_tokens,
             },
             "safetySettings": [
                 {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
@@ -131,16 +923,42 @@ class UnifiedLLMClient:
                 {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"}
             ]
         }
+    
+    async def _call_gemini(
+        self, 
+        prompt: str, 
+        response_format: str,
+        temperature: float,
+        max_output_tokens: int = 8192,
+        usage: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Call Google Gemini API (fills `usage` with the reported token counts and parse time)"""
+        
+        # Model comes from settings (Gemini 2.5 Flash by default)
+        payload = self._build_gemini_payload(prompt, response_format, temperature, max_output_tokens)
+        cached = await self.context_cache.attach(payload, self.models['gemini'], self.gemini_api_key)
+        # cachedContent is a v1beta request field
+        version = 'v1beta' if cached else 'v1'
+        url = f"/{version}/models/{self.models['gemini']}:generateContent?key={self.gemini_api_key}"
+        
+        response = await self.http_pool.post('gemini', url, json=payload)
         
-        response = await self.http_client.post(url, json=payload)
+        if cached and response.status_code in (400, 403, 404):
+            # Expired or deleted cache: drop the handle and resend this prompt inline
+            self.context_cache.invalidate(cached)
+            payload = self._build_gemini_payload(prompt, response_format, temperature, max_output_tokens)
+            url = f"/v1/models/{self.models['gemini']}:generateContent?key={self.gemini_api_key}"
+            response = await self.http_pool.post('gemini', url, json=payload)
         
         if response.status_code == 429:
-            raise RateLimitError("Gemini rate limit exceeded")
+            raise RateLimitError("Gemini rate limit exceeded", _parse_retry_after(response))
         
         if response.status_code != 200:
             raise LLMClientError(f"Gemini API error: {response.status_code} - {response.text}")
         
         data = response.json()
+        if usage is not None and 'usageMetadata' in data:
+            usage.update(self._gemini_usage(data))
         
         try:
             if 'candidates' not in data or not data['candidates']:
@@ -160,14 +978,16 @@ class UnifiedLLMClient:
             content = content_part['parts'][0]['text']
             
             if response_format == 'json':
-                content = self._clean_json_string(content)
+                if candidate.get('finishReason') == 'MAX_TOKENS':
+                    print(f"⚠️ Gemini answer truncated at the {max_output_tokens}-token output cap, repairing")
+                parse_started = time.monotonic()
                 try:
-                    return json.loads(content)
-                except json.JSONDecodeError as je:
-                    json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                    if json_match:
-                        return json.loads(json_match.group())
-                    raise LLMClientError(f"Failed to parse JSON: {je}\nContent: {content[:200]}")
+                    return parse_json(content)
+                except JSONRepairError as je:
+                    raise LLMClientError(f"Failed to parse JSON: {je}")
+                finally:
+                    if usage is not None:
+                        usage['parse_seconds'] = time.monotonic() - parse_started
             
             return {'text': content}
             
@@ -178,12 +998,13 @@ class UnifiedLLMClient:
         self, 
         prompt: str, 
         response_format: str,
-        temperature: float
+        temperature: float,
+        max_output_tokens: int = 2048,
+        usage: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
-        """Call Groq API (LLaMA 3.1)"""
+        """Call Groq API (LLaMA 3.1) (fills `usage` with the reported token counts and parse time)"""
         
-        # ✅ Clean URL string to prevent protocol errors
-        url = "https://api.groq.com/openai/v1/chat/completions"
+        url = "/openai/v1/chat/completions"
         
         headers = {
             "Authorization": f"Bearer {self.groq_api_key}",
@@ -196,49 +1017,43 @@ class UnifiedLLMClient:
         ]
         
         payload = {
-            "model": "llama-3.3-70b-versatile",
+            "model": self.models['groq'],
             "messages": messages,
             "temperature": temperature,
-            "max_tokens": 2048,
+            "max_tokens": max_output_tokens,
             "top_p": 0.95
         }
         
         if response_format == 'json':
             payload["response_format"] = {"type": "json_object"}
         
-        # Use a fresh client context for Groq to ensure no pollution
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(url, headers=headers, json=payload)
+        response = await self.http_pool.post('groq', url, headers=headers, json=payload)
         
         if response.status_code == 429:
-            raise RateLimitError("Groq rate limit exceeded")
+            raise RateLimitError("Groq rate limit exceeded", _parse_retry_after(response))
         
         if response.status_code != 200:
             raise LLMClientError(f"Groq API error: {response.status_code} - {response.text}")
         
         data = response.json()
+        if usage is not None and 'usage' in data:
+            usage['prompt_tokens'] = data['usage'].get('prompt_tokens', 0)
+            usage['completion_tokens'] = data['usage'].get('completion_tokens', 0)
         
         try:
             content = data['choices'][0]['message']['content']
             
             if response_format == 'json':
-                content = self._clean_json_string(content)
-                return json.loads(content)
+                parse_started = time.monotonic()
+                try:
+                    return parse_json(content)
+                finally:
+                    if usage is not None:
+                        usage['parse_seconds'] = time.monotonic() - parse_started
             return {'text': content}
             
-        except (KeyError, IndexError, json.JSONDecodeError) as e:
+        except (KeyError, IndexError, JSONRepairError) as e:
             raise LLMClientError(f"Failed to parse Groq response: {e}")
-
-    def _clean_json_string(self, content: str) -> str:
-        """Helper to remove markdown code blocks from JSON strings"""
-        content = content.strip()
-        if content.startswith('```json'):
-            content = content[7:]
-        elif content.startswith('```'):
-            content = content[3:]
-        if content.endswith('```'):
-            content = content[:-3]
-        return content.strip()
     
     def _generate_mock_response(self, task_type: str) -> Dict[str, Any]:
         """Generate realistic mock responses for demo purposes"""
@@ -276,8 +1091,22 @@ class UnifiedLLMClient:
             }
         return {"text": "Mock response"}
     
+    def get_stats(self) -> Dict[str, Any]:
+        """Runtime counters for the admin endpoint"""
+        return {
+            'cache': self.response_cache.get_stats(),
+            'http_pool': self.http_pool.get_stats(),
+            'rate_limits': self.rate_limiter.get_stats(),
+            'coalescing': {**self.coalesce_stats, 'in_flight': len(self._in_flight)},
+            'circuits': self.circuit_breakers.get_stats(),
+            'hedging': self.hedging.get_stats(),
+            'token_usage': self.token_usage.get_stats(),
+            'json_parse': dict(parse_stats),
+            'context_cache': self.context_cache.get_stats(),
+        }
+    
     async def close(self):
-        await self.http_client.aclose()
+        await self.http_pool.close()
 
 # Create global instance
 llm_client = UnifiedLLMClient()
\ No newline at end of file
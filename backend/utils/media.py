@@ -0,0 +1,167 @@
+import asyncio
+import os
+import shutil
+import time
+from typing import Dict, Any, Optional, List
+from config import settings
+
+class AudioExtractionError(Exception):
+    """Raised when ffmpeg is missing or fails to produce an audio track"""
+    pass
+
+class AudioExtractor:
+    """
+    Extracts a compressed mono speech track from an uploaded video with ffmpeg
+    
+    ffmpeg runs as a separate worker process (asyncio subprocess), so the event
+    loop keeps serving requests; a semaphore bounds how many run at once.
+    Transcription only needs the speech, and a 24 kbps Opus track is typically
+    a few percent of the video's size.
+    """
+    
+    def __init__(self):
+        self.enabled = settings.AUDIO_EXTRACTION_ENABLED
+        self.ffmpeg_path = settings.FFMPEG_PATH
+        self.ffprobe_path = settings.FFPROBE_PATH
+        self.bitrate = settings.AUDIO_BITRATE
+        self.sample_rate = settings.AUDIO_SAMPLE_RATE
+        self.timeout = settings.AUDIO_EXTRACTION_TIMEOUT_SECONDS
+        self._slots = asyncio.Semaphore(settings.AUDIO_MAX_CONCURRENT_EXTRACTIONS)
+        
+        self.stats = {
+            'extractions': 0,
+            'failures': 0,
+            'input_bytes': 0,
+            'output_bytes': 0,
+            'extraction_seconds': 0.0,
+        }
+    
+    def available(self) -> bool:
+        return self.enabled and shutil.which(self.ffmpeg_path) is not None
+    
+    def audio_path_for(self, video_path: str) -> str:
+        return f"{os.path.splitext(video_path)[0]}.speech.ogg"
+    
+    def _encode_args(self, output_path: str) -> List[str]:
+        return [
+            '-vn', '-sn', '-dn',             # drop video, subtitle and data streams
+            '-ac', '1',                      # mono
+            '-ar', str(self.sample_rate),    # speech needs no more than 16 kHz
+            '-c:a', 'libopus', '-b:a', self.bitrate, '-application', 'voip',
+            output_path,
+        ]
+    
+    async def extract(self, video_path: str, output_path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Write the speech track of video_path as mono Opus/Ogg
+        
+        Returns {'path', 'mime_type', 'input_bytes', 'output_bytes', 'extraction_seconds'}.
+        """
+        output_path = output_path or self.audio_path_for(video_path)
+        command = [
+            self.ffmpeg_path, '-nostdin', '-hide_banner', '-loglevel', 'error', '-y',
+            '-i', video_path,
+            *self._encode_args(output_path),
+        ]
+        elapsed = await self._run(command, output_path)
+        
+        input_bytes = os.path.getsize(video_path)
+        output_bytes = os.path.getsize(output_path)
+        self.stats['extractions'] += 1
+        self.stats['input_bytes'] += input_bytes
+        self.stats['output_bytes'] += output_bytes
+        self.stats['extraction_seconds'] += elapsed
+        
+        return {
+            'path': output_path,
+            'mime_type': 'audio/ogg',
+            'input_bytes': input_bytes,
+            'output_bytes': output_bytes,
+            'extraction_seconds': round(elapsed, 2),
+        }
+    
+    async def extract_window(self, media_path: str, start: float, duration: float, output_path: str) -> Dict[str, Any]:
+        """Write [start, start + duration) seconds of media_path as a mono Opus/Ogg clip"""
+        command = [
+            self.ffmpeg_path, '-nostdin', '-hide_banner', '-loglevel', 'error', '-y',
+            # Input-side seek is fast and sample-accurate because the audio is re-encoded
+            '-ss', f"{start:.3f}", '-t', f"{duration:.3f}",
+            '-i', media_path,
+            *self._encode_args(output_path),
+        ]
+        elapsed = await self._run(command, output_path)
+        return {
+            'path': output_path,
+            'mime_type': 'audio/ogg',
+            'output_bytes': os.path.getsize(output_path),
+            'extraction_seconds': round(elapsed, 2),
+        }
+    
+    async def probe_duration(self, media_path: str) -> Optional[float]:
+        """Container duration in seconds (ffprobe), or None when it cannot be read"""
+        if shutil.which(self.ffprobe_path) is None:
+            return None
+        process = await asyncio.create_subprocess_exec(
+            self.ffprobe_path, '-v', 'error',
+            '-show_entries', 'format=duration',
+            '-of', 'default=noprint_wrappers=1:nokey=1',
+            media_path,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        stdout, _ = await process.communicate()
+        try:
+            return float(stdout.decode().strip())
+        except ValueError:
+            return None
+    
+    async def _run(self, command: List[str], output_path: str) -> float:
+        """Run one ffmpeg command in a worker process; returns its wall time"""
+        if not self.available():
+            raise AudioExtractionError(f"ffmpeg not found ({self.ffmpeg_path})")
+        
+        async with self._slots:
+            started = time.monotonic()
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE
+            )
+            try:
+                _, stderr = await asyncio.wait_for(process.communicate(), self.timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                process.kill()
+                await process.wait()
+                self._discard(output_path)
+                self.stats['failures'] += 1
+                if isinstance(e, asyncio.TimeoutError):
+                    # Callers skip extraction on AudioExtractionError and upload the original
+                    raise AudioExtractionError(f"ffmpeg timed out after {self.timeout}s")
+                raise
+            elapsed = time.monotonic() - started
+        
+        if process.returncode != 0 or not os.path.exists(output_path):
+            self._discard(output_path)
+            self.stats['failures'] += 1
+            message = stderr.decode('utf-8', errors='replace').strip()[-500:]
+            raise AudioExtractionError(f"ffmpeg exited with {process.returncode}: {message}")
+        return elapsed
+    
+    def _discard(self, path: str):
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except OSError:
+            pass
+    
+    def get_stats(self) -> Dict[str, Any]:
+        input_bytes = self.stats['input_bytes']
+        return {
+            **self.stats,
+            'available': self.available(),
+            'extraction_seconds': round(self.stats['extraction_seconds'], 2),
+            'size_reduction': round(1 - self.stats['output_bytes'] / input_bytes, 4) if input_bytes else 0.0,
+        }
+
+# Create global instance
+audio_extractor = AudioExtractor()
@@ -0,0 +1,265 @@
+import asyncio
+import time
+import itertools
+import contextvars
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Any, Optional, List
+from config import settings
+
+# Lower rank is admitted first; aging lets a waiting call overtake newer, higher-priority ones
+PRIORITY_RANKS = {'interactive': 0, 'normal': 1, 'bulk': 2}
+
+# Priority class of the LLM calls made from the current task
+current_priority: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "current_llm_priority", default='normal'
+)
+
+def normalize_priority(priority: Optional[str]) -> str:
+    if priority in PRIORITY_RANKS:
+        return priority
+    return 'normal'
+
+@contextmanager
+def llm_priority(priority: str):
+    """Run the enclosed LLM calls at the given priority class"""
+    scope = current_priority.set(normalize_priority(priority))
+    try:
+        yield
+    finally:
+        current_priority.reset(scope)
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at a per-minute rate"""
+    
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+    
+    def time_until_available(self, amount: float) -> float:
+        """Seconds until `amount` tokens can be taken (requests larger than capacity wait for a full bucket)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+    
+    def consume(self, amount: float):
+        self._refill()
+        self.tokens -= amount
+    
+    def adjust(self, delta: float):
+        """Correct an earlier estimate; the bucket may go into debt"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+class AIMDConcurrencyLimiter:
+    """
+    Concurrency window with additive increase / multiplicative decrease
+    Each success grows the window by 1/limit (≈ +1 per full window), each 429 shrinks it.
+    Admission itself is done by ProviderRateLimiter, which orders waiters by priority.
+    """
+    
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        decrease_factor: float
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+    
+    def has_capacity(self, reserved: int = 0) -> bool:
+        """True when a call may start while keeping `reserved` slots free"""
+        return self.in_flight < max(1, int(self.limit) - reserved)
+    
+    def on_success(self):
+        self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+    
+    def on_rate_limited(self):
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+
+class _Ticket:
+    __slots__ = ('priority', 'tokens', 'key', 'enqueued_at')
+    
+    def __init__(self, priority: str, tokens: int, aging_seconds: float, seq: int):
+        self.priority = priority
+        self.tokens = tokens
+        self.enqueued_at = time.monotonic()
+        # Equivalent to rank - waited/aging_seconds, but fixed at enqueue time
+        self.key = (self.enqueued_at + PRIORITY_RANKS[priority] * aging_seconds, seq)
+
+class ProviderRateLimiter:
+    """
+    Requests/min and tokens/min buckets plus an adaptive concurrency window for one provider
+    
+    Waiting calls are admitted in priority order (interactive, normal, bulk).
+    A call's priority improves by one class every LLM_PRIORITY_AGING_SECONDS it
+    waits, so bulk work keeps moving, and LLM_INTERACTIVE_RESERVED_SLOTS of the
+    concurrency window are held back for interactive calls.
+    """
+    
+    def __init__(
+        self,
+        provider: str,
+        requests_per_minute: float,
+        tokens_per_minute: float
+    ):
+        self.provider = provider
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.concurrency = AIMDConcurrencyLimiter(
+            initial_limit=settings.LLM_INITIAL_CONCURRENCY,
+            min_limit=settings.LLM_MIN_CONCURRENCY,
+            max_limit=settings.LLM_MAX_CONCURRENCY,
+            decrease_factor=settings.LLM_CONCURRENCY_DECREASE_FACTOR
+        )
+        # Set from Retry-After; nothing is sent to the provider before this moment
+        self.blocked_until = 0.0
+        self.aging_seconds = settings.LLM_PRIORITY_AGING_SECONDS
+        self.interactive_reserved = settings.LLM_INTERACTIVE_RESERVED_SLOTS
+        self._admission = asyncio.Condition()
+        self._waiting: List[_Ticket] = []
+        self._sequence = itertools.count()
+        
+        self.stats = {
+            'requests': 0,
+            'rate_limited': 0,
+            'total_wait_seconds': 0.0,
+        }
+        self.priority_stats = {
+            priority: {'requests': 0, 'total_wait_seconds': 0.0, 'max_wait_seconds': 0.0}
+            for priority in PRIORITY_RANKS
+        }
+    
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int, priority: Optional[str] = None):
+        """Wait for a concurrency slot and enough request/token budget (priority defaults to the current task's)"""
+        priority = normalize_priority(priority or current_priority.get())
+        wait_started = time.monotonic()
+        await self._admit(priority, estimated_tokens)
+        try:
+            waited = time.monotonic() - wait_started
+            self.stats['requests'] += 1
+            self.stats['total_wait_seconds'] += waited
+            by_priority = self.priority_stats[priority]
+            by_priority['requests'] += 1
+            by_priority['total_wait_seconds'] += waited
+            by_priority['max_wait_seconds'] = max(by_priority['max_wait_seconds'], waited)
+            yield
+        finally:
+            async with self._admission:
+                self.concurrency.in_flight -= 1
+                self._admission.notify_all()
+    
+    def _eligible(self, ticket: _Ticket) -> bool:
+        reserved = 0 if ticket.priority == 'interactive' else self.interactive_reserved
+        return self.concurrency.has_capacity(reserved)
+    
+    def _is_next(self, ticket: _Ticket) -> bool:
+        """The ticket is the best-ranked waiter that the concurrency window would admit"""
+        if not self._eligible(ticket):
+            return False
+        return all(
+            other.key >= ticket.key or not self._eligible(other)
+            for other in self._waiting
+        )
+    
+    async def _admit(self, priority: str, estimated_tokens: int):
+        ticket = _Ticket(priority, estimated_tokens, self.aging_seconds, next(self._sequence))
+        async with self._admission:
+            self._waiting.append(ticket)
+            try:
+                while True:
+                    timeout = None
+                    if self._is_next(ticket):
+                        delay = max(
+                            self.blocked_until - time.monotonic(),
+                            self.request_bucket.time_until_available(1),
+                            self.token_bucket.time_until_available(estimated_tokens),
+                        )
+                        if delay <= 0:
+                            self.request_bucket.consume(1)
+                            self.token_bucket.consume(estimated_tokens)
+                            self.concurrency.in_flight += 1
+                            return
+                        timeout = delay
+                    # Woken by releases and admissions; the head also wakes when its budget refills
+                    try:
+                        await asyncio.wait_for(self._admission.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                self._waiting.remove(ticket)
+                self._admission.notify_all()
+    
+    def record_success(self):
+        self.concurrency.on_success()
+    
+    def record_rate_limited(self, retry_after: Optional[float] = None):
+        self.stats['rate_limited'] += 1
+        self.concurrency.on_rate_limited()
+        pause = retry_after if retry_after is not None else settings.LLM_DEFAULT_RETRY_AFTER
+        self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+        print(f"⏳ {self.provider} rate limited: pausing {pause:.1f}s, concurrency → {int(self.concurrency.limit)}")
+    
+    def record_token_usage(self, estimated_tokens: int, actual_tokens: int):
+        """Charge the difference between the estimate and what the provider reported"""
+        self.token_bucket.adjust(actual_tokens - estimated_tokens)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'total_wait_seconds': round(self.stats['total_wait_seconds'], 2),
+            'concurrency_limit': round(self.concurrency.limit, 2),
+            'in_flight': self.concurrency.in_flight,
+            'request_tokens_available': round(self.request_bucket.tokens, 1),
+            'token_budget_available': round(self.token_bucket.tokens),
+            'blocked_for_seconds': round(max(0.0, self.blocked_until - time.monotonic()), 1),
+            'queued': {
+                priority: sum(1 for ticket in self._waiting if ticket.priority == priority)
+                for priority in PRIORITY_RANKS
+            },
+            'by_priority': {
+                priority: {
+                    **stats,
+                    'total_wait_seconds': round(stats['total_wait_seconds'], 2),
+                    'max_wait_seconds': round(stats['max_wait_seconds'], 2),
+                }
+                for priority, stats in self.priority_stats.items()
+            },
+        }
+
+class LLMRateLimiter:
+    """Registry of per-provider limiters shared by every LLM-backed service"""
+    
+    def __init__(self):
+        self.limits = {
+            'gemini': (settings.GEMINI_REQUESTS_PER_MINUTE, settings.GEMINI_TOKENS_PER_MINUTE),
+            'groq': (settings.GROQ_REQUESTS_PER_MINUTE, settings.GROQ_TOKENS_PER_MINUTE),
+        }
+        self._providers: Dict[str, ProviderRateLimiter] = {}
+    
+    def for_provider(self, provider: str) -> ProviderRateLimiter:
+        limiter = self._providers.get(provider)
+        if limiter is None:
+            requests_per_minute, tokens_per_minute = self.limits[provider]
+            limiter = ProviderRateLimiter(provider, requests_per_minute, tokens_per_minute)
+            self._providers[provider] = limiter
+        return limiter
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {provider: limiter.get_stats() for provider, limiter in self._providers.items()}
+
+# Create global instance
+rate_limiter = LLMRateLimiter()
@@ -0,0 +1,181 @@
+import bisect
+import threading
+from typing import Dict, List, Tuple, Sequence
+
+# Seconds; spans fast cache-adjacent calls up to long transcription-sized requests
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic counter with labels"""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram with labels (Prometheus semantics)"""
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts..., sum, count]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [0.0] * (len(self.buckets) + 2)
+                self._series[key] = series
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {_format_value(series[-1])}")
+        return lines
+
+class MetricsRegistry:
+    """Holds every metric and renders the Prometheus text exposition format"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        if name not in self._metrics:
+            self._metrics[name] = Counter(name, documentation, labelnames)
+        return self._metrics[name]
+    
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        if name not in self._metrics:
+            self._metrics[name] = Histogram(name, documentation, labelnames, buckets)
+        return self._metrics[name]
+    
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Create global instance
+metrics_registry = MetricsRegistry()
+
+# ----- LLM client metrics -----
+LLM_QUEUE_WAIT = metrics_registry.histogram(
+    "mindtrace_llm_queue_wait_seconds",
+    "Time an LLM call waited for its provider's rate limiter slot",
+    ("provider", "task"),
+)
+LLM_NETWORK_LATENCY = metrics_registry.histogram(
+    "mindtrace_llm_network_seconds",
+    "Time from sending an LLM request to receiving the full response",
+    ("provider", "task"),
+)
+LLM_PARSE_TIME = metrics_registry.histogram(
+    "mindtrace_llm_parse_seconds",
+    "Time spent parsing/repairing an LLM answer",
+    ("provider", "task"),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0),
+)
+LLM_REQUESTS = metrics_registry.counter(
+    "mindtrace_llm_requests_total",
+    "LLM provider calls by outcome (success, rate_limited, error)",
+    ("provider", "task", "outcome"),
+)
+LLM_RETRIES = metrics_registry.counter(
+    "mindtrace_llm_retries_total",
+    "Retry attempts after a failed LLM call",
+    ("provider", "task"),
+)
+LLM_MOCK_FALLBACKS = metrics_registry.counter(
+    "mindtrace_llm_mock_fallbacks_total",
+    "Calls answered with a mock response after the providers failed",
+    ("task",),
+)
+LLM_RATE_LIMITED = metrics_registry.counter(
+    "mindtrace_llm_rate_limited_total",
+    "429 responses received from LLM providers",
+    ("provider",),
+)
+LLM_TOKENS = metrics_registry.counter(
+    "mindtrace_llm_tokens_total",
+    "Tokens spent on LLM calls",
+    ("provider", "task", "kind"),
+)
+LLM_CACHE_HITS = metrics_registry.counter(
+    "mindtrace_llm_cache_hits_total",
+    "LLM calls answered from the response cache",
+    ("task",),
+)
+
+# ----- Pipeline metrics -----
+TRANSCRIPT_CACHE = metrics_registry.counter(
+    "mindtrace_transcript_cache_total",
+    "Transcript lookups by recording hash (hit, miss, refresh)",
+    ("outcome",),
+)
+TRANSCRIPTION_TRUNCATIONS = metrics_registry.counter(
+    "mindtrace_transcription_truncations_total",
+    "Cut-off transcription answers by outcome (recovered by tail requests, partial)",
+    ("outcome",),
+)
@@ -0,0 +1,201 @@
+import re
+import contextvars
+from typing import Dict, Any, Optional
+from config import settings
+
+# Session whose LLM calls are being accounted (set by the evaluation/background tasks)
+current_session_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "current_session_id", default=None
+)
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English)"""
+    return len(text) // 4 + 1
+
+# Answer size assumed when admitting a request, before its real usage is known
+ANSWER_ALLOWANCE_TOKENS = 512
+
+def estimate_request_tokens(prompt: str, max_output_tokens: int = ANSWER_ALLOWANCE_TOKENS) -> int:
+    """Prompt estimate plus the expected answer, for rate limiting and admission"""
+    return estimate_tokens(prompt) + min(max_output_tokens, ANSWER_ALLOWANCE_TOKENS)
+
+def trim_text(text: str, max_tokens: int) -> str:
+    """Cut text to roughly max_tokens, ending on a sentence boundary where possible"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    
+    max_chars = max(0, max_tokens * 4)
+    kept = []
+    length = 0
+    for sentence in _SENTENCE_END.split(text):
+        if length + len(sentence) > max_chars:
+            break
+        kept.append(sentence)
+        length += len(sentence) + 1
+    
+    if kept:
+        return " ".join(kept)
+    # First sentence alone is too long: fall back to a word boundary
+    return text[:max_chars].rsplit(" ", 1)[0]
+
+def fit_prompt(prompt: str, max_tokens: int) -> str:
+    """
+    Cut a prompt to roughly max_tokens at sentence boundaries
+    
+    Blank-line separated blocks longer than a common cap are trimmed to it, so
+    the transcript or session text gives way rather than the short
+    instructions around it.
+    """
+    if estimate_tokens(prompt) <= max_tokens:
+        return prompt
+    blocks = prompt.split("\n\n")
+    remaining = max(0, (max_tokens - 1) * 4 - 2 * (len(blocks) - 1))
+    
+    # Largest cap that lets every block up to it fit (shortest blocks are kept whole)
+    lengths = sorted(len(block) for block in blocks)
+    cap = lengths[-1]
+    for index, length in enumerate(lengths):
+        left = len(lengths) - index
+        if length * left > remaining:
+            cap = remaining // left
+            break
+        remaining -= length
+    return "\n\n".join(block if len(block) <= cap else trim_text(block, cap // 4) for block in blocks)
+
+def _parse_task_limits(raw: str) -> Dict[str, int]:
+    limits = {}
+    for item in raw.split(","):
+        if ":" in item:
+            task, value = item.split(":", 1)
+            limits[task.strip()] = int(value)
+    return limits
+
+class TokenBudgetPolicy:
+    """Per-task caps on output tokens and input size"""
+    
+    def __init__(self):
+        self.output_limits = _parse_task_limits(settings.LLM_MAX_OUTPUT_TOKENS)
+        self.input_limits = _parse_task_limits(settings.LLM_MAX_INPUT_TOKENS)
+    
+    def max_output_tokens(self, task_type: str, override: Optional[int] = None) -> int:
+        if override:
+            return override
+        return self.output_limits.get(task_type, self.output_limits.get('default', 2048))
+    
+    def max_input_tokens(self, task_type: str) -> int:
+        return self.input_limits.get(task_type, self.input_limits.get('default', 30000))
+
+def _empty_usage() -> Dict[str, Any]:
+    return {
+        'calls': 0,
+        'cache_hits': 0,
+        'prompt_tokens': 0,
+        'cached_prompt_tokens': 0,  # share of prompt_tokens served from a context cache
+        'completion_tokens': 0,
+        'total_tokens': 0,
+        'estimated_calls': 0,  # calls where the provider reported no usage
+        'latency_seconds': 0.0,
+    }
+
+class TokenUsageTracker:
+    """
+    Accounts prompt/completion tokens per call, in total and per session
+    
+    A session scope is opened with start_session() in the task that drives the
+    session's LLM work; every call made from that task (and tasks it spawns)
+    is attributed to it. finish_session() adds the totals to the session's
+    latest evaluation document.
+    """
+    
+    def __init__(self):
+        self.totals: Dict[str, Any] = {**_empty_usage(), 'by_task': {}, 'by_provider': {}}
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+    
+    def _bucket(self, usage: Dict[str, Any], group: str, name: str) -> Dict[str, Any]:
+        return usage[group].setdefault(name, _empty_usage())
+    
+    def _apply(self, usage: Dict[str, Any], task_type: str, provider: str, delta: Dict[str, Any]):
+        for bucket in (usage, self._bucket(usage, 'by_task', task_type), self._bucket(usage, 'by_provider', provider)):
+            for key, value in delta.items():
+                bucket[key] += value
+    
+    def _targets(self):
+        targets = [self.totals]
+        session_id = current_session_id.get()
+        if session_id:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = {**_empty_usage(), 'by_task': {}, 'by_provider': {}}
+                self._sessions[session_id] = session
+            targets.append(session)
+        return targets
+    
+    def record(
+        self,
+        task_type: str,
+        provider: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        latency: float,
+        estimated: bool = False,
+        cached_tokens: int = 0
+    ):
+        delta = {
+            'calls': 1,
+            'prompt_tokens': prompt_tokens,
+            'cached_prompt_tokens': cached_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens,
+            'estimated_calls': 1 if estimated else 0,
+            'latency_seconds': latency,
+        }
+        for usage in self._targets():
+            self._apply(usage, task_type, provider, delta)
+    
+    def record_cache_hit(self, task_type: str):
+        for usage in self._targets():
+            self._apply(usage, task_type, 'cache', {'cache_hits': 1})
+    
+    def start_session(self, session_id: str) -> contextvars.Token:
+        return current_session_id.set(session_id)
+    
+    async def finish_session(self, session_id: str, scope: contextvars.Token, db=None) -> Dict[str, Any]:
+        """Close the scope and add its usage to the session's latest evaluation"""
+        current_session_id.reset(scope)
+        usage = self._sessions.pop(session_id, None)
+        if not usage or (not usage['calls'] and not usage['cache_hits']):
+            return usage or _empty_usage()
+        
+        if db is not None:
+            try:
+                await db.evaluations.find_one_and_update(
+                    {"session_id": session_id},
+                    {"$inc": self.as_increment(usage)},
+                    sort=[("created_at", -1)]
+                )
+            except Exception as e:
+                print(f"⚠️ Could not store token usage for session {session_id}: {e}")
+        return usage
+    
+    def as_increment(self, usage: Dict[str, Any], prefix: str = "token_usage") -> Dict[str, Any]:
+        """Flatten usage into a MongoDB $inc document"""
+        increment = {}
+        for key, value in usage.items():
+            if isinstance(value, dict):
+                increment.update(self.as_increment(value, f"{prefix}.{key}"))
+            elif value:
+                increment[f"{prefix}.{key}"] = round(value, 3) if isinstance(value, float) else value
+        return increment
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.totals,
+            'latency_seconds': round(self.totals['latency_seconds'], 2),
+            'open_sessions': len(self._sessions),
+        }
+
+# Create global instances
+token_budget = TokenBudgetPolicy()
+token_usage = TokenUsageTracker()